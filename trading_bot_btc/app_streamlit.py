@@ -8,11 +8,12 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import json
 import os
-import glob
 from datetime import datetime, timedelta
 from run_backtest import run_backtest
+from backtesting.engine import series_to_frame
+from backtesting.monte_carlo import run_monte_carlo
+from backtesting.results_io import list_results, load_meta, load_series, load_trades
 from config import TIMEFRAMES
 
 # Configuración de la página
@@ -65,6 +66,12 @@ selected_timeframe = st.sidebar.selectbox(
     help="Selecciona la temporalidad para el backtesting"
 )
 
+weighted_entries = st.sidebar.checkbox(
+    "Decisión ponderada multi-temporalidad",
+    help="Opera como el bot en vivo: suma las señales de todas las temporalidades con sus pesos "
+         "y entra si la diferencia entre compra y venta alcanza el umbral"
+)
+
 initial_capital = st.sidebar.number_input(
     "Capital Inicial ($)",
     min_value=100,
@@ -89,7 +96,10 @@ if run_backtest_button:
                 start_date=start_datetime,
                 end_date=end_datetime,
                 initial_capital=initial_capital,
-                timeframes=[selected_timeframe]  # Lista con un solo elemento
+                # La temporalidad seleccionada es la principal; con la decisión ponderada se suman el resto
+                timeframes=[selected_timeframe] + ([tf for tf in TIMEFRAMES if tf != selected_timeframe]
+                                                   if weighted_entries else []),
+                entry_mode='weighted_score' if weighted_entries else 'first_signal'
             )
             st.success("✅ Backtesting completado exitosamente!")
             st.session_state.last_run = datetime.now()
@@ -107,24 +117,19 @@ if not st.session_state.show_results:
 # Cargar resultados de backtesting
 results_dir = os.path.join(os.environ.get('TEMP', '/tmp'), "trading_bot_results")
 
-# Buscar archivos en el directorio de resultados
-result_files = []
-if os.path.exists(results_dir):
-    result_files.extend(glob.glob(os.path.join(results_dir, "*.json")))
+# Buscar resultados en el directorio (del más reciente al más antiguo)
+result_bundles = list_results(results_dir)
 
-if not result_files:
+if not result_bundles:
     st.warning("No hay resultados de backtesting disponibles.")
     st.stop()
 
-# Ordenar archivos por fecha de modificación (más reciente primero)
-result_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-
-# Usar el archivo más reciente automáticamente
-selected_file = result_files[0]
+# Usar el resultado más reciente automáticamente
+selected_bundle = result_bundles[0]
     
 try:
-    with open(selected_file, 'r') as f:
-        results = json.load(f)
+    # Solo las métricas; series y operaciones se leen al dibujar cada sección
+    results = load_meta(selected_bundle)
         
     if not results:
         st.error("El archivo de resultados está vacío.")
@@ -171,27 +176,13 @@ try:
 
     # 3. Gráfica de evolución del capital
     st.subheader("📈 Evolución del Capital")
-    if 'balance_history' in results and results['balance_history']:
-        # Convertir el historial de balance a DataFrame
-        balance_data = []
-        for timestamp_str, balance in results['balance_history'].items():
-            try:
-                timestamp = safe_parse_timestamp(timestamp_str)
-                if timestamp is not None:
-                    balance_data.append({
-                        'timestamp': timestamp,
-                        'balance': float(balance)
-                    })
-            except Exception as e:
-                st.warning(f"Error al procesar timestamp del balance: {str(e)}")
-                continue
-        
-        # Crear DataFrame y ordenar por timestamp
-        balance_df = pd.DataFrame(balance_data)
+    # Series por vela (precio, MACD, balance y drawdown) en formato columnar
+    series_df = series_to_frame(load_series(selected_bundle))
+    trades_df = load_trades(selected_bundle)
+    trades_pnl = trades_df['pnl'].to_numpy(dtype=float) if 'pnl' in trades_df else []
+    if not series_df.empty:
+        balance_df = series_df[['balance']]
         if not balance_df.empty:
-            balance_df.set_index('timestamp', inplace=True)
-            balance_df.sort_index(inplace=True)
-            
             # Gráfica de evolución del capital
             fig = make_subplots(rows=2, cols=1, 
                               shared_xaxes=True,
@@ -219,45 +210,18 @@ try:
                 row=1, col=1
             )
 
-            # Procesar drawdown
-            if 'drawdown' in results:
-                try:
-                    drawdown_data = []
-                    for timestamp_str, dd_value in results['drawdown'].items():
-                        try:
-                            timestamp = safe_parse_timestamp(timestamp_str)
-                            if timestamp is not None:
-                                if isinstance(dd_value, dict):
-                                    dd_value = dd_value.get('drawdown', 0)
-                                
-                                drawdown_data.append({
-                                    'timestamp': timestamp,
-                                    'drawdown': float(dd_value)
-                                })
-                        except Exception as e:
-                            st.warning(f"Error al procesar timestamp del drawdown: {str(e)}")
-                            continue
-                    
-                    # Crear DataFrame de drawdown y ordenar
-                    dd_df = pd.DataFrame(drawdown_data)
-                    if not dd_df.empty:
-                        dd_df.set_index('timestamp', inplace=True)
-                        dd_df.sort_index(inplace=True)
-                        
-                        # Agregar gráfica de drawdown
-                        fig.add_trace(
-                            go.Scatter(
-                                x=dd_df.index,
-                                y=dd_df['drawdown'],
-                                name='Drawdown',
-                                fill='tozeroy',
-                                line=dict(color='red')
-                            ),
-                            row=2, col=1
-                        )
-
-                except Exception as e:
-                    st.error(f"Error al procesar drawdown: {str(e)}")
+            # Agregar gráfica de drawdown
+            dd_df = series_df[['drawdown']]
+            fig.add_trace(
+                go.Scatter(
+                    x=dd_df.index,
+                    y=dd_df['drawdown'],
+                    name='Drawdown',
+                    fill='tozeroy',
+                    line=dict(color='red')
+                ),
+                row=2, col=1
+            )
 
             # Actualizar layout
             fig.update_layout(
@@ -291,21 +255,11 @@ try:
 
     # 4. Gráfico de análisis técnico
     st.subheader("📈 Análisis Técnico")
-    if 'price_data' in results:
+    if not series_df.empty:
         try:
-            # Convertir price_data a DataFrame
-            price_data_list = []
-            for timestamp_str, data in results['price_data'].items():
-                timestamp = safe_parse_timestamp(timestamp_str)
-                if timestamp is not None:
-                    data['timestamp'] = timestamp
-                    price_data_list.append(data)
-            
-            price_df = pd.DataFrame(price_data_list)
+            # Solo las velas con MACD calculado, como en el recorrido del backtest
+            price_df = series_df.dropna(subset=[col for col in series_df.columns if col.startswith('MACD')])
             if not price_df.empty:
-                price_df.set_index('timestamp', inplace=True)
-                price_df.sort_index(inplace=True)
-
                 # Crear gráfico con subplots
                 fig = make_subplots(rows=2, cols=1, 
                                   shared_xaxes=True,
@@ -330,7 +284,7 @@ try:
                 short_entries = []
                 exits = []
 
-                for trade in results['trades']:
+                for trade in trades_df.to_dict(orient='records'):
                     entry_time = pd.to_datetime(trade['entry_time'])
                     exit_time = pd.to_datetime(trade['exit_time'])
                     
@@ -500,14 +454,11 @@ try:
             else:
                 st.warning("No hay datos válidos para el gráfico de análisis técnico")
         except Exception as e:
-            st.error(f"Error al procesar price_data: {str(e)}")
+            st.error(f"Error al procesar las series de precio: {str(e)}")
 
     # 5. Tabla de trades
     st.subheader("📊 Registro de Operaciones")
-    if 'trades' in results:
-        trades_df = pd.DataFrame(results['trades'])
-        trades_df['entry_time'] = pd.to_datetime(trades_df['entry_time'])
-        trades_df['exit_time'] = pd.to_datetime(trades_df['exit_time'])
+    if not trades_df.empty:
         trades_df['duration'] = trades_df['exit_time'] - trades_df['entry_time']
         
         # Formatear la tabla
@@ -541,5 +492,46 @@ try:
         st.write(f"- Retorno total: {results['total_return']:.2f}%")
         st.write(f"- Máximo drawdown: {results['max_drawdown']:.2f}%")
 
+    # 7. Robustez: la misma lista de operaciones en miles de órdenes distintos
+    st.subheader("🎲 Simulación Monte Carlo")
+    if len(trades_pnl) < 2:
+        st.info("Se necesitan al menos dos operaciones para la simulación Monte Carlo.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            mc_paths = st.number_input("Simulaciones", min_value=1000, max_value=100000, value=10000, step=1000)
+        with col2:
+            mc_method = st.selectbox("Método", ['bootstrap', 'permutation'],
+                                     format_func=lambda m: {'bootstrap': 'Remuestreo con reemplazo',
+                                                            'permutation': 'Permutación del orden'}[m])
+        with col3:
+            mc_ruin = st.slider("Nivel de ruina (% del capital inicial)", 10, 90, 50, step=5)
+
+        mc = run_monte_carlo(trades_pnl, results['initial_capital'], n_paths=int(mc_paths),
+                             method=mc_method, ruin_level=mc_ruin / 100, seed=0)
+        summary = mc['summary']
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Riesgo de Ruina", f"{mc['risk_of_ruin'] * 100:.2f}%")
+        with col2:
+            st.metric("Probabilidad de Pérdida", f"{mc['probability_of_loss'] * 100:.2f}%")
+        with col3:
+            st.metric("Capital Final (p5)", f"${summary['final_capital']['p5']:,.2f}")
+        with col4:
+            st.metric("Drawdown (p95)", f"{summary['max_drawdown']['p95']:.2f}%")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = px.histogram(x=mc['final_capital'], nbins=60, title="Capital final por simulación")
+            fig.add_vline(x=results['final_capital'], line_dash="dash", line_color="red", annotation_text="Backtest")
+            fig.update_layout(xaxis_title="Capital final ($)", yaxis_title="Simulaciones", showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig = px.histogram(x=mc['max_drawdown'], nbins=60, title="Drawdown máximo por simulación")
+            fig.add_vline(x=results['max_drawdown'], line_dash="dash", line_color="red", annotation_text="Backtest")
+            fig.update_layout(xaxis_title="Drawdown máximo (%)", yaxis_title="Simulaciones", showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+
 except Exception as e:
     st.error(f"Error al cargar los resultados: {e}") 
\ No newline at end of file
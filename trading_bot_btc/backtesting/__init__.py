@@ -3,7 +3,10 @@
 Módulo de backtesting para estrategias de trading
 """
 
-from .engine import BacktestEngine
+from .engine import BacktestEngine, series_to_frame
+from .results_io import save_results, load_results
+from .monte_carlo import run_monte_carlo
+from .portfolio import PortfolioBacktest
 from .metrics import (
     calculate_statistics,
     calculate_max_drawdown,
@@ -21,6 +24,11 @@ from .visualization import (
 
 __all__ = [
     'BacktestEngine',
+    'series_to_frame',
+    'save_results',
+    'load_results',
+    'run_monte_carlo',
+    'PortfolioBacktest',
     'calculate_statistics',
     'calculate_max_drawdown',
     'calculate_profit_factor',
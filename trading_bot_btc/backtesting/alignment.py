@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Alineación entre temporalidades sin mirar al futuro
+
+En cada vela de la temporalidad principal el motor decide con su precio de
+cierre, así que de otra temporalidad solo puede usar las velas que ya
+cerraron en ese momento. Comparar por hora de apertura (`index <= timestamp`)
+deja pasar la vela superior que todavía se está formando: la vela de 4h que
+abre a las 00:00 aparece en la vela de 1h de las 00:00, cuando le quedan tres
+horas por cerrar y su cierre aún no existe.
+
+Aquí se precalcula, con una búsqueda binaria por temporalidad, el índice de
+la última vela cerrada de cada temporalidad en cada vela principal. El
+resultado son arrays de enteros: durante el backtest cada consulta es un
+acceso por posición.
+"""
+
+import numpy as np
+
+from utils.api_data import timeframe_to_ms
+
+
+def _close_times(index, timeframe):
+    """Hora de cierre (ms) de cada vela: apertura + duración"""
+    return index.values.astype('datetime64[ms]').astype(np.int64) + timeframe_to_ms(timeframe)
+
+
+def closed_bar_index(main_index, main_timeframe, index, timeframe):
+    """
+    Última vela cerrada de una temporalidad en cada vela principal
+
+    Una vela cuenta como cerrada si su cierre es anterior o igual al cierre
+    de la vela principal; para la propia temporalidad principal el resultado
+    es la misma vela.
+
+    Args:
+        main_index: DatetimeIndex (aperturas) de la temporalidad principal
+        main_timeframe: Temporalidad principal (ej. '1h')
+        index: DatetimeIndex (aperturas) de la otra temporalidad, ordenado
+        timeframe: Su temporalidad (ej. '4h')
+
+    Returns:
+        np.ndarray: int64 con una posición por vela principal, -1 si aún no cerró ninguna
+    """
+    positions = np.searchsorted(_close_times(index, timeframe), _close_times(main_index, main_timeframe),
+                                side='right') - 1
+    return positions.astype(np.int64, copy=False)
+
+
+def build_alignment(frames, main_timeframe):
+    """
+    Mapa de alineación de todas las temporalidades
+
+    Args:
+        frames: {timeframe: DataFrame} con índice de aperturas
+        main_timeframe: Temporalidad principal
+
+    Returns:
+        dict: {timeframe: array int64 de closed_bar_index} para cada temporalidad de frames
+    """
+    main_index = frames[main_timeframe].index
+    return {tf: closed_bar_index(main_index, main_timeframe, df.index, tf) for tf, df in frames.items()}
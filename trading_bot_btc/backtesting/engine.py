@@ -7,19 +7,127 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from strategy.macd_strategy import check_macd_signal
-from utils.api_data import get_price_data
-from config import TIMEFRAMES, SIGNAL_WEIGHTS, SIGNAL_THRESHOLD
+from strategy.macd_strategy import check_macd_signal, compute_macd_signals
+from utils.api_data import get_price_data, get_multi_timeframe_data
+from config import TIMEFRAMES, SIGNAL_WEIGHTS, SIGNAL_THRESHOLD, DERIVE_TIMEFRAMES
 from .metrics import calculate_statistics
+from .alignment import build_alignment
+from strategy.weighted_score import score_series, weighted_decision
 from risk_management.position_manager import PositionManager
+from utils.profiling import get_profiler
+from utils.request_scheduler import get_scheduler
 import pandas_ta as ta
 
+# Parámetros del MACD por defecto
+DEFAULT_MACD_PARAMS = {'fast': 12, 'slow': 26, 'signal': 9}
+
+# Reglas de entrada: primera señal de compra/venta o decisión ponderada del bot en vivo
+ENTRY_MODES = ('first_signal', 'weighted_score')
+
+# Columnas de precio y MACD que se guardan por vela en los resultados
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9']
+
+def series_to_frame(series):
+    """
+    Convierte results['series'] en un DataFrame indexado por fecha
+
+    Args:
+        series: Diccionario de arrays (o array estructurado) con la columna 'timestamp' en milisegundos
+
+    Returns:
+        DataFrame: Una fila por vela de la temporalidad principal
+    """
+    names = series.dtype.names if hasattr(series, 'dtype') else list(series)
+    columns = {k: np.asarray(series[k]) for k in names if k != 'timestamp'}
+    index = pd.to_datetime(np.asarray(series['timestamp'], dtype=np.int64), unit='ms')
+    return pd.DataFrame(columns, index=pd.Index(index, name='timestamp'))
+
+def macd_columns(macd_params=None):
+    """Nombres de las columnas MACD, señal e histograma según la convención de pandas_ta"""
+    params = {**DEFAULT_MACD_PARAMS, **(macd_params or {})}
+    suffix = f"_{params['fast']}_{params['slow']}_{params['signal']}"
+    return [f"MACD{suffix}", f"MACDs{suffix}", f"MACDh{suffix}"]
+
+def load_historical_data(symbol, start_date, end_date, timeframes, verbose=True):
+    """
+    Descarga los datos OHLCV de todas las temporalidades de una sola vez
+
+    Returns:
+        dict: {timeframe: DataFrame OHLCV} con las temporalidades que tienen datos suficientes
+    """
+    data = {}
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log("\n🔄 Descargando datos históricos...")
+    requests_before = get_scheduler().metrics()
+    
+    # Con varias temporalidades se descarga una sola base y el resto se agrega
+    # localmente, lo que garantiza que todas sean coherentes entre sí
+    frames = None
+    if DERIVE_TIMEFRAMES and len(timeframes) > 1:
+        log(f"📊 Descargando base para {symbol} y construyendo {', '.join(timeframes)}")
+        frames = get_multi_timeframe_data(
+            symbol,
+            timeframes,
+            start_date=start_date,
+            end_date=end_date
+        )
+    
+    for tf in timeframes:
+        if frames is not None:
+            df = frames.get(tf)
+        else:
+            log(f"📊 Descargando {tf} para {symbol}")
+            df = get_price_data(
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                timeframe=tf
+            )
+        
+        if df is not None and not df.empty:
+            if not df.attrs.get('complete', True):
+                # La descarga se cortó tras agotar los reintentos: faltan las velas finales
+                print(f"⚠️ Datos incompletos para {tf}: última vela {df.index[-1]}")
+            if len(df) >= 35:  # Verificar datos suficientes para MACD
+                data[tf] = df
+                log(f"✅ {len(df)} períodos cargados para {tf}")
+            else:
+                log(f"⚠️ Insuficientes datos para {tf} ({len(df)} períodos)")
+        else:
+            log(f"❌ No hay datos disponibles para {tf}")
+    
+    requests = get_scheduler().metrics()
+    if requests['requests'] > requests_before['requests']:
+        delta = {k: requests[k] - requests_before[k] for k in requests}
+        log(f"📡 {delta['requests']} peticiones, {delta['retries']} reintentos, "
+            f"{delta['throttle_seconds']:.1f}s de espera por límite de peticiones")
+    return data
+
+def prepare_signal_frames(data, macd_params=None):
+    """
+    Añade a cada temporalidad el MACD y la señal precalculada de cada vela
+
+    Los DataFrames resultantes se pueden pasar a varios BacktestEngine (barridos
+    de parámetros de riesgo, ventanas walk-forward) sin recalcular indicadores.
+    df.attrs['macd_params'] guarda los parámetros con los que se calcularon
+    las señales: el motor solo las reutiliza si coinciden con los suyos.
+    """
+    params = {**DEFAULT_MACD_PARAMS, **(macd_params or {})}
+    frames = {}
+    for tf, df in data.items():
+        computed = compute_macd_signals(df, tf, params['fast'], params['slow'], params['signal'])
+        frames[tf] = df.join(computed[[c for c in computed.columns if c not in df.columns]])
+        frames[tf].attrs.update(df.attrs, macd_params=dict(params))
+    return frames
+
 class BacktestEngine:
     """
     Motor de backtesting para simular estrategias de trading en datos históricos
     """
     
-    def __init__(self, symbol, start_date, end_date, initial_capital=1000.0, timeframes=None, risk_config=None):
+    def __init__(self, symbol, start_date, end_date, initial_capital=1000.0, timeframes=None, risk_config=None,
+                 precompute_signals=True, data=None, macd_params=None, verbose=True, profile=None,
+                 entry_mode='first_signal', signal_threshold=None, timeframe_weights=None):
         """
         Inicializa el motor de backtesting
         
@@ -30,195 +138,366 @@ class BacktestEngine:
             initial_capital: Capital inicial para la simulación (por defecto 1000.0)
             timeframes: Lista de temporalidades a analizar (por defecto ['4h'])
             risk_config: Configuración de gestión de riesgo (por defecto None)
+            precompute_signals: Calcular las señales de toda la serie una sola vez
+                                en lugar de recalcularlas sobre cada prefijo (por defecto True)
+            data: Datos ya descargados {timeframe: DataFrame OHLCV} (por defecto None)
+            macd_params: Parámetros del MACD {'fast', 'slow', 'signal'} (por defecto 12/26/9)
+            verbose: Imprimir el progreso y cada operación (por defecto True)
+            profile: Medir tiempo, llamadas y filas por etapa (True, False, un
+                     StageProfiler compartido o None para config.PROFILE_STAGES);
+                     las medidas se retornan en results['profile']
+            entry_mode: 'first_signal' (la primera temporalidad con señal de compra o
+                        venta abre la posición) o 'weighted_score' (decisión ponderada de
+                        main.evaluate_multi_timeframe, ver strategy/weighted_score.py)
+            signal_threshold: Umbral de la decisión ponderada (por defecto config.SIGNAL_THRESHOLD)
+            timeframe_weights: Peso de cada temporalidad (por defecto config.TIMEFRAMES)
         """
         self.symbol = symbol
         self.start_date = start_date - timedelta(days=2)  # 2 días extra para cálculo de MACD
         self.end_date = end_date
         self.initial_capital = initial_capital
         self.timeframes = timeframes or ['4h']
+        self.precompute_signals = precompute_signals
+        self.macd_params = {**DEFAULT_MACD_PARAMS, **(macd_params or {})}
+        self.price_columns = ['open', 'high', 'low', 'close'] + macd_columns(self.macd_params)
+        self.verbose = verbose
+        self.profiler = get_profiler(profile)
+        
+        if not precompute_signals and self.macd_params != DEFAULT_MACD_PARAMS:
+            raise ValueError("check_macd_signal solo admite el MACD 12/26/9; usa precompute_signals=True")
+        if entry_mode not in ENTRY_MODES:
+            raise ValueError(f"Modo de entrada desconocido: {entry_mode} (opciones: {', '.join(ENTRY_MODES)})")
+        if entry_mode == 'weighted_score' and not precompute_signals:
+            raise ValueError("La decisión ponderada necesita precompute_signals=True")
+        self.entry_mode = entry_mode
+        self.signal_threshold = SIGNAL_THRESHOLD if signal_threshold is None else signal_threshold
+        self.timeframe_weights = timeframe_weights or TIMEFRAMES
+        self.scores = None
+        self._entry_bars = None
         
         # Inicializar gestor de posiciones
         self.position_manager = PositionManager(risk_config)
         
         # Cargar datos históricos
-        self.data = self._load_historical_data()
+        if data is not None:
+            self.data = {tf: self._prepare_frame(df, tf) for tf, df in data.items()
+                         if tf in self.timeframes and df is not None and len(df) >= 35}
+        else:
+            self.data = self._load_historical_data()
         
         if not self.data:
             raise ValueError(f"No se pudieron obtener datos históricos para {symbol}")
 
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
     def _load_historical_data(self):
         """
         Carga todos los datos históricos necesarios de una sola vez
         """
-        data = {}
-        print("\n🔄 Descargando datos históricos...")
-        
-        for tf in self.timeframes:
-            print(f"📊 Descargando {tf} para {self.symbol}")
-            df = get_price_data(
-                symbol=self.symbol,
-                start_date=self.start_date,
-                end_date=self.end_date,
-                timeframe=tf
-            )
-            
-            if df is not None and not df.empty:
-                if len(df) >= 35:  # Verificar datos suficientes para MACD
-                    # Calcular MACD de una vez
-                    macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
-                    df = df.join(macd)
-                    data[tf] = df
-                    print(f"✅ {len(df)} períodos cargados para {tf}")
+        with self.profiler.stage('download') as stage:
+            data = load_historical_data(self.symbol, self.start_date, self.end_date, self.timeframes, self.verbose)
+            stage.rows = sum(len(df) for df in data.values())
+        return {tf: self._prepare_frame(df, tf) for tf, df in data.items()}
+
+    def _prepare_frame(self, df, tf):
+        """
+        Añade el MACD al DataFrame de una temporalidad si todavía no lo tiene
+        """
+        if all(col in df.columns for col in self.price_columns):
+            return df
+
+        # Calcular MACD de una vez
+        with self.profiler.stage('indicators', rows=len(df)):
+            macd = ta.macd(df['close'], **self.macd_params)
+            return df.join(macd)
+
+    def _precompute_signals(self):
+        """
+        Calcula las señales de todas las velas de cada temporalidad
+        """
+        self._signals = {}
+        self._history = {}
+
+        for tf, df in self.data.items():
+            with self.profiler.stage('precompute_signals', rows=len(df)):
+                # Reutilizar las señales de prepare_signal_frames si se calcularon con el mismo MACD
+                if 'signal' in df.columns and 'strength' in df.columns and \
+                        df.attrs.get('macd_params') == self.macd_params:
+                    computed = df
                 else:
-                    print(f"⚠️ Insuficientes datos para {tf} ({len(df)} períodos)")
+                    computed = compute_macd_signals(df, tf, **self.macd_params)
+                self._signals[tf] = (computed['signal'].to_numpy(), computed['strength'].to_numpy())
+                # Velas anteriores al tramo (ventanas walk-forward): cuentan para el mínimo de historial
+                self._history[tf] = df.attrs.get('history_bars', 0)
+
+    def _signals_at(self, i, timestamp):
+        """
+        Señales de todas las temporalidades en la vela i de la temporalidad principal
+
+        Returns:
+            list: Señales de cada temporalidad con datos suficientes
+        """
+        signals = []
+
+        for tf in self.timeframes:
+            if tf not in self.data:
+                continue
+
+            # Última vela cerrada de la temporalidad (ver backtesting/alignment.py)
+            j = self.alignment[tf][i]
+            if self.precompute_signals:
+                if j < 0 or j + 1 + self._history[tf] < 35:
+                    continue
+                signal_values, strength_values = self._signals[tf]
+                signal = signal_values[j]
+                strength = strength_values[j] if signal != 'hold' else 0.0
             else:
-                print(f"❌ No hay datos disponibles para {tf}")
-        
-        return data
+                df_slice = self.data[tf].iloc[:j + 1].copy()
+                if len(df_slice) < 35:
+                    continue
+                signal, strength = check_macd_signal(df_slice, tf)
 
-    def run(self):
+            if signal:
+                signals.append({
+                    'timestamp': timestamp,
+                    'timeframe': tf,
+                    'signal': signal,
+                    'strength': strength
+                })
+
+        return signals
+
+    def _open_from_signals(self, signals, current_price, timestamp, current_capital):
         """
-        Ejecuta el backtesting y retorna los resultados
+        Abre una posición con la primera señal de compra o venta
+
+        Returns:
+            dict: Posición abierta o None si ninguna señal es de entrada
+        """
+        for signal in signals:
+            if signal['signal'] in ['buy', 'valley_buy']:
+                return self._open_position('long', current_price, timestamp, current_capital, signals)
+            elif signal['signal'] in ['sell', 'top_sell']:
+                return self._open_position('short', current_price, timestamp, current_capital, signals)
+        return None
+
+    def _open_position(self, position_type, current_price, timestamp, current_capital, signals):
+        """Abre la posición con su stop loss y take profit"""
+        position = self.position_manager.open_position(
+            position_type=position_type,
+            entry_price=current_price,
+            entry_time=timestamp,
+            capital=current_capital,
+            signals=signals
+        )
+        # Añadir stop loss y take profit a la posición
+        direction = 1 if position_type == 'long' else -1
+        position['stop_loss_price'] = current_price * (1 - direction * self.position_manager.stop_loss_pct)
+        position['take_profit_price'] = current_price * (1 + direction * self.position_manager.take_profit_pct)
+        self._log(f"\n{'📈' if position_type == 'long' else '📉'} Abierta posición {position_type} a {current_price:.2f}")
+        self._log(f"🛑 Stop Loss: {position['stop_loss_price']:.2f}")
+        self._log(f"✅ Take Profit: {position['take_profit_price']:.2f}")
+        return position
+
+    def _close_position(self, exit_price, timestamp, exit_reason):
+        """Cierra la posición actual y retorna el trade"""
+        trade = self.position_manager.close_position(
+            exit_price=exit_price,
+            exit_time=timestamp,
+            exit_reason=exit_reason
+        )
+        self._log(f"\n📊 Cerrada posición {trade['type']} por {exit_reason} a {exit_price:.2f} (P&L: {trade['pnl']:.2f})")
+        return trade
+
+    def _run_bar_by_bar(self, timestamps, closes, trades, exit_indices):
+        """
+        Recorrido de referencia: evalúa señales y salidas vela a vela
+
+        Returns:
+            float: Capital final
         """
-        print("\n🔄 Ejecutando backtesting...")
-        
-        trades = []
-        price_data = {}
-        drawdown_data = {}
-        balance_history = {}
         current_capital = self.initial_capital
-        max_capital = current_capital
-        
-        # Registrar balance inicial
-        balance_history[self.start_date.isoformat()] = current_capital
-        
-        # Obtener timestamps únicos del primer timeframe
-        main_tf = self.timeframes[0]
-        if main_tf not in self.data:
-            raise ValueError(f"No hay datos disponibles para {main_tf}")
-        
-        timestamps = self.data[main_tf].index
-        
-        # Iterar sobre cada timestamp
-        for timestamp in timestamps:
-            current_price = self.data[main_tf].loc[timestamp, 'close']
+
+        profiler = self.profiler
+
+        for i, timestamp in enumerate(timestamps):
+            current_price = closes[i]
             
             # Si hay una posición abierta, verificar señales de salida
             if self.position_manager.get_current_position():
-                should_exit, exit_reason, _ = self.position_manager.check_exit_signals(current_price)
+                with profiler.stage('positions', rows=1):
+                    should_exit, exit_reason, _ = self.position_manager.check_exit_signals(current_price)
                 
                 if should_exit:
-                    trade = self.position_manager.close_position(
-                        exit_price=current_price,
-                        exit_time=timestamp,
-                        exit_reason=exit_reason
-                    )
-                    
+                    trade = self._close_position(current_price, timestamp, exit_reason)
                     trades.append(trade)
+                    exit_indices.append(i)
                     current_capital += trade['pnl']
-                    
-                    if current_capital > max_capital:
-                        max_capital = current_capital
-                    
-                    print(f"\n📊 Cerrada posición {trade['type']} por {exit_reason} a {current_price:.2f} (P&L: {trade['pnl']:.2f})")
                     continue
 
-            # Generar señales para cada timeframe
-            signals = []
-            for tf in self.timeframes:
-                if tf in self.data:
-                    df_slice = self.data[tf][self.data[tf].index <= timestamp].copy()
-                    if len(df_slice) >= 35:
-                        signal, strength = check_macd_signal(df_slice, tf)
-                        if signal:
-                            signals.append({
-                                'timestamp': timestamp,
-                                'timeframe': tf,
-                                'signal': signal,
-                                'strength': strength
-                            })
-                        
-                        # Guardar datos de precio y MACD
-                        if tf == main_tf:
-                            last_row = df_slice.iloc[-1]
-                            price_data[timestamp] = {
-                                'open': last_row['open'],
-                                'high': last_row['high'],
-                                'low': last_row['low'],
-                                'close': last_row['close'],
-                                'MACD_12_26_9': last_row['MACD_12_26_9'],
-                                'MACDs_12_26_9': last_row['MACDs_12_26_9'],
-                                'MACDh_12_26_9': last_row['MACDh_12_26_9']
-                            }
-            
             # Procesar señales de entrada
             if not self.position_manager.get_current_position():
-                for signal in signals:
-                    if signal['signal'] in ['buy', 'valley_buy']:
-                        position = self.position_manager.open_position(
-                            position_type='long',
-                            entry_price=current_price,
-                            entry_time=timestamp,
-                            capital=current_capital,
-                            signals=signals
-                        )
-                        # Añadir stop loss y take profit a la posición
-                        position['stop_loss_price'] = current_price * (1 - self.position_manager.stop_loss_pct)
-                        position['take_profit_price'] = current_price * (1 + self.position_manager.take_profit_pct)
-                        print(f"\n📈 Abierta posición long a {current_price:.2f}")
-                        print(f"🛑 Stop Loss: {position['stop_loss_price']:.2f}")
-                        print(f"✅ Take Profit: {position['take_profit_price']:.2f}")
-                        break
-                    elif signal['signal'] in ['sell', 'top_sell']:
-                        position = self.position_manager.open_position(
-                            position_type='short',
-                            entry_price=current_price,
-                            entry_time=timestamp,
-                            capital=current_capital,
-                            signals=signals
-                        )
-                        # Añadir stop loss y take profit a la posición
-                        position['stop_loss_price'] = current_price * (1 + self.position_manager.stop_loss_pct)
-                        position['take_profit_price'] = current_price * (1 - self.position_manager.take_profit_pct)
-                        print(f"\n📉 Abierta posición short a {current_price:.2f}")
-                        print(f"🛑 Stop Loss: {position['stop_loss_price']:.2f}")
-                        print(f"✅ Take Profit: {position['take_profit_price']:.2f}")
-                        break
-            
-            # Registrar balance actual
-            balance_history[timestamp.isoformat()] = current_capital
-            
-            # Calcular drawdown
-            if current_capital < max_capital:
-                drawdown = (max_capital - current_capital) / max_capital * 100
-            else:
-                drawdown = 0
-            drawdown_data[timestamp] = {'drawdown': drawdown}
+                with profiler.stage('signals', rows=1):
+                    signals = self._signals_at(i, timestamp)
+                    self._open_from_signals(signals, current_price, timestamp, current_capital)
+
+        return current_capital
+
+    def _run_precomputed(self, timestamps, closes, trades, exit_indices):
+        """
+        Recorrido con señales precalculadas que salta de la entrada a la salida
+
+        Mientras hay una posición abierta no se evalúan señales de entrada, así que
+        la vela de salida se busca de una vez con PositionManager.find_exit, con
+        las mismas operaciones que el recorrido vela a vela. Las etapas se miden
+        por tramo (búsqueda de entrada, búsqueda de salida), no por vela.
+
+        Returns:
+            float: Capital final
+        """
+        current_capital = self.initial_capital
+        n = len(timestamps)
+        i = 0
+
+        while i < n:
+            with self.profiler.stage('signals') as stage:
+                first = i
+                position = None
+                while i < n and position is None:
+                    if self._entry_bars is not None:
+                        # Decisión ponderada precalculada: saltar a la siguiente vela LONG o SHORT
+                        k = np.searchsorted(self._entry_bars, i)
+                        if k == len(self._entry_bars):
+                            i = n
+                            break
+                        i = int(self._entry_bars[k])
+                    timestamp = timestamps[i]
+                    signals = self._signals_at(i, timestamp)
+                    if self._entry_bars is not None:
+                        position_type = 'long' if self._directions[i] > 0 else 'short'
+                        position = self._open_position(position_type, closes[i], timestamp, current_capital, signals)
+                    else:
+                        position = self._open_from_signals(signals, closes[i], timestamp, current_capital)
+                    i += 1
+                stage.rows = i - first
+            if position is None:
+                break
+
+            with self.profiler.stage('positions') as stage:
+                exit_index, exit_reason = self.position_manager.find_exit(closes, start=i)
+                stage.rows = (exit_index + 1 if exit_index is not None else n) - i
+            if exit_index is None:
+                break
+
+            # En la vela de cierre no se buscan entradas, igual que en el recorrido vela a vela
+            trade = self._close_position(closes[exit_index], timestamps[exit_index], exit_reason)
+            trades.append(trade)
+            exit_indices.append(exit_index)
+            current_capital += trade['pnl']
+            i = exit_index + 1
+
+        return current_capital
+
+    def _build_series(self, trades, exit_indices):
+        """
+        Series por vela de la temporalidad principal como arrays contiguos
+
+        El balance solo cambia al cerrar una operación, así que se reconstruye con
+        la suma acumulada del P&L en las velas de salida.
+
+        Returns:
+            dict: {'timestamp': int64 en milisegundos, columnas de precio/MACD,
+                   'volume', 'buy_score'/'sell_score' (decisión ponderada),
+                   'balance', 'drawdown' (%)}
+        """
+        main_df = self.data[self.timeframes[0]]
+        n = len(main_df)
+
+        pnl = np.zeros(n)
+        if trades:
+            np.add.at(pnl, np.asarray(exit_indices), [t['pnl'] for t in trades])
+        balance = self.initial_capital + np.cumsum(pnl)
+        peak = np.maximum.accumulate(np.maximum(balance, self.initial_capital))
+        drawdown = (peak - balance) / peak * 100
+
+        series = {'timestamp': main_df.index.values.astype('datetime64[ms]').astype(np.int64)}
+        for col in self.price_columns + ['volume']:
+            if col in main_df.columns:
+                series[col] = main_df[col].to_numpy(dtype=np.float64)
+        if self.scores is not None:
+            series['buy_score'], series['sell_score'] = self.scores
+        series['balance'] = balance
+        series['drawdown'] = drawdown
+        return series
+
+    def run(self):
+        """
+        Ejecuta el backtesting y retorna los resultados
+
+        Las series por vela (precio, MACD, balance y drawdown) se retornan en
+        results['series'] como arrays de NumPy; ver series_to_frame.
+        Con el perfilado activado, results['profile'] contiene el tiempo, las
+        llamadas y las filas de cada etapa (ver utils/profiling.py).
+        En cada vela solo se usan las velas ya cerradas de las demás
+        temporalidades; el mapa queda en self.alignment (ver backtesting/alignment.py).
+        """
+        self._log("\n🔄 Ejecutando backtesting...")
+        
+        trades = []
+        exit_indices = []
+        
+        # Obtener timestamps únicos del primer timeframe
+        main_tf = self.timeframes[0]
+        if main_tf not in self.data:
+            raise ValueError(f"No hay datos disponibles para {main_tf}")
+        
+        timestamps = self.data[main_tf].index
+        closes = self.data[main_tf]['close'].to_numpy()
+        self.alignment = build_alignment(self.data, main_tf)
+        
+        if self.precompute_signals:
+            self._precompute_signals()
+            if self.entry_mode == 'weighted_score':
+                with self.profiler.stage('scores', rows=len(timestamps)):
+                    self.scores = score_series(self._signals, self.alignment, self._history, self.timeframe_weights)
+                    self._directions = weighted_decision(*self.scores, self.signal_threshold)
+                    self._entry_bars = np.flatnonzero(self._directions)
+            current_capital = self._run_precomputed(timestamps, closes, trades, exit_indices)
+        else:
+            current_capital = self._run_bar_by_bar(timestamps, closes, trades, exit_indices)
+        
+        with self.profiler.stage('series', rows=len(timestamps)):
+            series = self._build_series(trades, exit_indices)
         
         # Calcular estadísticas finales
-        winning_trades = len([t for t in trades if t['pnl'] > 0])
-        losing_trades = len([t for t in trades if t['pnl'] < 0])
-        total_trades = len(trades)
+        with self.profiler.stage('metrics', rows=len(trades)):
+            winning_trades = len([t for t in trades if t['pnl'] > 0])
+            losing_trades = len([t for t in trades if t['pnl'] < 0])
+            total_trades = len(trades)
         
-        results = {
-            'symbol': self.symbol,
-            'start_date': self.start_date.isoformat(),
-            'end_date': self.end_date.isoformat(),
-            'timeframes': self.timeframes,
-            'initial_capital': self.initial_capital,
-            'final_capital': current_capital,
-            'total_return': ((current_capital - self.initial_capital) / self.initial_capital) * 100,
-            'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
-            'win_rate': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
-            'max_drawdown': max(d['drawdown'] for d in drawdown_data.values()) if drawdown_data else 0,
-            'profit_factor': self._calculate_profit_factor(trades),
-            'trades': trades,
-            'price_data': price_data,
-            'drawdown': drawdown_data,
-            'balance_history': balance_history
-        }
+            results = {
+                'symbol': self.symbol,
+                'start_date': self.start_date.isoformat(),
+                'end_date': self.end_date.isoformat(),
+                'timeframes': self.timeframes,
+                'initial_capital': self.initial_capital,
+                'final_capital': current_capital,
+                'total_return': ((current_capital - self.initial_capital) / self.initial_capital) * 100,
+                'total_trades': total_trades,
+                'winning_trades': winning_trades,
+                'losing_trades': losing_trades,
+                'win_rate': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
+                'max_drawdown': float(series['drawdown'].max()) if len(series['drawdown']) else 0,
+                'profit_factor': self._calculate_profit_factor(trades),
+                'entry_mode': self.entry_mode,
+                'trades': trades,
+                'series': series
+            }
+
+        if self.profiler.enabled:
+            results['profile'] = self.profiler.summary()
         
         return results
     
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Simulación Monte Carlo de la secuencia de operaciones
+
+Un backtest da un único orden de operaciones y, con él, un único drawdown
+máximo. Aquí se generan miles de secuencias alternativas a partir de las
+operaciones de BacktestEngine.run, todas a la vez en matrices de NumPy
+(caminos x operaciones), y se resumen las distribuciones de capital final,
+drawdown máximo y riesgo de ruina.
+
+Métodos:
+- 'bootstrap': cada camino toma n operaciones con reemplazo
+- 'permutation': cada camino reordena las mismas n operaciones; con
+  interés compuesto el capital final es el mismo en todos los caminos y
+  solo cambia el drawdown
+
+Por defecto se remuestrea el retorno de cada operación sobre el capital
+previo y el capital se compone, como hace PositionManager al dimensionar
+cada posición con el capital disponible.
+"""
+
+import numpy as np
+
+MONTE_CARLO_METHODS = ('bootstrap', 'permutation')
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Elementos (caminos x operaciones) por bloque, para acotar la memoria
+_CHUNK_ELEMENTS = 4_000_000
+
+
+def trade_returns(pnl, initial_capital):
+    """
+    Retorno de cada operación sobre el capital que había antes de abrirla
+
+    Returns:
+        np.ndarray: pnl[i] / capital_antes[i]
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    capital_before = initial_capital + np.concatenate([[0.0], np.cumsum(pnl)[:-1]])
+    return pnl / capital_before
+
+
+def _sample(values, n_paths, method, rng):
+    """Matriz (n_paths, n) de valores remuestreados o permutados"""
+    if method == 'bootstrap':
+        return values[rng.integers(0, len(values), size=(n_paths, len(values)))]
+    return rng.permuted(np.broadcast_to(values, (n_paths, len(values))), axis=1)
+
+
+def _path_stats(steps, initial_capital, compound, ruin_capital):
+    """Capital final, drawdown máximo (%) y ruina de cada camino"""
+    if compound:
+        equity = initial_capital * np.cumprod(1.0 + steps, axis=1)
+    else:
+        equity = initial_capital + np.cumsum(steps, axis=1)
+
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_capital)
+    drawdown = ((peak - equity) / peak).max(axis=1) * 100
+    ruined = equity.min(axis=1) <= ruin_capital
+    return equity[:, -1], drawdown, ruined
+
+
+def _summary(values):
+    return {'mean': float(values.mean()), **{f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}}
+
+
+def run_monte_carlo(trades, initial_capital, n_paths=10000, method='bootstrap', compound=True,
+                    ruin_level=0.5, seed=None):
+    """
+    Distribuciones de capital final, drawdown máximo y riesgo de ruina
+
+    Args:
+        trades: Operaciones de BacktestEngine.run (diccionarios con 'pnl') o array de P&L
+        initial_capital: Capital inicial del backtest
+        n_paths: Número de secuencias simuladas
+        method: 'bootstrap' o 'permutation'
+        compound: Remuestrear retornos y componer el capital (True) o sumar P&L absolutos (False)
+        ruin_level: Fracción del capital inicial por debajo de la cual un camino se considera arruinado
+        seed: Semilla para reproducibilidad
+
+    Returns:
+        dict: {'final_capital', 'max_drawdown': arrays por camino,
+               'risk_of_ruin': fracción de caminos que tocan ruin_level,
+               'summary': {'final_capital', 'max_drawdown'} con media y percentiles,
+               'probability_of_loss', 'n_paths', 'n_trades', 'method'}
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Método desconocido: {method} (opciones: {', '.join(MONTE_CARLO_METHODS)})")
+
+    if isinstance(trades, (list, tuple)) and trades and isinstance(trades[0], dict):
+        trades = [t['pnl'] for t in trades]
+    pnl = np.asarray(trades, dtype=np.float64)
+    if len(pnl) == 0:
+        raise ValueError("No hay operaciones para simular")
+
+    values = trade_returns(pnl, initial_capital) if compound else pnl
+    rng = np.random.default_rng(seed)
+    ruin_capital = initial_capital * ruin_level
+
+    final_capital = np.empty(n_paths)
+    max_drawdown = np.empty(n_paths)
+    ruined = np.empty(n_paths, dtype=bool)
+    chunk = max(1, _CHUNK_ELEMENTS // len(pnl))
+    for start in range(0, n_paths, chunk):
+        stop = min(start + chunk, n_paths)
+        steps = _sample(values, stop - start, method, rng)
+        final_capital[start:stop], max_drawdown[start:stop], ruined[start:stop] = \
+            _path_stats(steps, initial_capital, compound, ruin_capital)
+
+    return {
+        'final_capital': final_capital,
+        'max_drawdown': max_drawdown,
+        'risk_of_ruin': float(ruined.mean()),
+        'probability_of_loss': float((final_capital < initial_capital).mean()),
+        'summary': {'final_capital': _summary(final_capital), 'max_drawdown': _summary(max_drawdown)},
+        'n_paths': n_paths,
+        'n_trades': len(pnl),
+        'method': method
+    }
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Backtest de una cartera de varios símbolos con capital compartido
+
+Cada símbolo se descarga y prepara por separado y en paralelo (son
+independientes): datos de todas sus temporalidades y señales MACD
+precalculadas sobre toda la serie. Después, en una sola pasada vectorizada,
+se obtiene la dirección de entrada de cada vela ('buy'/'valley_buy' = long,
+'sell'/'top_sell' = short, la primera temporalidad con señal de entrada
+manda, como en BacktestEngine) y se coloca en un índice de tiempo común,
+la unión de las velas principales de todos los símbolos.
+
+La simulación solo recorre las velas con alguna señal de entrada. Las
+salidas dependen solo del precio de cada símbolo, así que se buscan de una
+vez con PositionManager.find_exit al abrir la posición y se aplican en orden
+de tiempo antes de las entradas de la misma vela. Cada posición recibe
+capital / max_positions del capital realizado (sin superar el capital
+libre), y PositionManager aplica max_position_size sobre esa parte; con un
+solo símbolo y max_positions=1 el resultado es el de BacktestEngine.
+"""
+
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+
+from config import FETCH_MAX_WORKERS
+from risk_management.position_manager import PositionManager
+from .alignment import build_alignment
+from .engine import DEFAULT_MACD_PARAMS, load_historical_data, prepare_signal_frames
+
+LONG_SIGNALS = ('buy', 'valley_buy')
+SHORT_SIGNALS = ('sell', 'top_sell')
+
+# Velas mínimas de una temporalidad para que sus señales cuenten (igual que BacktestEngine)
+MIN_BARS = 35
+
+
+def entry_directions(frames, timeframes):
+    """
+    Dirección de entrada en cada vela de la temporalidad principal
+
+    Args:
+        frames: {timeframe: DataFrame con la columna 'signal'} de un símbolo
+        timeframes: Temporalidades en orden de prioridad (la primera es la principal)
+
+    Returns:
+        np.ndarray: int8 por vela principal: 1 long, -1 short, 0 sin entrada
+    """
+    alignment = build_alignment({tf: frames[tf] for tf in timeframes if tf in frames}, timeframes[0])
+    n = len(frames[timeframes[0]])
+    directions = np.zeros(n, dtype=np.int8)
+    undecided = np.ones(n, dtype=bool)
+
+    for tf in timeframes:
+        df = frames.get(tf)
+        if df is None:
+            continue
+        signals = df['signal'].to_numpy()
+        tf_directions = np.where(np.isin(signals, LONG_SIGNALS), 1, np.where(np.isin(signals, SHORT_SIGNALS), -1, 0))
+        # Última vela cerrada de la temporalidad, como en BacktestEngine
+        j = alignment[tf]
+        valid = (j >= 0) & (j + 1 + df.attrs.get('history_bars', 0) >= MIN_BARS)
+        mapped = np.zeros(n, dtype=np.int8)
+        mapped[valid] = tf_directions[j[valid]]
+
+        take = undecided & (mapped != 0)
+        directions[take] = mapped[take]
+        undecided &= ~take
+    return directions
+
+
+def _prepare_symbol(symbol, data, timeframes, macd_params):
+    """Señales precalculadas y direcciones de entrada de un símbolo"""
+    frames = prepare_signal_frames(data, macd_params)
+    main = frames[timeframes[0]]
+    return {
+        'index': main.index,
+        'closes': main['close'].to_numpy(dtype=np.float64),
+        'directions': entry_directions(frames, timeframes)
+    }
+
+
+def load_portfolio_data(symbols, start_date, end_date, timeframes, max_workers=None):
+    """
+    Descarga los datos de todos los símbolos en paralelo
+
+    Returns:
+        dict: {símbolo: {timeframe: DataFrame}} con los símbolos que tienen la temporalidad principal
+    """
+    max_workers = min(max_workers or FETCH_MAX_WORKERS, len(symbols))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {symbol: executor.submit(load_historical_data, symbol, start_date, end_date, timeframes, False)
+                   for symbol in symbols}
+        data = {symbol: future.result() for symbol, future in futures.items()}
+
+    for symbol in symbols:
+        if timeframes[0] not in data[symbol]:
+            print(f"⚠️ Sin datos de {timeframes[0]} para {symbol}; se excluye de la cartera")
+            del data[symbol]
+    return data
+
+
+class PortfolioBacktest:
+    """
+    Backtest de varios símbolos sobre un índice de tiempo común y un capital compartido
+    """
+
+    def __init__(self, symbols, start_date, end_date, initial_capital=1000.0, timeframes=None, risk_config=None,
+                 max_positions=None, data=None, macd_params=None, max_workers=None, verbose=True):
+        """
+        Args:
+            symbols: Lista de pares (ej. ['BTC/USDT', 'ETH/USDT'])
+            start_date, end_date: Periodo (datetime)
+            initial_capital: Capital compartido por todos los símbolos
+            timeframes: Temporalidades (la primera es la principal, por defecto ['4h'])
+            risk_config: Configuración de riesgo común a todos los símbolos (ver PositionManager)
+            max_positions: Posiciones abiertas a la vez como máximo (por defecto una por símbolo)
+            data: Datos ya descargados {símbolo: {timeframe: DataFrame OHLCV}} (opcional)
+            macd_params: Parámetros del MACD {'fast', 'slow', 'signal'}
+            max_workers: Hilos para descargar y preparar los símbolos
+            verbose: Imprimir el progreso
+        """
+        self.symbols = list(symbols)
+        self.start_date = start_date - timedelta(days=2)  # mismo margen que BacktestEngine para el MACD
+        self.end_date = end_date
+        self.initial_capital = initial_capital
+        self.timeframes = timeframes or ['4h']
+        self.risk_config = risk_config
+        self.max_positions = max_positions or len(self.symbols)
+        self.macd_params = {**DEFAULT_MACD_PARAMS, **(macd_params or {})}
+        self.max_workers = max_workers or FETCH_MAX_WORKERS
+        self.verbose = verbose
+
+        if data is None:
+            self._log(f"\n🔄 Descargando {len(self.symbols)} símbolos en paralelo...")
+            data = load_portfolio_data(self.symbols, self.start_date, self.end_date, self.timeframes, self.max_workers)
+        self.data = {symbol: {tf: df for tf, df in data[symbol].items()
+                              if tf in self.timeframes and df is not None and len(df) >= MIN_BARS}
+                     for symbol in self.symbols if symbol in data}
+        self.data = {symbol: frames for symbol, frames in self.data.items() if self.timeframes[0] in frames}
+        if not self.data:
+            raise ValueError(f"No se pudieron obtener datos históricos para {', '.join(self.symbols)}")
+        self.symbols = [symbol for symbol in self.symbols if symbol in self.data]
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _prepare(self):
+        """Señales de cada símbolo en paralelo y matriz de direcciones sobre el índice común"""
+        workers = min(self.max_workers, len(self.symbols))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {symbol: executor.submit(_prepare_symbol, symbol, self.data[symbol], self.timeframes,
+                                               self.macd_params)
+                       for symbol in self.symbols}
+            prepared = {symbol: future.result() for symbol, future in futures.items()}
+
+        index = prepared[self.symbols[0]]['index']
+        for symbol in self.symbols[1:]:
+            index = index.union(prepared[symbol]['index'])
+
+        # Posición de cada vela de cada símbolo en el índice común
+        for symbol in self.symbols:
+            prepared[symbol]['shared'] = index.get_indexer(prepared[symbol]['index'])
+        return index, prepared
+
+    def run(self):
+        """
+        Ejecuta el backtest de la cartera
+
+        Returns:
+            dict: Métricas como BacktestEngine.run, 'trades' con la columna 'symbol',
+                  'per_symbol' con operaciones y P&L de cada símbolo y 'series' con
+                  'timestamp' (ms), 'balance', 'drawdown' y 'open_positions' sobre el índice común
+        """
+        started = time.perf_counter()
+        index, prepared = self._prepare()
+        n = len(index)
+
+        # Entradas candidatas (vela común, orden del símbolo, vela propia, dirección) en orden de tiempo
+        candidates = []
+        for order, symbol in enumerate(self.symbols):
+            own = np.flatnonzero(prepared[symbol]['directions'])
+            candidates.append(np.column_stack([prepared[symbol]['shared'][own], np.full(len(own), order), own]))
+        candidates = np.concatenate(candidates)
+        candidates = candidates[np.lexsort((candidates[:, 1], candidates[:, 0]))]
+
+        managers = {symbol: PositionManager(self.risk_config) for symbol in self.symbols}
+        capital = self.initial_capital
+        committed = {}          # símbolo -> capital asignado a su posición abierta
+        busy_until = {}         # símbolo -> última vela propia ocupada (salida o fin de la serie)
+        pending_exits = []      # heap (vela común de salida, orden, símbolo, vela propia, razón)
+        trades = []
+        exit_positions = []
+        open_count = np.zeros(n + 1, dtype=np.int64)
+
+        def close(shared_i, symbol, own_i, reason):
+            nonlocal capital
+            trade = managers[symbol].close_position(
+                exit_price=prepared[symbol]['closes'][own_i],
+                exit_time=prepared[symbol]['index'][own_i],
+                exit_reason=reason
+            )
+            trade['symbol'] = symbol
+            trades.append(trade)
+            exit_positions.append(shared_i)
+            capital += trade['pnl']
+            del committed[symbol]
+
+        for shared_i, order, own_i in candidates:
+            # Salidas hasta esta vela, incluidas: liberan capital antes de las entradas
+            while pending_exits and pending_exits[0][0] <= shared_i:
+                exit_shared, _, exit_symbol, exit_own, reason = heapq.heappop(pending_exits)
+                close(exit_shared, exit_symbol, exit_own, reason)
+
+            symbol = self.symbols[order]
+            if busy_until.get(symbol, -1) >= own_i or len(committed) >= self.max_positions:
+                continue
+            allocation = min(capital / self.max_positions, capital - sum(committed.values()))
+            if allocation <= 0:
+                continue
+
+            info = prepared[symbol]
+            direction = info['directions'][own_i]
+            manager = managers[symbol]
+            manager.open_position('long' if direction > 0 else 'short', info['closes'][own_i],
+                                  info['index'][own_i], allocation)
+            committed[symbol] = allocation
+            open_count[shared_i] += 1
+
+            exit_own, reason = manager.find_exit(info['closes'], start=own_i + 1)
+            if exit_own is None:
+                busy_until[symbol] = len(info['closes'])  # sigue abierta al final, como en BacktestEngine
+            else:
+                busy_until[symbol] = exit_own
+                exit_shared = info['shared'][exit_own]
+                open_count[exit_shared] -= 1
+                heapq.heappush(pending_exits, (exit_shared, order, symbol, exit_own, reason))
+
+        while pending_exits:
+            exit_shared, _, exit_symbol, exit_own, reason = heapq.heappop(pending_exits)
+            close(exit_shared, exit_symbol, exit_own, reason)
+
+        # Balance realizado y posiciones abiertas sobre el índice común
+        pnl = np.zeros(n)
+        if trades:
+            np.add.at(pnl, np.asarray(exit_positions), [t['pnl'] for t in trades])
+        balance = self.initial_capital + np.cumsum(pnl)
+        peak = np.maximum.accumulate(np.maximum(balance, self.initial_capital))
+        drawdown = (peak - balance) / peak * 100
+
+        winning = [t for t in trades if t['pnl'] > 0]
+        losing = [t for t in trades if t['pnl'] < 0]
+        gross_loss = abs(sum(t['pnl'] for t in losing))
+        per_symbol = {}
+        for symbol in self.symbols:
+            symbol_trades = [t for t in trades if t['symbol'] == symbol]
+            wins = len([t for t in symbol_trades if t['pnl'] > 0])
+            per_symbol[symbol] = {
+                'trades': len(symbol_trades),
+                'pnl': sum(t['pnl'] for t in symbol_trades),
+                'win_rate': wins / len(symbol_trades) * 100 if symbol_trades else 0
+            }
+
+        self._log(f"✅ Cartera de {len(self.symbols)} símbolos, {n} velas y {len(trades)} operaciones "
+                  f"en {time.perf_counter() - started:.2f}s")
+        return {
+            'symbols': self.symbols,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'timeframes': self.timeframes,
+            'initial_capital': self.initial_capital,
+            'final_capital': capital,
+            'total_return': (capital - self.initial_capital) / self.initial_capital * 100,
+            'total_trades': len(trades),
+            'winning_trades': len(winning),
+            'losing_trades': len(losing),
+            'win_rate': len(winning) / len(trades) * 100 if trades else 0,
+            'max_drawdown': float(drawdown.max()) if n else 0,
+            'profit_factor': sum(t['pnl'] for t in winning) / gross_loss if gross_loss > 0 else float('inf'),
+            'max_positions': self.max_positions,
+            'per_symbol': per_symbol,
+            'trades': sorted(trades, key=lambda t: (t['exit_time'], self.symbols.index(t['symbol']))),
+            'series': {
+                'timestamp': index.values.astype('datetime64[ms]').astype(np.int64),
+                'balance': balance,
+                'drawdown': drawdown,
+                'open_positions': np.cumsum(open_count[:n])
+            }
+        }
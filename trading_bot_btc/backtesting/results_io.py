@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Formato binario de resultados de backtesting
+
+Cada resultado es un directorio con:
+- meta.json: métricas, configuración y descripción de las tablas (pocos KB)
+- series.npy: series por vela (timestamp en ms, precio, MACD, balance, drawdown)
+  como array estructurado que se puede abrir con memoria mapeada
+- trades.npy: una fila por operación
+- signals.npy: señales de entrada y salida de cada operación
+
+Así la aplicación puede leer las métricas sin cargar las series, y las series
+sin copiarlas a memoria.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+SERIES_FILE = 'series.npy'
+TRADES_FILE = 'trades.npy'
+SIGNALS_FILE = 'signals.npy'
+
+# Columnas de las operaciones que son fechas (se guardan como int64 en ms)
+TRADE_TIME_COLUMNS = ['entry_time', 'exit_time']
+SIGNAL_LIST_COLUMNS = ['entry_signals', 'exit_signals']
+
+
+def _to_json(obj):
+    """Convierte tipos de NumPy/pandas a tipos serializables en JSON"""
+    if isinstance(obj, (datetime, pd.Timestamp)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {str(k): _to_json(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_json(item) for item in obj]
+    return obj
+
+
+def _to_ms(values):
+    """Fechas (Timestamp, datetime, ISO) a int64 en milisegundos"""
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+
+
+def _frame_to_structured(df):
+    """DataFrame con columnas numéricas o de texto a array estructurado"""
+    dtype = []
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object:
+            # Columnas numéricas con valores ausentes (None) se guardan como float con NaN
+            numeric = pd.to_numeric(values, errors='coerce')
+            if numeric.notna().sum() == values.notna().sum() and values.notna().any():
+                values = numeric
+        if values.dtype == object:
+            text = values.fillna('').astype(str).to_numpy()
+            width = max(1, max((len(v) for v in text), default=1))
+            dtype.append((col, f'U{width}'))
+            columns.append(text)
+        elif values.dtype.kind in 'iub':
+            dtype.append((col, values.dtype.str))
+            columns.append(values.to_numpy())
+        else:
+            dtype.append((col, np.float64))
+            columns.append(values.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    table = np.empty(len(df), dtype=dtype)
+    for (name, _), values in zip(dtype, columns):
+        table[name] = values
+    return table
+
+
+def _series_to_structured(series):
+    """results['series'] (diccionario de arrays) a array estructurado"""
+    names = list(series)
+    dtype = [(name, np.int64 if name == 'timestamp' else np.float64) for name in names]
+    table = np.empty(len(series['timestamp']), dtype=dtype)
+    for name in names:
+        table[name] = series[name]
+    return table
+
+
+def _trades_tables(trades):
+    """Separa las operaciones en la tabla de operaciones y la de señales"""
+    rows = [{k: v for k, v in trade.items() if k not in SIGNAL_LIST_COLUMNS} for trade in trades]
+    trades_df = pd.DataFrame(rows)
+    for col in TRADE_TIME_COLUMNS:
+        if col in trades_df.columns:
+            trades_df[col] = _to_ms(trades_df[col])
+
+    signal_rows = []
+    for trade_index, trade in enumerate(trades):
+        for kind, key in (('entry', 'entry_signals'), ('exit', 'exit_signals')):
+            for signal in trade.get(key) or []:
+                signal_rows.append({
+                    'trade': trade_index,
+                    'kind': kind,
+                    'timestamp': signal.get('timestamp'),
+                    'timeframe': signal.get('timeframe'),
+                    'signal': signal.get('signal'),
+                    'strength': signal.get('strength')
+                })
+    signals_df = pd.DataFrame(signal_rows, columns=['trade', 'kind', 'timestamp', 'timeframe', 'signal', 'strength'])
+    signals_df['trade'] = signals_df['trade'].astype(np.int32)
+    signals_df['timestamp'] = _to_ms(signals_df['timestamp'])
+    return _frame_to_structured(trades_df), _frame_to_structured(signals_df)
+
+
+def save_results(results, path):
+    """
+    Guarda los resultados de un backtest en un directorio con formato binario
+
+    La escritura es atómica: se escribe en un directorio temporal que se
+    renombra al terminar.
+
+    Args:
+        results: Diccionario retornado por BacktestEngine.run (con 'series' y 'trades')
+        path: Directorio de destino
+
+    Returns:
+        str: Ruta del directorio creado
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    try:
+        series = results.get('series') or {'timestamp': np.empty(0, dtype=np.int64)}
+        np.save(os.path.join(tmp_path, SERIES_FILE), _series_to_structured(series))
+
+        trades_table, signals_table = _trades_tables(results.get('trades') or [])
+        np.save(os.path.join(tmp_path, TRADES_FILE), trades_table)
+        np.save(os.path.join(tmp_path, SIGNALS_FILE), signals_table)
+
+        meta = {k: v for k, v in results.items() if k not in ('series', 'trades')}
+        meta.update({
+            'format_version': FORMAT_VERSION,
+            'bars': len(series['timestamp']),
+            'series_columns': list(series),
+            'trade_columns': list(trades_table.dtype.names or [])
+        })
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump(_to_json(meta), f, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return path
+
+
+def list_results(results_dir):
+    """
+    Directorios de resultados de results_dir, del más reciente al más antiguo
+    """
+    if not os.path.isdir(results_dir):
+        return []
+    bundles = [os.path.join(results_dir, name) for name in os.listdir(results_dir)]
+    bundles = [path for path in bundles if os.path.isfile(os.path.join(path, META_FILE))]
+    return sorted(bundles, key=lambda path: os.path.getmtime(os.path.join(path, META_FILE)), reverse=True)
+
+
+def load_meta(path):
+    """Lee solo las métricas y la configuración de un resultado"""
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def load_series(path, mmap=True):
+    """
+    Lee las series por vela
+
+    Args:
+        mmap: Abrir el archivo con memoria mapeada en lugar de leerlo entero
+
+    Returns:
+        np.ndarray: Array estructurado; series['close'] es una vista sin copia
+    """
+    return np.load(os.path.join(path, SERIES_FILE), mmap_mode='r' if mmap else None)
+
+
+def load_trades(path):
+    """
+    Lee la tabla de operaciones
+
+    Returns:
+        DataFrame: Una fila por operación con entry_time y exit_time como fechas
+    """
+    trades_df = pd.DataFrame(np.load(os.path.join(path, TRADES_FILE)))
+    for col in TRADE_TIME_COLUMNS:
+        if col in trades_df.columns:
+            trades_df[col] = pd.to_datetime(trades_df[col], unit='ms')
+    return trades_df
+
+
+def load_signals(path):
+    """
+    Lee las señales de entrada y salida de cada operación
+
+    Returns:
+        DataFrame: Columnas trade, kind ('entry'/'exit'), timestamp, timeframe, signal, strength
+    """
+    signals_df = pd.DataFrame(np.load(os.path.join(path, SIGNALS_FILE)))
+    signals_df['timestamp'] = pd.to_datetime(signals_df['timestamp'], unit='ms')
+    return signals_df
+
+
+def load_results(path, mmap=True):
+    """
+    Lee un resultado completo con la misma forma que BacktestEngine.run
+
+    Returns:
+        dict: Métricas, 'series' (diccionario de arrays) y 'trades' (lista de diccionarios)
+    """
+    results = load_meta(path)
+    series = load_series(path, mmap=mmap)
+    results['series'] = {name: series[name] for name in series.dtype.names}
+
+    trades = load_trades(path).to_dict(orient='records')
+    for trade in trades:
+        trade['entry_signals'] = []
+        trade['exit_signals'] = []
+    for row in load_signals(path).to_dict(orient='records'):
+        trade_index = row.pop('trade')
+        kind = row.pop('kind')
+        trades[trade_index][f'{kind}_signals'].append(row)
+    results['trades'] = trades
+    return results
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Barrido de parámetros de riesgo y MACD sobre un pool de procesos
+
+Los datos se descargan una sola vez en el proceso principal y se entregan a
+cada proceso en su inicialización. Las configuraciones se ordenan por
+parámetros MACD y cada proceso calcula las señales de bloques de
+MACD_BATCH_SIZE variantes en una sola pasada (strategy/macd_batch.py), que
+reutiliza para todas las configuraciones de riesgo.
+"""
+
+import csv
+import itertools
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import pandas as pd
+
+from config import DEFAULT_RISK_CONFIG
+from strategy.macd_batch import batch_macd_signals
+from strategy.macd_strategy import SIGNAL_NAMES
+from .engine import BacktestEngine, DEFAULT_MACD_PARAMS, load_historical_data
+
+RISK_KEYS = ['stop_loss_pct', 'take_profit_pct', 'trailing_stop_pct', 'max_position_size']
+MACD_KEYS = ['fast', 'slow', 'signal']
+RESULT_KEYS = ['total_return', 'final_capital', 'max_drawdown', 'win_rate', 'profit_factor', 'total_trades']
+
+# Variantes MACD calculadas juntas por cada proceso (limita la memoria a K x velas por bloque)
+MACD_BATCH_SIZE = 32
+
+# Rejilla por defecto: 3 x 3 x 3 x 1 x 2 x 2 x 1 = 108 configuraciones
+DEFAULT_PARAM_GRID = {
+    'stop_loss_pct': [0.01, 0.02, 0.03],
+    'take_profit_pct': [0.02, 0.04, 0.06],
+    'trailing_stop_pct': [0.01, 0.015, 0.02],
+    'max_position_size': [0.95],
+    'fast': [8, 12],
+    'slow': [21, 26],
+    'signal': [9]
+}
+
+# Estado de cada proceso del pool
+_worker_state = {}
+
+
+def _param_range(values):
+    """(mínimo, máximo) si values es un rango (tupla o {'min', 'max'} leído de JSON), si no None"""
+    if isinstance(values, tuple):
+        return values
+    if isinstance(values, dict):
+        return values['min'], values['max']
+    return None
+
+
+def build_param_grid(grid=None):
+    """
+    Genera todas las combinaciones de una rejilla de parámetros
+
+    Args:
+        grid: Diccionario {parámetro: lista de valores} (por defecto DEFAULT_PARAM_GRID)
+
+    Returns:
+        list: Lista de diccionarios de parámetros
+    """
+    grid = grid or DEFAULT_PARAM_GRID
+    keys = list(grid)
+    ranges = [k for k in keys if _param_range(grid[k]) is not None]
+    if ranges:
+        raise ValueError(f"Los rangos ({', '.join(ranges)}) solo se pueden muestrear con sample_params")
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def sample_params(space=None, n_samples=100, seed=None):
+    """
+    Genera una muestra aleatoria de configuraciones
+
+    Args:
+        space: Diccionario {parámetro: lista de valores, tupla (mínimo, máximo) o {'min': ..., 'max': ...}};
+               un rango de enteros se muestrea entre enteros y uno con decimales de forma continua
+        n_samples: Número de configuraciones
+        seed: Semilla para reproducibilidad
+
+    Returns:
+        list: Lista de diccionarios de parámetros
+    """
+    space = space or DEFAULT_PARAM_GRID
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n_samples):
+        params = {}
+        for key, values in space.items():
+            bounds = _param_range(values)
+            if bounds is not None:
+                low, high = bounds
+                if isinstance(low, int) and isinstance(high, int):
+                    params[key] = rng.randint(low, high)
+                else:
+                    params[key] = rng.uniform(low, high)
+            else:
+                params[key] = rng.choice(values)
+        samples.append(params)
+    return samples
+
+
+def _split_params(params):
+    """Separa una configuración en (risk_config, macd_params)"""
+    risk_config = {**DEFAULT_RISK_CONFIG, **{k: params[k] for k in RISK_KEYS if k in params}}
+    macd_params = {**DEFAULT_MACD_PARAMS, **{k: params[k] for k in MACD_KEYS if k in params}}
+    return risk_config, macd_params
+
+
+def _macd_key(macd_params):
+    return tuple(macd_params[k] for k in MACD_KEYS)
+
+
+def _init_worker(data, symbol, start_date, end_date, timeframes, initial_capital, macd_keys):
+    """Guarda los datos compartidos (solo lectura) en el proceso"""
+    _worker_state.clear()
+    _worker_state.update({
+        'data': data,
+        'symbol': symbol,
+        'start_date': start_date,
+        'end_date': end_date,
+        'timeframes': timeframes,
+        'initial_capital': initial_capital,
+        'macd_keys': macd_keys,
+        'macd_positions': {key: i for i, key in enumerate(macd_keys)},
+        'block': None,
+        'frames_key': None,
+        'frames': None
+    })
+
+
+def _signal_frames(macd_key):
+    """
+    Datos con el MACD y las señales de una variante, calculados por bloques
+
+    Solo se conserva el bloque actual; como las configuraciones llegan
+    ordenadas por parámetros MACD, cada bloque se calcula una vez por proceso.
+    """
+    state = _worker_state
+    if state['frames_key'] == macd_key:
+        return state['frames']
+
+    block_id = state['macd_positions'][macd_key] // MACD_BATCH_SIZE
+    if state['block'] is None or state['block'][0] != block_id or macd_key not in state['block'][1]:
+        keys = state['macd_keys'][block_id * MACD_BATCH_SIZE:(block_id + 1) * MACD_BATCH_SIZE]
+        try:
+            batches = {tf: batch_macd_signals(df, keys, tf) for tf, df in state['data'].items()}
+        except Exception:
+            # Una variante inválida hace fallar todo el bloque: calcular solo la pedida
+            keys = [macd_key]
+            batches = {tf: batch_macd_signals(df, keys, tf) for tf, df in state['data'].items()}
+        state['block'] = (block_id, keys, batches)
+
+    _, keys, batches = state['block']
+    k = keys.index(macd_key)
+    frames = {}
+    for tf, df in state['data'].items():
+        batch, codes, strength = batches[tf]
+        frame = df.join(batch.frame(k))
+        frame['signal'] = SIGNAL_NAMES[codes[k]]
+        frame['strength'] = strength[k]
+        frame.attrs.update(df.attrs, macd_params=dict(zip(MACD_KEYS, macd_key)))
+        frames[tf] = frame
+
+    state['frames_key'] = macd_key
+    state['frames'] = frames
+    return frames
+
+
+def _run_config(params):
+    """Ejecuta un backtest con una configuración dentro de un proceso del pool"""
+    state = _worker_state
+    risk_config, macd_params = _split_params(params)
+
+    row = dict(params)
+    try:
+        # Las señales dependen solo de los parámetros MACD
+        frames = _signal_frames(_macd_key(macd_params))
+        engine = BacktestEngine(
+            symbol=state['symbol'],
+            start_date=state['start_date'],
+            end_date=state['end_date'],
+            initial_capital=state['initial_capital'],
+            timeframes=state['timeframes'],
+            risk_config=risk_config,
+            data=frames,
+            macd_params=macd_params,
+            verbose=False
+        )
+        results = engine.run()
+        row.update({key: results[key] for key in RESULT_KEYS})
+        row['error'] = None
+    except Exception as e:
+        row.update({key: None for key in RESULT_KEYS})
+        row['error'] = str(e)
+    return row
+
+
+def run_sweep(symbol, start_date, end_date, param_sets, timeframes=None, initial_capital=1000.0,
+              processes=None, rank_by='total_return', output_path=None, data=None):
+    """
+    Ejecuta un backtest por cada configuración repartiendo el trabajo en un pool de procesos
+
+    Args:
+        symbol: Par de trading (ej. 'BTC/USDT')
+        start_date: Fecha de inicio (datetime)
+        end_date: Fecha de fin (datetime)
+        param_sets: Lista de configuraciones (ver build_param_grid y sample_params)
+        timeframes: Lista de temporalidades (por defecto ['1h'])
+        initial_capital: Capital inicial de cada backtest
+        processes: Número de procesos (por defecto os.cpu_count())
+        rank_by: Métrica para ordenar la tabla de resultados
+        output_path: CSV donde se escribe cada resultado en cuanto termina (opcional)
+        data: Datos ya descargados {timeframe: DataFrame OHLCV} (opcional)
+
+    Returns:
+        DataFrame: Una fila por configuración, ordenada de mejor a peor según rank_by
+    """
+    timeframes = timeframes or ['1h']
+    processes = processes or os.cpu_count() or 1
+
+    # Descargar los datos una sola vez, con el mismo margen que usa BacktestEngine
+    if data is None:
+        data = load_historical_data(symbol, start_date - pd.Timedelta(days=2), end_date, timeframes)
+    if not data:
+        raise ValueError(f"No se pudieron obtener datos históricos para {symbol}")
+
+    # Ordenar por parámetros MACD para que cada bloque de señales se calcule una sola vez
+    param_sets = sorted(param_sets, key=lambda params: _macd_key(_split_params(params)[1]))
+    macd_keys = sorted({_macd_key(_split_params(params)[1]) for params in param_sets})
+
+    print(f"\n🔄 Barrido de {len(param_sets)} configuraciones en {processes} procesos")
+    started = time.perf_counter()
+    rows = []
+
+    csv_file = None
+    writer = None
+    if output_path:
+        csv_file = open(output_path, 'w', newline='')
+        fieldnames = sorted({k for params in param_sets for k in params}) + RESULT_KEYS + ['error']
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+
+    try:
+        initargs = (data, symbol, start_date, end_date, timeframes, initial_capital, macd_keys)
+        chunksize = max(1, len(param_sets) // (processes * 8))
+        with Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            for row in pool.imap_unordered(_run_config, param_sets, chunksize=chunksize):
+                rows.append(row)
+                if writer:
+                    writer.writerow(row)
+                    csv_file.flush()
+                if len(rows) % max(1, len(param_sets) // 10) == 0:
+                    print(f"📊 {len(rows)}/{len(param_sets)} configuraciones ({time.perf_counter() - started:.1f}s)")
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    table = pd.DataFrame(rows)
+    # El drawdown es mejor cuanto menor; el resto de métricas cuanto mayor
+    ascending = rank_by == 'max_drawdown'
+    table = table.sort_values(rank_by, ascending=ascending, na_position='last').reset_index(drop=True)
+    print(f"✅ Barrido completado en {time.perf_counter() - started:.1f}s")
+    return table
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Optimización walk-forward de parámetros de riesgo y MACD
+
+La historia se divide en ventanas consecutivas de entrenamiento y prueba
+(móviles o ancladas al inicio). En cada ventana de entrenamiento se prueban
+todas las configuraciones y la mejor según `rank_by` se evalúa en la ventana
+de prueba siguiente; las curvas de capital fuera de muestra se encadenan
+(cada ventana empieza con el capital final de la anterior).
+
+Los datos se descargan una sola vez y las señales de cada variante MACD se
+calculan una sola vez sobre toda la serie (con el mismo pool y los mismos
+bloques que backtesting/sweep.py); cada ventana solo recorta esas series
+precalculadas, así que el coste de los indicadores no crece con el número
+de ventanas. Los backtests de entrenamiento de todas las ventanas se
+reparten juntos en el pool de procesos.
+"""
+
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from .alignment import closed_bar_index
+from .engine import BacktestEngine, load_historical_data, prepare_signal_frames
+from .sweep import RESULT_KEYS, _init_worker, _macd_key, _signal_frames, _split_params, _worker_state
+
+
+def build_folds(start_date, end_date, train_period, test_period, step=None, anchored=False):
+    """
+    Ventanas de entrenamiento y prueba
+
+    Args:
+        start_date: Inicio del primer entrenamiento
+        end_date: Fin de la última prueba (la última ventana de prueba puede ser más corta)
+        train_period: Duración del entrenamiento (pd.Timedelta, timedelta o '180D')
+        test_period: Duración de cada prueba
+        step: Avance entre ventanas (por defecto test_period: pruebas contiguas)
+        anchored: Si es True el entrenamiento empieza siempre en start_date
+
+    Returns:
+        list: [{'fold', 'train_start', 'train_end', 'test_start', 'test_end'}] con
+              extremos incluidos (train_end es justo antes de test_start)
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    train_period = pd.Timedelta(train_period)
+    test_period = pd.Timedelta(test_period)
+    step = pd.Timedelta(step) if step is not None else test_period
+    if train_period <= pd.Timedelta(0) or test_period <= pd.Timedelta(0) or step <= pd.Timedelta(0):
+        raise ValueError("Las duraciones de entrenamiento, prueba y avance deben ser positivas")
+
+    folds = []
+    test_start = start_date + train_period
+    while test_start < end_date:
+        train_start = start_date if anchored else test_start - train_period
+        folds.append({
+            'fold': len(folds),
+            'train_start': train_start.to_pydatetime(),
+            'train_end': (test_start - pd.Timedelta(1, 'ms')).to_pydatetime(),
+            'test_start': test_start.to_pydatetime(),
+            'test_end': min(test_start + test_period - pd.Timedelta(1, 'ms'), end_date).to_pydatetime()
+        })
+        test_start += step
+    return folds
+
+
+def slice_frames(frames, main_tf, start, end):
+    """
+    Recorta las temporalidades a [start, end] sin recalcular indicadores
+
+    La temporalidad principal se recorta exactamente; las demás empiezan en
+    la última vela cerrada en la primera vela del recorte (ver alignment.py). df.attrs['history_bars'] guarda las
+    velas anteriores al recorte para que BacktestEngine no las trate como
+    el inicio de la serie.
+    """
+    if main_tf not in frames:
+        raise ValueError(f"No hay datos disponibles para {main_tf}")
+    main_index = frames[main_tf].index
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    main_lo = main_index.searchsorted(start, side='left')
+    sliced = {}
+    for tf, df in frames.items():
+        if tf == main_tf:
+            lo = main_lo
+        elif main_lo < len(main_index):
+            lo = max(int(closed_bar_index(main_index[main_lo:main_lo + 1], main_tf, df.index, tf)[0]), 0)
+        else:
+            lo = len(df)
+        hi = df.index.searchsorted(end, side='right')
+        frame = df.iloc[lo:hi]
+        frame.attrs['history_bars'] = lo
+        sliced[tf] = frame
+    return sliced
+
+
+def _run_window(frames, symbol, timeframes, start, end, initial_capital, risk_config, macd_params):
+    engine = BacktestEngine(
+        symbol=symbol,
+        start_date=start,
+        end_date=end,
+        initial_capital=initial_capital,
+        timeframes=timeframes,
+        risk_config=risk_config,
+        data=slice_frames(frames, timeframes[0], start, end),
+        macd_params=macd_params,
+        verbose=False
+    )
+    return engine.run()
+
+
+def _init_walk_forward_worker(data, symbol, timeframes, initial_capital, macd_keys, folds):
+    _init_worker(data, symbol, None, None, timeframes, initial_capital, macd_keys)
+    _worker_state['folds'] = folds
+
+
+def _run_train(task):
+    """Backtest de una configuración en la ventana de entrenamiento de un fold"""
+    fold_id, params = task
+    state = _worker_state
+    fold = state['folds'][fold_id]
+    risk_config, macd_params = _split_params(params)
+
+    row = {'fold': fold_id, **params}
+    try:
+        frames = _signal_frames(_macd_key(macd_params))
+        results = _run_window(frames, state['symbol'], state['timeframes'], fold['train_start'], fold['train_end'],
+                              state['initial_capital'], risk_config, macd_params)
+        row.update({key: results[key] for key in RESULT_KEYS})
+        row['error'] = None
+    except Exception as e:
+        row.update({key: None for key in RESULT_KEYS})
+        row['error'] = str(e)
+    return row
+
+
+def _best_params(rows, param_keys, rank_by):
+    """Configuración con mejor `rank_by` entre las que terminaron sin error"""
+    valid = [row for row in rows if row['error'] is None and row[rank_by] is not None]
+    if not valid:
+        return None
+    # El drawdown es mejor cuanto menor; el resto de métricas cuanto mayor
+    sign = 1 if rank_by == 'max_drawdown' else -1
+    best = min(valid, key=lambda row: sign * row[rank_by])
+    return {key: best[key] for key in param_keys}
+
+
+def run_walk_forward(symbol, start_date, end_date, param_sets, train_period, test_period, step=None,
+                     anchored=False, timeframes=None, initial_capital=1000.0, processes=None,
+                     rank_by='total_return', data=None):
+    """
+    Ejecuta la optimización walk-forward
+
+    Args:
+        symbol: Par de trading (ej. 'BTC/USDT')
+        start_date: Inicio del primer entrenamiento (datetime)
+        end_date: Fin de la última prueba (datetime)
+        param_sets: Configuraciones candidatas (ver sweep.build_param_grid y sweep.sample_params)
+        train_period, test_period, step, anchored: Ventanas (ver build_folds)
+        timeframes: Lista de temporalidades (por defecto ['1h'])
+        initial_capital: Capital inicial del primer fold fuera de muestra
+        processes: Número de procesos (por defecto os.cpu_count())
+        rank_by: Métrica de entrenamiento con la que se elige la configuración
+        data: Datos ya descargados {timeframe: DataFrame OHLCV} (opcional)
+
+    Returns:
+        dict: {'folds': una fila por fold (ventanas, parámetros elegidos, métrica de
+               entrenamiento y resultados de prueba), 'train_results': DataFrame con
+               todos los backtests de entrenamiento, 'trades': operaciones fuera de
+               muestra con su fold, 'series': {'timestamp', 'close', 'balance',
+               'drawdown'} encadenadas, y las métricas fuera de muestra
+               (final_capital, total_return, max_drawdown, win_rate, total_trades)}
+
+    Las posiciones abiertas al final de una ventana de prueba no se cuentan,
+    igual que al final de un backtest normal.
+    """
+    timeframes = timeframes or ['1h']
+    processes = processes or os.cpu_count() or 1
+    folds = build_folds(start_date, end_date, train_period, test_period, step, anchored)
+    if not folds:
+        raise ValueError("El rango no alcanza para una ventana de entrenamiento y otra de prueba")
+
+    # Descargar los datos una sola vez, con el mismo margen que usa BacktestEngine
+    if data is None:
+        data = load_historical_data(symbol, pd.Timestamp(start_date) - pd.Timedelta(days=2), end_date, timeframes)
+    if not data:
+        raise ValueError(f"No se pudieron obtener datos históricos para {symbol}")
+
+    param_keys = sorted({k for params in param_sets for k in params})
+    # Ordenar por parámetros MACD para que cada bloque de señales se calcule una sola vez por proceso
+    tasks = sorted(((fold['fold'], params) for fold in folds for params in param_sets),
+                   key=lambda task: (_macd_key(_split_params(task[1])[1]), task[0]))
+    macd_keys = sorted({_macd_key(_split_params(params)[1]) for params in param_sets})
+
+    print(f"\n🔄 Walk-forward: {len(folds)} ventanas x {len(param_sets)} configuraciones en {processes} procesos")
+    started = time.perf_counter()
+    rows = []
+    initargs = (data, symbol, timeframes, initial_capital, macd_keys, folds)
+    chunksize = max(1, len(tasks) // (processes * 8))
+    with Pool(processes, initializer=_init_walk_forward_worker, initargs=initargs) as pool:
+        for row in pool.imap_unordered(_run_train, tasks, chunksize=chunksize):
+            rows.append(row)
+            if len(rows) % max(1, len(tasks) // 10) == 0:
+                print(f"📊 {len(rows)}/{len(tasks)} backtests de entrenamiento ({time.perf_counter() - started:.1f}s)")
+    train_results = pd.DataFrame(rows).sort_values(['fold'] + param_keys).reset_index(drop=True)
+
+    # Pruebas fuera de muestra encadenadas, en orden; señales calculadas una vez por variante MACD
+    signal_frames = {}
+    capital = initial_capital
+    fold_rows = []
+    trades = []
+    pieces = []
+    for fold in folds:
+        best = _best_params([row for row in rows if row['fold'] == fold['fold']], param_keys, rank_by)
+        fold_row = dict(fold, params=best, train_metric=None, test_return=None, test_trades=0,
+                        test_max_drawdown=None, start_capital=capital, end_capital=capital)
+        if best is None:
+            print(f"⚠️ Ventana {fold['fold']}: ningún backtest de entrenamiento terminó sin error")
+            fold_rows.append(fold_row)
+            continue
+
+        fold_row['train_metric'] = next(row[rank_by] for row in rows if row['fold'] == fold['fold']
+                                        and all(row[k] == best[k] for k in param_keys))
+        risk_config, macd_params = _split_params(best)
+        key = _macd_key(macd_params)
+        if key not in signal_frames:
+            signal_frames[key] = prepare_signal_frames(data, macd_params)
+
+        try:
+            results = _run_window(signal_frames[key], symbol, timeframes, fold['test_start'], fold['test_end'],
+                                  capital, risk_config, macd_params)
+        except ValueError as e:
+            print(f"⚠️ Ventana {fold['fold']}: sin datos de prueba ({e})")
+            fold_rows.append(fold_row)
+            continue
+
+        trades.extend({**trade, 'fold': fold['fold']} for trade in results['trades'])
+        series = results['series']
+        pieces.append({col: series[col] for col in ('timestamp', 'close', 'balance')})
+        fold_row.update(test_return=results['total_return'], test_trades=results['total_trades'],
+                        test_max_drawdown=results['max_drawdown'], end_capital=results['final_capital'])
+        capital = results['final_capital']
+        fold_rows.append(fold_row)
+
+    series = {col: np.concatenate([piece[col] for piece in pieces]) if pieces else np.empty(0)
+              for col in ('timestamp', 'close', 'balance')}
+    peak = np.maximum.accumulate(np.maximum(series['balance'], initial_capital)) if pieces else np.empty(0)
+    series['drawdown'] = (peak - series['balance']) / peak * 100 if pieces else np.empty(0)
+
+    winning = len([t for t in trades if t['pnl'] > 0])
+    print(f"✅ Walk-forward completado en {time.perf_counter() - started:.1f}s")
+    return {
+        'symbol': symbol,
+        'timeframes': timeframes,
+        'initial_capital': initial_capital,
+        'final_capital': capital,
+        'total_return': (capital - initial_capital) / initial_capital * 100,
+        'total_trades': len(trades),
+        'win_rate': winning / len(trades) * 100 if trades else 0,
+        'max_drawdown': float(series['drawdown'].max()) if len(series['drawdown']) else 0,
+        'rank_by': rank_by,
+        'folds': fold_rows,
+        'train_results': train_results,
+        'trades': trades,
+        'series': series
+    }
@@ -7,6 +7,8 @@ Created on Thu Apr 10 22:56:53 2025
 
 # config.py
 
+import os
+
 # Temporalidades y pesos asignados usando secuencia Fibonacci
 # 1, 2, 3, 5, 8, 13
 TIMEFRAMES = {
@@ -28,3 +30,64 @@ SIGNAL_WEIGHTS = {
 
 SYMBOL = 'BTC/USDT'
 SIGNAL_THRESHOLD = 2.0  # umbral mínimo para dar señal
+
+# Exchange usado para descargar datos (id de ccxt, o 'fake' para el exchange local de utils/fake_exchange.py)
+EXCHANGE_ID = os.environ.get('EXCHANGE_ID', 'binance')
+
+# Exchange falso: velas 'synthetic' o 'store' (grabadas en CANDLE_STORE_DIR), latencia en segundos
+# ('0.05' o un rango '0.02,0.1'), velas por página, probabilidad de error y peticiones por minuto (0 = sin límite)
+FAKE_EXCHANGE_SOURCE = os.environ.get('FAKE_EXCHANGE_SOURCE', 'synthetic')
+FAKE_EXCHANGE_LATENCY = os.environ.get('FAKE_EXCHANGE_LATENCY', '0')
+FAKE_EXCHANGE_PAGE_SIZE = int(os.environ.get('FAKE_EXCHANGE_PAGE_SIZE', '1000'))
+FAKE_EXCHANGE_ERROR_RATE = float(os.environ.get('FAKE_EXCHANGE_ERROR_RATE', '0'))
+FAKE_EXCHANGE_RATE_LIMIT = int(os.environ.get('FAKE_EXCHANGE_RATE_LIMIT', '0'))
+
+# Origen de las velas: 'exchange' o 'synthetic' (utils/synthetic_data.py, sin conexión)
+DATA_SOURCE = os.environ.get('DATA_SOURCE', 'exchange')
+SYNTHETIC_MODE = os.environ.get('SYNTHETIC_MODE', 'gbm')  # 'gbm', 'regime' o 'stochastic_vol'
+SYNTHETIC_SEED = int(os.environ.get('SYNTHETIC_SEED', '42'))
+
+# Construir las temporalidades superiores a partir de una única descarga base
+DERIVE_TIMEFRAMES = True
+BASE_TIMEFRAME = '15m'
+# Sin fechas, velas base máximas de la descarga común; las temporalidades que necesiten más
+# (ej. 1000 velas de 4h, 1d o 3d desde 15m) se descargan directamente
+DERIVE_MAX_BASE_CANDLES = 5000
+
+# Número máximo de peticiones simultáneas al exchange
+FETCH_MAX_WORKERS = 8
+
+# Planificador de peticiones (utils/request_scheduler.py): peso máximo por minuto de cada
+# exchange (0 = sin límite), peso de cada llamada (por defecto 1) y reintentos con espera exponencial
+REQUEST_WEIGHT_LIMITS = {
+    'binance': 6000,
+    'fake': FAKE_EXCHANGE_RATE_LIMIT
+}
+REQUEST_WEIGHTS = {
+    'binance': {'fetch_ohlcv': 2, 'fetch_order_book': 5}
+}
+REQUEST_BURST_SECONDS = 5.0
+REQUEST_MAX_RETRIES = 5
+REQUEST_BACKOFF_BASE = 0.5  # segundos
+REQUEST_BACKOFF_MAX = 30.0
+
+# Configuración de riesgo por defecto para los backtests
+DEFAULT_RISK_CONFIG = {
+    'stop_loss_pct': 0.02,      # 2% stop loss
+    'take_profit_pct': 0.04,    # 4% take profit
+    'trailing_stop_pct': 0.015,  # 1.5% trailing stop
+    'max_position_size': 0.95    # 95% del capital
+}
+
+# Almacén local de velas (OHLCV) usado por get_price_data
+CANDLE_STORE_ENABLED = True
+CANDLE_STORE_DIR = os.environ.get(
+    'CANDLE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'candles')
+)
+
+# Número máximo de indicadores guardados en la caché en memoria (strategy/indicator_cache.py)
+INDICATOR_CACHE_SIZE = 64
+
+# Medición de tiempo por etapa en backtests y en el bucle en vivo (utils/profiling.py)
+PROFILE_STAGES = os.environ.get('PROFILE_STAGES', '0') == '1'
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Script para cargar en el almacén de velas los archivos públicos de Binance
+
+Los archivos se descargan de https://data.binance.vision (por ejemplo
+data/spot/monthly/klines/BTCUSDT/1m/BTCUSDT-1m-2023-01.zip) a un directorio
+local; este script los lee, valida y guarda en CANDLE_STORE_DIR.
+
+Uso:
+    python ingest_klines.py descargas/ [--symbol BTCUSDT] [--timeframe 1m] [--allow-gaps]
+"""
+
+import argparse
+import sys
+import time
+
+from utils.candle_store import CandleStore, get_candle_store
+from utils.kline_archive import ArchiveError, find_archives, ingest_archives
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Carga de archivos de velas de Binance en el almacén local")
+    parser.add_argument('directory', help="Directorio con los .zip/.csv (se recorre con subdirectorios)")
+    parser.add_argument('--symbol', help="Cargar solo este símbolo (ej. BTCUSDT)")
+    parser.add_argument('--timeframe', help="Cargar solo esta temporalidad (ej. 1m)")
+    parser.add_argument('--store-dir', help="Directorio del almacén (por defecto CANDLE_STORE_DIR)")
+    parser.add_argument('--allow-gaps', action='store_true',
+                        help="Cargar aunque falten archivos o no sean contiguos con el almacén")
+    parser.add_argument('--no-verify', action='store_true', help="No comprobar los archivos .CHECKSUM")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    archives = find_archives(args.directory, args.symbol, args.timeframe)
+    if not archives:
+        print(f"❌ No hay archivos de velas de Binance en {args.directory}")
+        return 2
+
+    store = CandleStore(args.store_dir) if args.store_dir else get_candle_store()
+    failed = False
+    for (symbol, timeframe), files in sorted(archives.items()):
+        print(f"\n📥 {symbol} {timeframe}: {len(files)} archivos ({files[0][1]['period']} → {files[-1][1]['period']})")
+        started = time.perf_counter()
+        try:
+            report = ingest_archives(files, symbol, timeframe, store=store,
+                                     allow_gaps=args.allow_gaps, verify=not args.no_verify)
+        except ArchiveError as e:
+            print(f"❌ {symbol} {timeframe}: {e}")
+            failed = True
+            continue
+
+        elapsed = time.perf_counter() - started
+        rate = report['rows'] / elapsed if elapsed > 0 else 0
+        print(f"✅ {report['rows']:,} velas en {elapsed:.1f}s ({rate:,.0f} velas/s)")
+        if report['gaps']:
+            missing = sum(gap[2] for gap in report['gaps'])
+            print(f"⚠️  {len(report['gaps'])} huecos del exchange ({missing:,} velas sin datos)")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,10 +5,10 @@ Created on Thu Apr 10 23:58:34 2025
 @author: OMEN Laptop
 """
 
-import pandas_ta as ta
+from strategy.indicator_cache import macd as cached_macd
 
 def interpretar_macd(df, tf):
-    macd = ta.macd(df['close'])
+    macd = cached_macd(df)
     df = df.join(macd)
     latest = df.iloc[-1]
     
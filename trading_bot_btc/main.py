@@ -5,13 +5,17 @@ Created on Thu Apr 10 22:45:04 2025
 @author: OMEN Laptop
 """
 
-from config import TIMEFRAMES, SYMBOL, SIGNAL_THRESHOLD
-from utils.api_data import get_price_data, get_orderbook_summary
+from config import TIMEFRAMES, SYMBOL, SIGNAL_THRESHOLD, FETCH_MAX_WORKERS, DERIVE_TIMEFRAMES
+from utils.api_data import get_price_data, get_orderbook_summary, get_multi_timeframe_data
+from utils.exchange_client import get_exchange
 from strategy.macd_strategy import check_macd_signal
+from strategy.weighted_score import signal_contribution, weighted_decision
 from visual.macd_plot import plot_macd_chart
 from macd_utils import interpretar_macd
 from utils.telegram_notifications import TelegramNotifier
+from utils.profiling import get_profiler
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 # Cargar variables de entorno
@@ -20,16 +24,69 @@ load_dotenv()
 # Inicializar notificador de Telegram
 notifier = TelegramNotifier()
 
-# Pesos base por tipo de señal
-SIGNAL_WEIGHTS = {
-    'buy': 1.0,
-    'sell': 1.0,
-    'valley_buy': 1.5,
-    'top_sell': 1.5,
-    'hold': 0.0
-}
+def fetch_market_data(symbol, timeframes, max_workers=FETCH_MAX_WORKERS):
+    """
+    Descarga en paralelo las velas de todas las temporalidades y el orderbook
 
-def evaluate_multi_timeframe(symbol):
+    El número de peticiones simultáneas está acotado por max_workers para no
+    superar el límite de peticiones del exchange. Con DERIVE_TIMEFRAMES solo se
+    descarga la temporalidad base y el resto se construye localmente.
+
+    Los errores se devuelven en lugar de lanzarse, para que cada temporalidad
+    se evalúe por separado; una temporalidad sin velas se devuelve como ValueError.
+
+    Returns:
+        tuple: ({timeframe: DataFrame o excepción}, orderbook o excepción)
+    """
+    # Crear el cliente compartido y cargar sus mercados antes de lanzar las peticiones
+    try:
+        get_exchange()
+    except Exception as e:
+        return {tf: e for tf in timeframes}, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if DERIVE_TIMEFRAMES:
+            derived_future = executor.submit(get_multi_timeframe_data, symbol, timeframes)
+        else:
+            candle_futures = {tf: executor.submit(get_price_data, symbol, tf) for tf in timeframes}
+        book_future = executor.submit(get_orderbook_summary, symbol)
+
+        candles = {}
+        if DERIVE_TIMEFRAMES:
+            try:
+                candles = derived_future.result()
+            except Exception as e:
+                candles = {tf: e for tf in timeframes}
+        else:
+            for tf, future in candle_futures.items():
+                try:
+                    candles[tf] = future.result()
+                except Exception as e:
+                    candles[tf] = e
+
+        try:
+            book = book_future.result()
+        except Exception as e:
+            book = e
+
+    # get_price_data informa de sus errores y devuelve un DataFrame vacío
+    for tf, df in candles.items():
+        if not isinstance(df, Exception) and df.empty:
+            candles[tf] = ValueError(f"Sin velas de {tf} para {symbol}")
+
+    return candles, book
+
+def evaluate_multi_timeframe(symbol, profile=None):
+    """
+    Evalúa las señales MACD de todas las temporalidades y decide LONG, SHORT o WAIT
+
+    Args:
+        symbol: Par de trading
+        profile: Medir e imprimir el tiempo de cada etapa (True, False, un
+                 StageProfiler cuyo summary() se puede leer después, o None
+                 para config.PROFILE_STAGES)
+    """
+    profiler = get_profiler(profile)
     peso_buy = 0
     peso_sell = 0
     resumen = []
@@ -39,38 +96,48 @@ def evaluate_multi_timeframe(symbol):
     os.makedirs(output_dir, exist_ok=True)
 
     try:
+        # Todas las peticiones al exchange se lanzan a la vez
+        with profiler.stage('fetch') as stage:
+            candles, book = fetch_market_data(symbol, list(TIMEFRAMES))
+            stage.rows = sum(len(df) for df in candles.values() if not isinstance(df, Exception))
+
         for tf, peso_tf in TIMEFRAMES.items():
             try:
-                df = get_price_data(symbol, tf)
-                interpretar_macd(df, tf)  # Interpretación del MACD
-                signal, strength = check_macd_signal(df, timeframe=tf)  # Ahora recibimos también la fuerza
+                df = candles[tf]
+                if isinstance(df, Exception):
+                    raise df
+                with profiler.stage('indicators', rows=len(df)):
+                    interpretar_macd(df, tf)  # Interpretación del MACD
+                with profiler.stage('signals', rows=len(df)):
+                    signal, strength = check_macd_signal(df, timeframe=tf)  # Ahora recibimos también la fuerza
 
                 # El peso final es el producto de:
-                # - Peso base del tipo de señal
+                # - Peso base del tipo de señal (config.SIGNAL_WEIGHTS)
                 # - Peso de la temporalidad
                 # - Fuerza de la señal
-                peso_signal = SIGNAL_WEIGHTS.get(signal, 0) * strength
+                # La misma regla se backtestea con BacktestEngine(entry_mode='weighted_score')
+                tf_buy, tf_sell = signal_contribution(signal, strength, peso_tf)
+                peso_buy += tf_buy
+                peso_sell += tf_sell
+                peso_final = tf_buy + tf_sell
 
-                if signal in ['buy', 'valley_buy']:
-                    peso_buy += peso_tf * peso_signal
-                elif signal in ['sell', 'top_sell']:
-                    peso_sell += peso_tf * peso_signal
-
-                resumen.append(f"{tf}: {signal} (fuerza: {strength:.2f}, peso final: {peso_tf * peso_signal:.2f})")
+                resumen.append(f"{tf}: {signal} (fuerza: {strength:.2f}, peso final: {peso_final:.2f})")
                 
                 # Enviar notificación de señal individual
                 if signal != 'hold':
-                    notifier.send_trade_signal(
-                        timeframe=tf,
-                        signal=signal,
-                        strength=strength,
-                        price=df['close'].iloc[-1],
-                        additional_info=f"Peso de la señal: {peso_tf * peso_signal:.2f}"
-                    )
+                    with profiler.stage('notifications'):
+                        notifier.send_trade_signal(
+                            timeframe=tf,
+                            signal=signal,
+                            strength=strength,
+                            price=df['close'].iloc[-1],
+                            additional_info=f"Peso de la señal: {peso_final:.2f}"
+                        )
                 
                 # Guardar imagen del gráfico
                 output_file = os.path.join(output_dir, f"macd_{tf}.png")
-                plot_macd_chart(df, timeframe=tf, output_path=output_file)
+                with profiler.stage('charts', rows=len(df)):
+                    plot_macd_chart(df, timeframe=tf, output_path=output_file)
 
             except Exception as e:
                 error_msg = f"{tf}: ERROR - {e}"
@@ -85,26 +152,24 @@ def evaluate_multi_timeframe(symbol):
         print(f"\nTOTAL Peso BUY: {peso_buy:.2f} | SELL: {peso_sell:.2f}")
 
         # Decisión final con umbrales ajustados
-        if peso_buy - peso_sell >= SIGNAL_THRESHOLD:
-            decision = "📈 LONG"
-        elif peso_sell - peso_buy >= SIGNAL_THRESHOLD:
-            decision = "📉 SHORT"
-        else:
-            decision = "⏳ WAIT"
+        decision = {1: "📈 LONG", -1: "📉 SHORT", 0: "⏳ WAIT"}[weighted_decision(peso_buy, peso_sell, SIGNAL_THRESHOLD)]
 
         print(f"\n📊 DECISIÓN FINAL: {decision}")
         
-        # Obtener información del orderbook para el resumen
-        book = get_orderbook_summary(symbol)
+        # Información del orderbook para el resumen
+        if isinstance(book, Exception):
+            raise book
         
         # Enviar resumen final
-        notifier.send_summary(
-            peso_buy=peso_buy,
-            peso_sell=peso_sell,
-            decision=decision,
-            orderbook=book
-        )
+        with profiler.stage('notifications'):
+            notifier.send_summary(
+                peso_buy=peso_buy,
+                peso_sell=peso_sell,
+                decision=decision,
+                orderbook=book
+            )
         
+        profiler.print_summary(f"Tiempo por etapa de la evaluación de {symbol}")
         return decision
 
     except Exception as e:
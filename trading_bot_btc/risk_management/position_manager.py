@@ -2,6 +2,74 @@
 Módulo para gestión de riesgo y manejo de posiciones
 """
 
+import numpy as np
+
+def find_first_exit(position_type, entry_price, prices, stop_loss_pct, take_profit_pct, trailing_stop_pct,
+                    extreme_price=None, start=0, window=256):
+    """
+    Busca la primera vela en la que salta el stop loss, el take profit o el trailing stop
+
+    Aplica las mismas reglas y la misma prioridad que check_exit_signals vela a vela
+    (stop loss, después take profit, después trailing stop), usando el máximo (long)
+    o mínimo (short) acumulado para el trailing stop. Recorre los precios en
+    ventanas crecientes para no procesar toda la serie en posiciones cortas.
+
+    Args:
+        position_type: 'long' o 'short'
+        entry_price: Precio de entrada
+        prices: Array de precios de cierre
+        stop_loss_pct, take_profit_pct, trailing_stop_pct: Porcentajes de salida
+        extreme_price: Máximo (long) o mínimo (short) alcanzado hasta ahora (por defecto entry_price)
+        start: Índice desde el que buscar
+        window: Tamaño de la primera ventana
+
+    Returns:
+        tuple: (índice, razón, extremo) o (None, None, extremo) si no hay salida
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    extreme = entry_price if extreme_price is None else extreme_price
+    n = len(prices)
+
+    if position_type == 'long':
+        stop_price = entry_price * (1 - stop_loss_pct)
+        take_profit_price = entry_price * (1 + take_profit_pct)
+    else:  # short
+        stop_price = entry_price * (1 + stop_loss_pct)
+        take_profit_price = entry_price * (1 - take_profit_pct)
+
+    i = start
+    while i < n:
+        chunk = prices[i:i + window]
+        if position_type == 'long':
+            running = np.maximum(np.maximum.accumulate(chunk), extreme)
+            trailing = running * (1 - trailing_stop_pct)
+            stop_hit = chunk <= stop_price
+            take_profit_hit = chunk >= take_profit_price
+            trailing_hit = chunk <= trailing
+        else:  # short
+            running = np.minimum(np.minimum.accumulate(chunk), extreme)
+            trailing = running * (1 + trailing_stop_pct)
+            stop_hit = chunk >= stop_price
+            take_profit_hit = chunk <= take_profit_price
+            trailing_hit = chunk >= trailing
+
+        hits = stop_hit | take_profit_hit | trailing_hit
+        if hits.any():
+            k = int(np.argmax(hits))
+            if stop_hit[k]:
+                reason = 'stop_loss'
+            elif take_profit_hit[k]:
+                reason = 'take_profit'
+            else:
+                reason = 'trailing_stop'
+            return i + k, reason, running[k]
+
+        extreme = running[-1]
+        i += len(chunk)
+        window *= 2
+
+    return None, None, extreme
+
 class PositionManager:
     def __init__(self, config=None):
         """
@@ -101,6 +169,39 @@ class PositionManager:
             
         return False, None, None
     
+    def find_exit(self, prices, start=0):
+        """
+        Busca de una vez la vela de salida de la posición actual
+
+        Equivale a llamar a check_exit_signals sobre prices[start], prices[start + 1], ...
+        hasta la primera salida, y deja la posición en el mismo estado.
+
+        Returns:
+            tuple: (índice, razón) o (None, None) si la posición sigue abierta al final
+        """
+        if not self.current_position:
+            return None, None
+
+        position_type = self.current_position['type']
+        extreme_key = 'highest_price' if position_type == 'long' else 'lowest_price'
+        index, reason, extreme = find_first_exit(
+            position_type,
+            self.current_position['entry_price'],
+            prices,
+            self.stop_loss_pct,
+            self.take_profit_pct,
+            self.trailing_stop_pct,
+            extreme_price=self.current_position[extreme_key],
+            start=start
+        )
+
+        # Actualizar máximos/mínimos y trailing stop como lo haría el recorrido vela a vela
+        if extreme != self.current_position[extreme_key]:
+            self.current_position[extreme_key] = extreme
+            self.current_position['trailing_stop'] = self._calculate_trailing_stop(position_type, extreme)
+
+        return index, reason
+
     def _check_stop_loss(self, current_price):
         """Verifica si se ha alcanzado el stop loss"""
         if self.current_position['type'] == 'long':
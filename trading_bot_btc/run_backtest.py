@@ -4,14 +4,17 @@ Script para ejecutar backtesting de la estrategia MACD
 """
 
 import os
-import json
 from datetime import datetime, timedelta
 import tempfile
 from backtesting.engine import BacktestEngine
+from backtesting.results_io import save_results
+from config import DEFAULT_RISK_CONFIG, TIMEFRAMES
+from utils.profiling import get_profiler
 import numpy as np
 import pandas as pd
 
-def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capital=1000.0, timeframes=None, risk_config=None):
+def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capital=1000.0, timeframes=None, risk_config=None, profile=None,
+                 entry_mode='first_signal'):
     """
     Ejecuta el backtesting para un período específico
     
@@ -20,24 +23,25 @@ def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capi
         start_date: Fecha de inicio (datetime)
         end_date: Fecha de fin (datetime)
         initial_capital: Capital inicial para la simulación (por defecto 1000.0)
-        timeframes: Lista de temporalidades a analizar (por defecto ['4h'])
+        timeframes: Lista de temporalidades a analizar (por defecto ['4h'], o todas las
+                    de config.TIMEFRAMES con entry_mode='weighted_score')
         risk_config: Diccionario con configuración de gestión de riesgo (por defecto None)
+        profile: Medir e imprimir el tiempo de cada etapa (por defecto config.PROFILE_STAGES);
+                 las medidas se guardan en results['profile']
+        entry_mode: 'first_signal' o 'weighted_score' (decisión ponderada del bot en vivo)
     """
+    profiler = get_profiler(profile)
+
     # Valores por defecto
     if start_date is None:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30)
     
     if timeframes is None:
-        timeframes = ['4h']
+        timeframes = list(TIMEFRAMES) if entry_mode == 'weighted_score' else ['4h']
     
     # Configuración de riesgo por defecto
-    default_risk_config = {
-        'stop_loss_pct': 0.02,      # 2% stop loss
-        'take_profit_pct': 0.04,    # 4% take profit
-        'trailing_stop_pct': 0.015,  # 1.5% trailing stop
-        'max_position_size': 0.95    # 95% del capital
-    }
+    default_risk_config = dict(DEFAULT_RISK_CONFIG)
     
     # Combinar configuración por defecto con la proporcionada
     if risk_config:
@@ -48,6 +52,8 @@ def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capi
     print(f"📅 Período: {start_date.strftime('%Y-%m-%d')} a {end_date.strftime('%Y-%m-%d')}")
     print(f"💰 Capital inicial: ${initial_capital:,.2f}")
     print(f"⏰ Timeframes: {', '.join(timeframes)}")
+    if entry_mode == 'weighted_score':
+        print("⚖️ Entradas por decisión ponderada multi-temporalidad")
     print("\n📊 Configuración de riesgo:")
     print(f"🛑 Stop Loss: {risk_config['stop_loss_pct']*100:.1f}%")
     print(f"✅ Take Profit: {risk_config['take_profit_pct']*100:.1f}%")
@@ -65,7 +71,9 @@ def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capi
         end_date=end_date,
         initial_capital=initial_capital,
         timeframes=timeframes,
-        risk_config=risk_config
+        risk_config=risk_config,
+        profile=profiler,
+        entry_mode=entry_mode
     )
     
     results = engine.run()
@@ -74,43 +82,16 @@ def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capi
     if 'symbol' not in results:
         results['symbol'] = symbol
     
-    # Convertir todos los valores no serializables a strings
-    def convert_to_serializable(obj):
-        if isinstance(obj, (datetime, np.datetime64, pd.Timestamp)):
-            return obj.isoformat()
-        if isinstance(obj, (np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, pd.Index):
-            return list(obj)
-        if isinstance(obj, pd.DataFrame):
-            return obj.to_dict(orient='records')
-        if isinstance(obj, pd.Series):
-            return obj.to_dict()
-        if isinstance(obj, dict):
-            return {str(k): convert_to_serializable(v) for k, v in obj.items()}
-        if isinstance(obj, (list, tuple)):
-            return [convert_to_serializable(item) for item in obj]
-        if pd.isna(obj):
-            return None
-        return obj
-
-    # Procesar resultados para asegurar que son serializables
-    serializable_results = convert_to_serializable(results)
-    
-    # Asegurarse de que las fechas estén en formato ISO
-    if 'start_date' in serializable_results:
-        serializable_results['start_date'] = start_date.isoformat()
-    if 'end_date' in serializable_results:
-        serializable_results['end_date'] = end_date.isoformat()
+    # Fechas del período solicitado (sin el margen para el MACD)
+    results['start_date'] = start_date.isoformat()
+    results['end_date'] = end_date.isoformat()
     
     # Añadir configuración de riesgo a los resultados
-    serializable_results['risk_config'] = risk_config
+    results['risk_config'] = risk_config
     
     # Añadir información adicional a los trades
-    if 'trades' in serializable_results:
-        for trade in serializable_results['trades']:
+    with profiler.stage('enrich_trades', rows=len(results.get('trades', []))):
+        for trade in results['trades']:
             # Calcular stop loss y take profit
             entry_price = trade['entry_price']
             if trade['type'] == 'long':
@@ -125,36 +106,37 @@ def run_backtest(symbol='BTC/USDT', start_date=None, end_date=None, initial_capi
             # Añadir timeframe
             trade['timeframe'] = timeframes[0]
             
-            # Añadir información de MACD si está disponible en price_data
-            if 'price_data' in results:
-                entry_time = pd.to_datetime(trade['entry_time'])
-                exit_time = pd.to_datetime(trade['exit_time'])
-                
-                if entry_time in results['price_data']:
-                    entry_data = results['price_data'][entry_time]
-                    trade['entry_macd'] = entry_data.get('MACD_12_26_9')
-                    trade['entry_macd_signal'] = entry_data.get('MACDs_12_26_9')
-                    trade['entry_macd_hist'] = entry_data.get('MACDh_12_26_9')
-                
-                if exit_time in results['price_data']:
-                    exit_data = results['price_data'][exit_time]
-                    trade['exit_macd'] = exit_data.get('MACD_12_26_9')
-                    trade['exit_macd_signal'] = exit_data.get('MACDs_12_26_9')
-                    trade['exit_macd_hist'] = exit_data.get('MACDh_12_26_9')
+            # Añadir información de MACD de las velas de entrada y salida
+            if 'series' in results:
+                series = results['series']
+                macd_cols = [col for col in series if col.startswith('MACD')]
+                for prefix, time_key in (('entry', 'entry_time'), ('exit', 'exit_time')):
+                    ts = pd.Timestamp(trade[time_key]).value // 1_000_000
+                    idx = np.searchsorted(series['timestamp'], ts)
+                    if idx < len(series['timestamp']) and series['timestamp'][idx] == ts:
+                        for col, name in zip(macd_cols, ('macd', 'macd_signal', 'macd_hist')):
+                            value = series[col][idx]
+                            trade[f'{prefix}_{name}'] = None if np.isnan(value) else float(value)
     
     # Guardar resultados
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     symbol_clean = symbol.replace('/', '_')
     timeframe_str = '_'.join(timeframes)  # Incluir temporalidad en el nombre del archivo
-    results_file = os.path.join(results_dir, f"backtest_{symbol_clean}_{timeframe_str}_{timestamp}.json")
-    
-    with open(results_file, 'w') as f:
-        json.dump(serializable_results, f, indent=4)
+    results_path = os.path.join(results_dir, f"backtest_{symbol_clean}_{timeframe_str}_{timestamp}")
+    if profiler.enabled:
+        # El perfil guardado en meta.json no incluye la propia escritura
+        results['profile'] = profiler.summary()
+    with profiler.stage('save_results', rows=len(results['series']['timestamp'])):
+        save_results(results, results_path)
     
     print(f"\n✅ Backtesting completado")
-    print(f"📁 Resultados guardados en: {results_file}")
+    print(f"📁 Resultados guardados en: {results_path}")
+    
+    if profiler.enabled:
+        results['profile'] = profiler.summary()
+        profiler.print_summary(f"Tiempo por etapa del backtest de {symbol}")
     
-    return serializable_results
+    return results
 
 if __name__ == "__main__":
     run_backtest() 
\ No newline at end of file
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de carga de datos, indicadores, motor, métricas y serialización
+
+Mide el tiempo (mejor de varias repeticiones) y el pico de memoria
+(tracemalloc, en una ejecución aparte) de cada caso con varios tamaños de
+entrada. `record` guarda las medidas en un archivo de referencia y `compare`
+vuelve a medir y marca las regresiones que superan el umbral.
+
+Los datos son sintéticos y deterministas (utils/synthetic_data.py), y el
+exchange es el exchange local falso (utils/fake_exchange.py): no se hace ninguna petición de red.
+
+Uso:
+    python run_benchmarks.py record [--sizes 10000,100000] [--output benchmark_baseline.json]
+    python run_benchmarks.py compare [--baseline benchmark_baseline.json] [--threshold 0.2]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import EXCHANGE_ID
+from backtesting.engine import BacktestEngine
+from backtesting.metrics import calculate_statistics
+from backtesting.results_io import load_results, save_results
+from risk_management.position_manager import PositionManager
+from strategy import indicator_cache
+from strategy.macd_strategy import check_macd_signal, compute_macd_signals
+from utils import candle_store
+from utils.api_data import get_price_data
+from utils.exchange_client import reset_exchanges, set_exchange
+from utils.fake_exchange import FakeExchange
+from utils.synthetic_data import SyntheticMarket, generate_ohlcv
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_SIZES = [10000, 100000]
+DEFAULT_THRESHOLD = 0.2
+# Diferencias menores que esto se consideran ruido aunque superen el umbral relativo
+MIN_DELTA_SECONDS = 0.005
+MIN_DELTA_MB = 1.0
+
+BENCH_SYMBOL = 'BENCH/USDT'
+BENCH_TIMEFRAME = '15m'
+# Stops tan amplios que la posición no se cierra: se recorre toda la serie
+WIDE_RISK_CONFIG = {'stop_loss_pct': 0.99, 'take_profit_pct': 1000.0, 'trailing_stop_pct': 0.99}
+
+
+def _bench_range(size):
+    """(start_date, end_date) de las primeras `size` velas de la rejilla sintética (fechas UTC)"""
+    market = SyntheticMarket(BENCH_SYMBOL, BENCH_TIMEFRAME, 'gbm', seed=0)
+    start = pd.Timestamp(market.first_ts, unit='ms')
+    end = pd.Timestamp(market.first_ts + (size - 1) * market.tf_ms, unit='ms')
+    return start, end
+
+
+def _candles(size):
+    return generate_ohlcv(size, BENCH_TIMEFRAME, mode='gbm', seed=0, symbol=BENCH_SYMBOL)
+
+
+def _engine(df):
+    return BacktestEngine(
+        symbol=BENCH_SYMBOL,
+        start_date=df.index[0].to_pydatetime(),
+        end_date=df.index[-1].to_pydatetime(),
+        timeframes=[BENCH_TIMEFRAME],
+        data={BENCH_TIMEFRAME: df},
+        verbose=False
+    )
+
+
+# Cada caso recibe el tamaño y un directorio temporal y retorna la función a
+# medir; la preparación no se mide
+
+def bench_fetch_exchange(size, workdir):
+    """get_price_data paginando contra el exchange falso, sin almacén local"""
+    start, end = _bench_range(size)
+    return lambda: get_price_data(BENCH_SYMBOL, BENCH_TIMEFRAME, start, end, use_cache=False, source='exchange')
+
+
+def bench_fetch_store(size, workdir):
+    """get_price_data leyendo del almacén de velas en disco (ya poblado)"""
+    start, end = _bench_range(size)
+    get_price_data(BENCH_SYMBOL, BENCH_TIMEFRAME, start, end, use_cache=True, source='exchange')
+    return lambda: get_price_data(BENCH_SYMBOL, BENCH_TIMEFRAME, start, end, use_cache=True, source='exchange')
+
+
+def bench_check_macd_signal(size, workdir):
+    """check_macd_signal sobre la serie completa, sin caché de indicadores"""
+    df = _candles(size)
+
+    def run():
+        indicator_cache.clear_indicator_cache()
+        return check_macd_signal(df, BENCH_TIMEFRAME)
+    return run
+
+
+def bench_compute_macd_signals(size, workdir):
+    """Señales de todas las velas de una vez"""
+    df = _candles(size)
+    return lambda: compute_macd_signals(df, BENCH_TIMEFRAME)
+
+
+def bench_engine_run(size, workdir):
+    """Construcción del motor (MACD incluido) y BacktestEngine.run"""
+    df = _candles(size)
+    return lambda: _engine(df).run()
+
+
+def bench_exit_scan(size, workdir):
+    """PositionManager.find_exit sobre toda la serie"""
+    closes = _candles(size)['close'].to_numpy()
+
+    def run():
+        manager = PositionManager(WIDE_RISK_CONFIG)
+        manager.open_position('long', closes[0], None, 1000.0)
+        return manager.find_exit(closes)
+    return run
+
+
+def bench_exit_loop(size, workdir):
+    """PositionManager.check_exit_signals vela a vela sobre toda la serie"""
+    closes = _candles(size)['close'].tolist()
+
+    def run():
+        manager = PositionManager(WIDE_RISK_CONFIG)
+        manager.open_position('long', closes[0], None, 1000.0)
+        for price in closes:
+            manager.check_exit_signals(price)
+    return run
+
+
+def bench_metrics(size, workdir):
+    """calculate_statistics con una operación cada 10 velas"""
+    rng = np.random.default_rng(0)
+    trades = [{'pnl': float(pnl)} for pnl in rng.normal(0.5, 10.0, max(1, size // 10))]
+    final_capital = 1000.0 + sum(t['pnl'] for t in trades)
+    return lambda: calculate_statistics(trades, 1000.0, final_capital)
+
+
+def bench_results_io(size, workdir):
+    """save_results y load_results de los resultados de un backtest"""
+    results = _engine(_candles(size)).run()
+
+    def run():
+        path = save_results(results, os.path.join(workdir, f'results_{size}'))
+        return load_results(path, mmap=False)
+    return run
+
+
+BENCHMARKS = {
+    'fetch_exchange': bench_fetch_exchange,
+    'fetch_store': bench_fetch_store,
+    'check_macd_signal': bench_check_macd_signal,
+    'compute_macd_signals': bench_compute_macd_signals,
+    'engine_run': bench_engine_run,
+    'exit_scan': bench_exit_scan,
+    'exit_loop': bench_exit_loop,
+    'metrics': bench_metrics,
+    'results_io': bench_results_io
+}
+
+
+def measure(func, repeat):
+    """
+    Mide una función (su salida por pantalla se descarta)
+
+    Returns:
+        dict: {'seconds': mejor tiempo, 'peak_mb': pico de memoria asignada}
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        func()  # calentamiento
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+
+        # La memoria se mide aparte porque tracemalloc ralentiza la ejecución
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': min(times), 'peak_mb': peak / (1024 * 1024)}
+
+
+def run_benchmarks(names, sizes, repeat=5):
+    """
+    Ejecuta los benchmarks en un entorno aislado (exchange falso y almacén temporal)
+
+    Returns:
+        dict: {'nombre[tamaño]': {'seconds', 'peak_mb'}}
+    """
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    previous_store = candle_store._default_store
+    candle_store._default_store = candle_store.CandleStore(os.path.join(workdir, 'candles'))
+    set_exchange(EXCHANGE_ID, FakeExchange(synthetic_mode='gbm', seed=0))
+
+    results = {}
+    try:
+        for name in names:
+            for size in sizes:
+                key = f"{name}[{size}]"
+                results[key] = measure(BENCHMARKS[name](size, workdir), repeat)
+                print(f"⏱️  {key:<32} {results[key]['seconds'] * 1000:>10.1f} ms {results[key]['peak_mb']:>10.1f} MB")
+    finally:
+        candle_store._default_store = previous_store
+        reset_exchanges()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def environment_info():
+    """Versiones y máquina, para saber si dos referencias son comparables"""
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compara dos conjuntos de medidas
+
+    Returns:
+        list: Filas (clave, métrica, referencia, actual, cambio relativo, regresión)
+    """
+    rows = []
+    for key, measured in current.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, min_delta in (('seconds', MIN_DELTA_SECONDS), ('peak_mb', MIN_DELTA_MB)):
+            before, after = reference[metric], measured[metric]
+            change = (after - before) / before if before > 0 else 0.0
+            regression = change > threshold and after - before > min_delta
+            rows.append((key, metric, before, after, change, regression))
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks del bot con referencia guardada")
+    parser.add_argument('command', choices=['record', 'compare'], help="Guardar una referencia o compararse con ella")
+    parser.add_argument('--sizes', help="Tamaños en velas separados por comas (por defecto los de la referencia o 10000,100000)")
+    parser.add_argument('--only', help="Benchmarks a ejecutar separados por comas (por defecto todos)")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeticiones por medida (se guarda la mejor)")
+    parser.add_argument('--output', default=DEFAULT_BASELINE, help="Archivo donde guardar la referencia (record)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Referencia con la que comparar (compare)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Empeoramiento relativo a partir del cual hay regresión (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Benchmarks desconocidos: {', '.join(unknown)} (opciones: {', '.join(BENCHMARKS)})")
+        return 2
+
+    if args.command == 'record':
+        sizes = [int(s) for s in args.sizes.split(',')] if args.sizes else DEFAULT_SIZES
+        results = run_benchmarks(names, sizes, args.repeat)
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment_info(), 'sizes': sizes, 'results': results}, f, indent=2)
+        print(f"\n💾 Referencia guardada en {args.output}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"❌ No existe la referencia {args.baseline}; ejecuta primero 'record'")
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    sizes = [int(s) for s in args.sizes.split(',')] if args.sizes else baseline['sizes']
+    current = run_benchmarks(names, sizes, args.repeat)
+    rows = compare_results(baseline['results'], current, args.threshold)
+
+    print(f"\n📊 Comparación con {args.baseline} ({baseline['environment']['date']})")
+    print(f"{'benchmark':<32} {'métrica':<8} {'referencia':>12} {'actual':>12} {'cambio':>9}")
+    for key, metric, before, after, change, regression in rows:
+        mark = '  ❌' if regression else ''
+        print(f"{key:<32} {metric:<8} {before:>12.4f} {after:>12.4f} {change:>+8.1%}{mark}")
+
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresiones por encima del {args.threshold:.0%}")
+        return 1
+    print(f"\n✅ Sin regresiones por encima del {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Script para ejecutar el backtest de una cartera de varios símbolos con capital compartido
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from backtesting.portfolio import PortfolioBacktest
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest de cartera multi-símbolo")
+    parser.add_argument('--symbols', default='BTC/USDT,ETH/USDT,SOL/USDT,XRP/USDT',
+                        help="Pares separados por comas")
+    parser.add_argument('--start', help="Fecha de inicio (YYYY-MM-DD, por defecto hace un año)")
+    parser.add_argument('--end', help="Fecha de fin (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument('--timeframes', default='4h', help="Temporalidades separadas por comas (la primera es la principal)")
+    parser.add_argument('--capital', type=float, default=1000.0, help="Capital inicial compartido")
+    parser.add_argument('--max-positions', type=int, default=None,
+                        help="Posiciones abiertas a la vez como máximo (por defecto una por símbolo)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    end_date = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    start_date = datetime.strptime(args.start, '%Y-%m-%d') if args.start else end_date - timedelta(days=365)
+
+    portfolio = PortfolioBacktest(
+        symbols=[s.strip() for s in args.symbols.split(',') if s.strip()],
+        start_date=start_date,
+        end_date=end_date,
+        initial_capital=args.capital,
+        timeframes=[tf.strip() for tf in args.timeframes.split(',')],
+        max_positions=args.max_positions
+    )
+    results = portfolio.run()
+
+    per_symbol = pd.DataFrame([{
+        'símbolo': symbol,
+        'operaciones': stats['trades'],
+        'P&L': round(stats['pnl'], 2),
+        'win rate (%)': round(stats['win_rate'], 2)
+    } for symbol, stats in results['per_symbol'].items()])
+    print("\n📋 Por símbolo:")
+    print(per_symbol.to_string(index=False))
+
+    print(f"\n💵 Capital final: ${results['final_capital']:,.2f}")
+    print(f"📈 Retorno total: {results['total_return']:.2f}%")
+    print(f"📉 Máximo drawdown: {results['max_drawdown']:.2f}%")
+    print(f"🔄 Operaciones: {results['total_trades']} (win rate {results['win_rate']:.2f}%)")
+    print(f"📊 Posiciones simultáneas: máximo {int(results['series']['open_positions'].max())} "
+          f"de {results['max_positions']}")
+
+if __name__ == "__main__":
+    main()
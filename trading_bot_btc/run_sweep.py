@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Script para ejecutar un barrido de parámetros de riesgo y MACD
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from backtesting.sweep import run_sweep, build_param_grid, sample_params, DEFAULT_PARAM_GRID
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de backtesting")
+    parser.add_argument('--symbol', default='BTC/USDT', help="Par de trading")
+    parser.add_argument('--start', help="Fecha de inicio (YYYY-MM-DD, por defecto hace un año)")
+    parser.add_argument('--end', help="Fecha de fin (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument('--timeframe', default='1h', help="Temporalidad principal")
+    parser.add_argument('--capital', type=float, default=1000.0, help="Capital inicial")
+    parser.add_argument('--grid', help="JSON con la rejilla {parámetro: [valores]}; con --samples también "
+                        "rangos {parámetro: {\"min\": x, \"max\": y}}")
+    parser.add_argument('--samples', type=int, help="Número de configuraciones aleatorias en lugar de la rejilla completa")
+    parser.add_argument('--seed', type=int, default=None, help="Semilla del muestreo aleatorio")
+    parser.add_argument('--processes', type=int, default=None, help="Número de procesos")
+    parser.add_argument('--rank-by', default='total_return', help="Métrica para ordenar los resultados")
+    parser.add_argument('--output', help="CSV donde guardar los resultados")
+    parser.add_argument('--top', type=int, default=20, help="Filas a mostrar al final")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    end_date = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    start_date = datetime.strptime(args.start, '%Y-%m-%d') if args.start else end_date - timedelta(days=365)
+
+    grid = DEFAULT_PARAM_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    param_sets = sample_params(grid, args.samples, args.seed) if args.samples else build_param_grid(grid)
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(os.environ.get('TEMP', '/tmp'), "trading_bot_results")
+        os.makedirs(results_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(results_dir, f"sweep_{args.symbol.replace('/', '_')}_{args.timeframe}_{timestamp}.csv")
+
+    table = run_sweep(
+        symbol=args.symbol,
+        start_date=start_date,
+        end_date=end_date,
+        param_sets=param_sets,
+        timeframes=[args.timeframe],
+        initial_capital=args.capital,
+        processes=args.processes,
+        rank_by=args.rank_by,
+        output_path=output
+    )
+
+    print(f"\n🏆 Mejores {args.top} configuraciones por {args.rank_by}:")
+    print(table.head(args.top).to_string(index=False))
+    print(f"\n📁 Resultados guardados en: {output}")
+
+if __name__ == "__main__":
+    main()
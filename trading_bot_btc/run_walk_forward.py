@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Script para ejecutar una optimización walk-forward de parámetros de riesgo y MACD
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from backtesting.sweep import build_param_grid, sample_params, DEFAULT_PARAM_GRID
+from backtesting.walk_forward import run_walk_forward
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimización walk-forward")
+    parser.add_argument('--symbol', default='BTC/USDT', help="Par de trading")
+    parser.add_argument('--start', help="Inicio del primer entrenamiento (YYYY-MM-DD, por defecto hace dos años)")
+    parser.add_argument('--end', help="Fin de la última prueba (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument('--timeframe', default='1h', help="Temporalidad principal")
+    parser.add_argument('--capital', type=float, default=1000.0, help="Capital inicial")
+    parser.add_argument('--train-days', type=int, default=180, help="Días de cada ventana de entrenamiento")
+    parser.add_argument('--test-days', type=int, default=30, help="Días de cada ventana de prueba")
+    parser.add_argument('--step-days', type=int, help="Días de avance entre ventanas (por defecto --test-days)")
+    parser.add_argument('--anchored', action='store_true', help="Entrenar siempre desde el inicio")
+    parser.add_argument('--grid', help="JSON con la rejilla {parámetro: [valores]}; con --samples también "
+                        "rangos {parámetro: {\"min\": x, \"max\": y}}")
+    parser.add_argument('--samples', type=int, help="Número de configuraciones aleatorias en lugar de la rejilla completa")
+    parser.add_argument('--seed', type=int, default=None, help="Semilla del muestreo aleatorio")
+    parser.add_argument('--processes', type=int, default=None, help="Número de procesos")
+    parser.add_argument('--rank-by', default='total_return', help="Métrica de entrenamiento para elegir parámetros")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    end_date = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    start_date = datetime.strptime(args.start, '%Y-%m-%d') if args.start else end_date - timedelta(days=730)
+
+    grid = DEFAULT_PARAM_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    param_sets = sample_params(grid, args.samples, args.seed) if args.samples else build_param_grid(grid)
+
+    results = run_walk_forward(
+        symbol=args.symbol,
+        start_date=start_date,
+        end_date=end_date,
+        param_sets=param_sets,
+        train_period=timedelta(days=args.train_days),
+        test_period=timedelta(days=args.test_days),
+        step=timedelta(days=args.step_days) if args.step_days else None,
+        anchored=args.anchored,
+        timeframes=[args.timeframe],
+        initial_capital=args.capital,
+        processes=args.processes,
+        rank_by=args.rank_by
+    )
+
+    folds = pd.DataFrame([{
+        'fold': fold['fold'],
+        'prueba': f"{fold['test_start']:%Y-%m-%d} → {fold['test_end']:%Y-%m-%d}",
+        'parámetros': fold['params'],
+        f'entrenamiento ({args.rank_by})': fold['train_metric'],
+        'retorno prueba (%)': fold['test_return'],
+        'operaciones': fold['test_trades']
+    } for fold in results['folds']])
+    print("\n📋 Ventanas:")
+    print(folds.to_string(index=False))
+
+    print(f"\n💵 Capital final fuera de muestra: ${results['final_capital']:,.2f}")
+    print(f"📈 Retorno total fuera de muestra: {results['total_return']:.2f}%")
+    print(f"📉 Máximo drawdown fuera de muestra: {results['max_drawdown']:.2f}%")
+    print(f"🔄 Operaciones: {results['total_trades']} (win rate {results['win_rate']:.2f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de indicadores compartida por toda la aplicación
+
+interpretar_macd, check_macd_signal y plot_macd_chart calculan los mismos
+indicadores sobre las mismas velas. Con esta caché cada indicador se calcula
+una sola vez por vela nueva y el resto de consumidores reutilizan el resultado.
+
+La clave de cada entrada es (símbolo, temporalidad, número de velas, primera y
+última vela, cierre de la primera vela, OHLC de la última vela, indicador,
+parámetros). El símbolo y la temporalidad se leen de df.attrs, que rellenan
+get_price_data y get_multi_timeframe_data. El OHLC completo de la última vela
+forma parte de la clave porque la vela en formación cambia sin cambiar de
+timestamp, y el ATR depende de su máximo y mínimo aunque el cierre no cambie.
+
+Los resultados se comparten entre consumidores: no deben modificarse.
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas_ta as ta
+
+from config import INDICATOR_CACHE_SIZE
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+_MISSING = object()
+
+
+def _frame_key(df):
+    """Identifica las velas de un DataFrame sin recorrerlo"""
+    close = df['close']
+    last = tuple(float(df[col].iloc[-1]) if col in df.columns else None
+                 for col in ('open', 'high', 'low', 'close')) if len(df) else None
+    return (
+        df.attrs.get('symbol'),
+        df.attrs.get('timeframe'),
+        len(df),
+        df.index[0] if len(df) else None,
+        df.index[-1] if len(df) else None,
+        float(close.iloc[0]) if len(df) else None,
+        last
+    )
+
+
+def cached_indicator(df, name, params, compute):
+    """
+    Retorna un indicador de la caché o lo calcula y lo guarda
+
+    Args:
+        df: DataFrame OHLCV
+        name: Nombre del indicador
+        params: Tupla de parámetros del indicador
+        compute: Función sin argumentos que calcula el indicador
+    """
+    key = _frame_key(df) + (name, params)
+    with _lock:
+        value = _cache.get(key, _MISSING)
+        if value is not _MISSING:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return value
+        _stats['misses'] += 1
+
+    value = compute()
+
+    with _lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > INDICATOR_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
+
+
+def macd(df, fast=12, slow=26, signal=9):
+    """MACD de pandas_ta (columnas MACD_f_s_g, MACDh_f_s_g, MACDs_f_s_g)"""
+    return cached_indicator(df, 'macd', (fast, slow, signal),
+                            lambda: ta.macd(df['close'], fast=fast, slow=slow, signal=signal))
+
+
+def ema(df, length):
+    """EMA de pandas_ta sobre el cierre (None si no hay suficientes velas)"""
+    return cached_indicator(df, 'ema', (length,), lambda: ta.ema(df['close'], length=length))
+
+
+def true_range(df):
+    """True range de pandas_ta"""
+    return cached_indicator(df, 'true_range', (), lambda: ta.true_range(df['high'], df['low'], df['close']))
+
+
+def indicator_cache_info():
+    """Aciertos, fallos y número de entradas de la caché"""
+    with _lock:
+        return {**_stats, 'size': len(_cache), 'max_size': INDICATOR_CACHE_SIZE}
+
+
+def clear_indicator_cache():
+    """Vacía la caché y reinicia las estadísticas"""
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0)
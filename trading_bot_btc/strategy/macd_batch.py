@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+MACD de muchas combinaciones de parámetros en una sola pasada
+
+batch_macd calcula la línea MACD, la señal y el histograma de K triples
+(fast, slow, signal) como arrays (K, n):
+- cada EMA del cierre se calcula una sola vez por longitud distinta
+- las EMAs de señal se calculan juntas, una llamada por longitud de señal
+
+Los valores son idénticos a los de ta.macd para cada triple, y
+batch_macd_signals aplica las mismas reglas que compute_macd_signals.
+"""
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+from strategy.macd_strategy import classify_macd_histograms, macd_signal_context
+
+
+def normalize_macd_params(param_sets):
+    """
+    Convierte la lista de parámetros a triples (fast, slow, signal)
+
+    Acepta diccionarios {'fast', 'slow', 'signal'} o tuplas; como pandas_ta,
+    intercambia fast y slow si slow < fast.
+    """
+    params = []
+    for p in param_sets:
+        if isinstance(p, dict):
+            fast, slow, signal = p['fast'], p['slow'], p['signal']
+        else:
+            fast, slow, signal = p
+        fast, slow, signal = int(fast), int(slow), int(signal)
+        if slow < fast:
+            fast, slow = slow, fast
+        params.append((fast, slow, signal))
+    return params
+
+
+class MACDBatch:
+    """
+    MACD de K variantes sobre la misma serie de cierres
+    """
+
+    def __init__(self, index, params, macd, signal, hist):
+        self.index = index
+        self.params = params
+        self.macd = macd
+        self.signal = signal
+        self.hist = hist
+
+    def __len__(self):
+        return len(self.params)
+
+    def frame(self, k):
+        """DataFrame de la variante k con los nombres de columna de pandas_ta"""
+        fast, slow, signal = self.params[k]
+        suffix = f"_{fast}_{slow}_{signal}"
+        return pd.DataFrame({
+            f"MACD{suffix}": self.macd[k],
+            f"MACDh{suffix}": self.hist[k],
+            f"MACDs{suffix}": self.signal[k]
+        }, index=self.index)
+
+
+def batch_macd(close, param_sets):
+    """
+    Calcula el MACD de todas las combinaciones de parámetros
+
+    Args:
+        close: Serie de cierres
+        param_sets: Lista de triples (fast, slow, signal) o diccionarios
+
+    Returns:
+        MACDBatch: Arrays (K, n) macd, signal e hist
+    """
+    params = normalize_macd_params(param_sets)
+    n, k_count = len(close), len(params)
+
+    # Una EMA por longitud distinta (None si no hay suficientes velas, como en pandas_ta)
+    lengths = sorted({length for fast, slow, _ in params for length in (fast, slow)})
+    emas = {}
+    for length in lengths:
+        ema = ta.ema(close, length=length)
+        emas[length] = ema.to_numpy() if ema is not None else None
+
+    macd = np.full((k_count, n), np.nan)
+    for k, (fast, slow, _) in enumerate(params):
+        if emas[fast] is not None and emas[slow] is not None:
+            macd[k] = emas[fast] - emas[slow]
+
+    # EMAs de señal agrupadas por longitud: mismo arranque que ta.ema sobre el
+    # MACD desde su primer valor válido (media simple de las primeras `signal`)
+    signal_line = np.full((k_count, n), np.nan)
+    for length in sorted({signal for _, _, signal in params}):
+        rows = []
+        seeded = []
+        for k, (_, slow, signal) in enumerate(params):
+            if signal != length or emas[slow] is None:
+                continue
+            first = slow - 1
+            if n - first < length:
+                continue
+            column = np.full(n, np.nan)
+            seed_at = first + length - 1
+            column[seed_at] = pd.Series(macd[k, first:first + length]).mean()
+            column[seed_at + 1:] = macd[k, seed_at + 1:]
+            rows.append(k)
+            seeded.append(column)
+        if rows:
+            smoothed = pd.DataFrame(np.column_stack(seeded)).ewm(span=length, adjust=False).mean()
+            signal_line[rows] = smoothed.to_numpy().T
+
+    return MACDBatch(close.index, params, macd, signal_line, macd - signal_line)
+
+
+def batch_macd_signals(df, param_sets, timeframe=''):
+    """
+    Señal de cada vela para todas las combinaciones de parámetros
+
+    El umbral, la volatilidad (ATR) y la tendencia (EMA 20/50) no dependen del
+    MACD, así que se calculan una sola vez para todas las variantes.
+
+    Args:
+        df: DataFrame con datos OHLCV
+        param_sets: Lista de triples (fast, slow, signal) o diccionarios
+        timeframe: Temporalidad de los datos
+
+    Returns:
+        tuple: (MACDBatch, códigos (K, n) de SIGNAL_NAMES, fuerza (K, n))
+    """
+    batch = batch_macd(df['close'], param_sets)
+    codes, strength = classify_macd_histograms(batch.hist, *macd_signal_context(df, timeframe))
+    return batch, codes, strength
@@ -10,6 +10,7 @@ Created on Thu Apr 10 22:47:08 2025
 import pandas as pd
 import pandas_ta as ta
 import numpy as np
+from strategy import indicator_cache
 
 def calculate_threshold(timeframe):
     """Calcula umbrales dinámicos basados en la temporalidad"""
@@ -25,6 +26,49 @@ def calculate_threshold(timeframe):
     base_threshold = 0.8  # Aumentado de 0.5 a 0.8
     return base_threshold * tf_factors.get(timeframe, 0.7)
 
+def calculate_dynamic_threshold(current_price, atr, timeframe):
+    """
+    Calcula el umbral dinámico del histograma y la volatilidad normalizada
+
+    Returns:
+        tuple: (umbral, volatilidad)
+    """
+    # Calcular umbral relativo al precio (usando porcentajes)
+    # Por ejemplo, para BTC a $50,000, un umbral de 0.001 sería $50
+    price_threshold = current_price * 0.001  # 0.1% del precio actual
+    
+    volatility = atr / price_threshold  # Normalizar la volatilidad respecto al umbral
+    
+    # Calcular umbral dinámico basado en la volatilidad y timeframe
+    base_threshold = calculate_threshold(timeframe)
+    threshold = price_threshold * base_threshold * (1 + volatility)
+    return threshold, volatility
+
+def classify_macd_signal(last_hist, prev_hist, threshold, volatility, trend):
+    """
+    Clasifica la señal a partir del histograma actual y anterior
+
+    Returns:
+        tuple: (señal, fuerza)
+    """
+    # Calcular fuerza de la señal
+    signal_strength = abs(last_hist) / threshold  # Normalizar respecto al umbral dinámico
+    signal_strength = min(signal_strength * (1 + volatility), 1.0)  # Normalizar entre 0 y 1
+    
+    # Generar señales con confirmación de tendencia
+    if last_hist > 0 and prev_hist <= 0:  # Cruce alcista
+        if abs(last_hist) > threshold and trend == 'up':
+            return 'valley_buy', signal_strength
+        elif trend == 'up':
+            return 'buy', signal_strength
+    elif last_hist < 0 and prev_hist >= 0:  # Cruce bajista
+        if abs(last_hist) > threshold and trend == 'down':
+            return 'top_sell', signal_strength
+        elif trend == 'down':
+            return 'sell', signal_strength
+    
+    return 'hold', 0.0
+
 def check_macd_signal(df, timeframe=''):
     """
     Calcula señales MACD para un DataFrame dado
@@ -43,7 +87,7 @@ def check_macd_signal(df, timeframe=''):
     
     try:
         # Calcular MACD
-        macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
+        macd = indicator_cache.macd(df, fast=12, slow=26, signal=9)
         
         # Renombrar columnas para mantener consistencia
         macd = macd.rename(columns={
@@ -64,22 +108,14 @@ def check_macd_signal(df, timeframe=''):
         prev_hist = df['MACDh_12_26_9'].iloc[-2] if len(df) > 1 else 0
         current_price = df['close'].iloc[-1]
         
-        # Calcular umbral relativo al precio (usando porcentajes)
-        # Por ejemplo, para BTC a $50,000, un umbral de 0.001 sería $50
-        price_threshold = current_price * 0.001  # 0.1% del precio actual
-        
         # Calcular volatilidad usando ATR
-        df['TR'] = ta.true_range(df['high'], df['low'], df['close'])
+        df['TR'] = indicator_cache.true_range(df)
         atr = df['TR'].rolling(window=14).mean().iloc[-1]
-        volatility = atr / price_threshold  # Normalizar la volatilidad respecto al umbral
-        
-        # Calcular umbral dinámico basado en la volatilidad y timeframe
-        base_threshold = calculate_threshold(timeframe)
-        threshold = price_threshold * base_threshold * (1 + volatility)
+        threshold, volatility = calculate_dynamic_threshold(current_price, atr, timeframe)
         
         # Calcular tendencia usando EMA
-        ema_20 = ta.ema(df['close'], length=20).iloc[-1]
-        ema_50 = ta.ema(df['close'], length=50).iloc[-1]
+        ema_20 = indicator_cache.ema(df, 20).iloc[-1]
+        ema_50 = indicator_cache.ema(df, 50).iloc[-1]
         trend = 'up' if ema_20 > ema_50 else 'down'
         
         # Imprimir valores para debugging
@@ -92,25 +128,98 @@ def check_macd_signal(df, timeframe=''):
         print(f"Histograma: {last_hist:,.2f}")
         print(f"Volatilidad: {volatility:.4f}")
         
-        # Calcular fuerza de la señal
-        signal_strength = abs(last_hist) / threshold  # Normalizar respecto al umbral dinámico
-        signal_strength = min(signal_strength * (1 + volatility), 1.0)  # Normalizar entre 0 y 1
-        
-        # Generar señales con confirmación de tendencia
-        if last_hist > 0 and prev_hist <= 0:  # Cruce alcista
-            if abs(last_hist) > threshold and trend == 'up':
-                return 'valley_buy', signal_strength
-            elif trend == 'up':
-                return 'buy', signal_strength
-        elif last_hist < 0 and prev_hist >= 0:  # Cruce bajista
-            if abs(last_hist) > threshold and trend == 'down':
-                return 'top_sell', signal_strength
-            elif trend == 'down':
-                return 'sell', signal_strength
-        
-        return 'hold', 0.0
+        return classify_macd_signal(last_hist, prev_hist, threshold, volatility, trend)
         
     except Exception as e:
         print(f"\n❌ Error al calcular señales MACD: {str(e)}")
         return 'hold', 0.0
 
+
+# Códigos de señal usados por las versiones vectorizadas (SIGNAL_NAMES[código])
+SIGNAL_NAMES = np.array(['hold', 'buy', 'valley_buy', 'sell', 'top_sell'], dtype=object)
+
+def macd_signal_context(df, timeframe=''):
+    """
+    Umbral, volatilidad y tendencia de cada vela, comunes a cualquier MACD
+
+    Returns:
+        tuple: (umbral, volatilidad, tendencia alcista) como arrays de longitud len(df)
+    """
+    close = df['close']
+    current_price = close.to_numpy()
+
+    tr = ta.true_range(df['high'], df['low'], close)
+    atr = tr.rolling(window=14).mean().to_numpy()
+    threshold, volatility = calculate_dynamic_threshold(current_price, atr, timeframe)
+
+    n = len(df)
+    # pandas_ta devuelve None para la EMA de 50 si hay menos de 50 velas,
+    # lo que hace que check_macd_signal retorne 'hold' en esos prefijos
+    ema_20 = ta.ema(close, length=20)
+    ema_50 = ta.ema(close, length=50)
+    ema_20 = ema_20.to_numpy() if ema_20 is not None else np.full(n, np.nan)
+    ema_50 = ema_50.to_numpy() if ema_50 is not None else np.full(n, np.nan)
+    return threshold, volatility, ema_20 > ema_50
+
+def classify_macd_histograms(hist, threshold, volatility, trend_up):
+    """
+    Versión vectorizada de classify_macd_signal
+
+    Args:
+        hist: Histograma MACD, array (n,) o (K, n) con K variantes del MACD
+        threshold, volatility, trend_up: Arrays (n,) de macd_signal_context
+
+    Returns:
+        tuple: (códigos de SIGNAL_NAMES como int8, fuerza), con la forma de hist
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    prev_hist = np.full_like(hist, np.nan)
+    prev_hist[..., 1:] = hist[..., :-1]
+    trend_down = ~trend_up
+
+    strength = np.abs(hist) / threshold
+    strength = np.minimum(strength * (1 + volatility), 1.0)
+
+    with np.errstate(invalid='ignore'):
+        cross_up = (hist > 0) & (prev_hist <= 0)
+        cross_down = (hist < 0) & (prev_hist >= 0)
+        strong = np.abs(hist) > threshold
+
+    codes = np.zeros(hist.shape, dtype=np.int8)
+    codes[cross_up & trend_up & ~strong] = 1
+    codes[cross_up & trend_up & strong] = 2
+    codes[cross_down & trend_down & ~strong] = 3
+    codes[cross_down & trend_down & strong] = 4
+
+    # Prefijos sin datos suficientes
+    codes[..., :49] = 0
+
+    strength = np.where(codes == 0, 0.0, strength)
+    return codes, strength
+
+def compute_macd_signals(df, timeframe='', fast=12, slow=26, signal=9):
+    """
+    Calcula de una sola vez la señal MACD de cada vela del DataFrame
+
+    Equivale a llamar a check_macd_signal sobre cada prefijo df.iloc[:i + 1]:
+    todos los indicadores son causales y se calculan desde el inicio de la
+    serie, por lo que la fila i solo usa información hasta la vela i.
+
+    Args:
+        df: DataFrame con datos OHLCV
+        timeframe: Temporalidad de los datos
+        fast, slow, signal: Parámetros del MACD
+
+    Returns:
+        DataFrame: Columnas del MACD más 'signal' y 'strength' para cada vela
+    """
+    macd = ta.macd(df['close'], fast=fast, slow=slow, signal=signal)
+    suffix = f"_{fast}_{slow}_{signal}"
+    hist = macd[f"MACDh{suffix}"].to_numpy()
+
+    codes, strength = classify_macd_histograms(hist, *macd_signal_context(df, timeframe))
+
+    result = macd.copy()
+    result['signal'] = SIGNAL_NAMES[codes]
+    result['strength'] = strength
+    return result
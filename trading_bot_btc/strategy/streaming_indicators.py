@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Indicadores incrementales para avanzar vela a vela sin recalcular el histórico
+
+Cada objeto replica la definición de pandas_ta usada en check_macd_signal:
+- EMA: semilla con la media simple de las primeras `length` velas y después
+  la recursión de pandas `ewm(span=length, adjust=False)`
+- MACD 12/26/9: la línea de señal es una EMA del MACD desde su primer valor válido
+- ATR 14: media móvil simple del true range (la primera vela no tiene true range)
+"""
+
+import math
+from collections import deque
+
+from strategy.macd_strategy import calculate_dynamic_threshold, classify_macd_signal
+
+NAN = float('nan')
+
+
+class StreamingEMA:
+    """
+    EMA incremental equivalente a ta.ema(close, length)
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1.0)
+        self._old_wt_factor = 1.0 - self.alpha
+        self._seed = []
+        self.value = NAN
+
+    def update(self, x):
+        """Añade un valor y retorna la EMA actual (NaN hasta tener `length` valores)"""
+        if len(self._seed) < self.length:
+            self._seed.append(x)
+            if len(self._seed) == self.length:
+                self.value = sum(self._seed) / self.length
+            return self.value
+
+        # Misma recursión que pandas ewm con adjust=False
+        if self.value != x:
+            self.value = (self._old_wt_factor * self.value + self.alpha * x) / (self._old_wt_factor + self.alpha)
+        return self.value
+
+    @property
+    def ready(self):
+        return not math.isnan(self.value)
+
+
+class StreamingMACD:
+    """
+    MACD incremental equivalente a ta.macd(close, fast, slow, signal)
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast_ema = StreamingEMA(fast)
+        self.slow_ema = StreamingEMA(slow)
+        self.signal_ema = StreamingEMA(signal)
+        self.macd = NAN
+        self.signal = NAN
+        self.hist = NAN
+
+    def update(self, close):
+        """Añade un cierre y retorna (macd, señal, histograma)"""
+        fast = self.fast_ema.update(close)
+        slow = self.slow_ema.update(close)
+        if not self.slow_ema.ready:
+            return self.macd, self.signal, self.hist
+
+        self.macd = fast - slow
+        self.signal = self.signal_ema.update(self.macd)
+        self.hist = self.macd - self.signal
+        return self.macd, self.signal, self.hist
+
+
+class StreamingATR:
+    """
+    ATR incremental equivalente a ta.true_range(...).rolling(length).mean()
+    """
+
+    def __init__(self, length=14):
+        self.length = length
+        self._ranges = deque(maxlen=length)
+        self._prev_close = None
+        self.value = NAN
+
+    def update(self, high, low, close):
+        """Añade una vela y retorna el ATR actual"""
+        if self._prev_close is not None:
+            true_range = max(abs(high - low), abs(high - self._prev_close), abs(self._prev_close - low))
+            self._ranges.append(true_range)
+            if len(self._ranges) == self.length:
+                self.value = sum(self._ranges) / self.length
+        self._prev_close = close
+        return self.value
+
+
+class MACDSignalState:
+    """
+    Estado incremental de todos los indicadores que usa check_macd_signal
+    """
+
+    def __init__(self, timeframe='', fast=12, slow=26, signal=9):
+        self.timeframe = timeframe
+        self.macd = StreamingMACD(fast, slow, signal)
+        self.atr = StreamingATR(14)
+        self.ema_20 = StreamingEMA(20)
+        self.ema_50 = StreamingEMA(50)
+        self.bars = 0
+        self.close = NAN
+        self.timestamp = None
+        self.prev_hist = NAN
+
+    def update(self, bar):
+        """
+        Avanza el estado con una vela cerrada
+
+        Args:
+            bar: Diccionario o Series con 'high', 'low', 'close' (y opcionalmente 'timestamp')
+        """
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        self.prev_hist = self.macd.hist
+        self.macd.update(close)
+        self.atr.update(high, low, close)
+        self.ema_20.update(close)
+        self.ema_50.update(close)
+        self.close = close
+        self.bars += 1
+        if 'timestamp' in bar:
+            self.timestamp = bar['timestamp']
+        return self
+
+    def snapshot(self):
+        """Retorna los valores actuales de todos los indicadores"""
+        return {
+            'timestamp': self.timestamp,
+            'bars': self.bars,
+            'close': self.close,
+            'macd': self.macd.macd,
+            'macd_signal': self.macd.signal,
+            'macd_hist': self.macd.hist,
+            'prev_hist': self.prev_hist,
+            'atr': self.atr.value,
+            'ema_20': self.ema_20.value,
+            'ema_50': self.ema_50.value
+        }
+
+
+def check_streaming_signal(state):
+    """
+    Calcula la señal MACD a partir del estado incremental
+
+    Aplica las mismas reglas que check_macd_signal sobre las velas vistas por el estado.
+
+    Returns:
+        tuple: (señal, fuerza)
+    """
+    snapshot = state.snapshot()
+
+    # check_macd_signal necesita 35 velas y la EMA de 50 de pandas_ta no existe antes de 50
+    if snapshot['bars'] < 50:
+        return 'hold', 0.0
+
+    threshold, volatility = calculate_dynamic_threshold(snapshot['close'], snapshot['atr'], state.timeframe)
+    trend = 'up' if snapshot['ema_20'] > snapshot['ema_50'] else 'down'
+    return classify_macd_signal(snapshot['macd_hist'], snapshot['prev_hist'], threshold, volatility, trend)
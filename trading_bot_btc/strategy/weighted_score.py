@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Decisión ponderada multi-temporalidad (LONG, SHORT o WAIT)
+
+Es la regla con la que decide el bot en vivo (main.evaluate_multi_timeframe):
+cada temporalidad aporta peso_temporalidad (config.TIMEFRAMES, Fibonacci) x
+peso_señal (config.SIGNAL_WEIGHTS) x fuerza al peso de compra o de venta, y
+se opera si la diferencia entre ambos alcanza SIGNAL_THRESHOLD.
+
+weighted_decision y signal_contribution aplican la regla a una sola
+evaluación; score_series la aplica a todas las velas de la historia a la vez,
+con las señales precalculadas de cada temporalidad (compute_macd_signals) y
+un mapa de alineación a la última vela cerrada (backtesting/alignment.py).
+"""
+
+import numpy as np
+
+from config import TIMEFRAMES, SIGNAL_WEIGHTS, SIGNAL_THRESHOLD
+
+BUY_SIGNALS = ('buy', 'valley_buy')
+SELL_SIGNALS = ('sell', 'top_sell')
+
+
+def signal_contribution(signal, strength, timeframe_weight, signal_weights=None):
+    """
+    Peso que aporta la señal de una temporalidad
+
+    Returns:
+        tuple: (peso de compra, peso de venta); uno de los dos es 0
+    """
+    weight = timeframe_weight * (signal_weights or SIGNAL_WEIGHTS).get(signal, 0) * strength
+    if signal in BUY_SIGNALS:
+        return weight, 0.0
+    if signal in SELL_SIGNALS:
+        return 0.0, weight
+    return 0.0, 0.0
+
+
+def weighted_decision(peso_buy, peso_sell, threshold=None):
+    """
+    Decisión a partir de los pesos acumulados
+
+    Returns:
+        int: 1 (LONG), -1 (SHORT) o 0 (WAIT); con arrays, un array int8 por vela
+    """
+    threshold = SIGNAL_THRESHOLD if threshold is None else threshold
+    if np.ndim(peso_buy):
+        peso_buy, peso_sell = np.asarray(peso_buy), np.asarray(peso_sell)
+        return np.where(peso_buy - peso_sell >= threshold, 1,
+                        np.where(peso_sell - peso_buy >= threshold, -1, 0)).astype(np.int8)
+    if peso_buy - peso_sell >= threshold:
+        return 1
+    if peso_sell - peso_buy >= threshold:
+        return -1
+    return 0
+
+
+def score_series(signals, alignment, history=None, timeframe_weights=None, signal_weights=None, min_bars=35):
+    """
+    Pesos de compra y venta en cada vela de la temporalidad principal
+
+    Args:
+        signals: {timeframe: (array de señales, array de fuerzas)} por vela de cada temporalidad
+        alignment: {timeframe: array con la última vela cerrada por vela principal}
+                   (ver backtesting.alignment.build_alignment)
+        history: {timeframe: velas anteriores al tramo} que cuentan para min_bars (opcional)
+        timeframe_weights: Peso de cada temporalidad (por defecto config.TIMEFRAMES);
+                           las temporalidades sin peso no cuentan
+        signal_weights: Peso de cada tipo de señal (por defecto config.SIGNAL_WEIGHTS)
+        min_bars: Velas mínimas de una temporalidad para que su señal cuente
+
+    Returns:
+        tuple: (peso_buy, peso_sell) como arrays float64 de una posición por vela principal
+    """
+    timeframe_weights = timeframe_weights or TIMEFRAMES
+    signal_weights = signal_weights or SIGNAL_WEIGHTS
+    history = history or {}
+    n = len(next(iter(alignment.values())))
+    peso_buy = np.zeros(n)
+    peso_sell = np.zeros(n)
+
+    for tf, timeframe_weight in timeframe_weights.items():
+        if tf not in signals or tf not in alignment:
+            continue
+        signal_values, strength = signals[tf]
+        strength = np.asarray(strength, dtype=np.float64)
+
+        base = np.zeros(len(signal_values))
+        for name, weight in signal_weights.items():
+            base[signal_values == name] = weight
+        weight = timeframe_weight * base * strength
+        buy_weight = np.where(np.isin(signal_values, BUY_SIGNALS), weight, 0.0)
+        sell_weight = np.where(np.isin(signal_values, SELL_SIGNALS), weight, 0.0)
+
+        j = alignment[tf]
+        valid = (j >= 0) & (j + 1 + history.get(tf, 0) >= min_bars)
+        peso_buy[valid] += buy_weight[j[valid]]
+        peso_sell[valid] += sell_weight[j[valid]]
+
+    return peso_buy, peso_sell
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la alineación entre temporalidades sin mirar al futuro
+"""
+
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtesting.alignment import build_alignment, closed_bar_index
+from backtesting.engine import BacktestEngine, prepare_signal_frames
+from utils.synthetic_data import generate_ohlcv
+
+
+class TestAlignment(unittest.TestCase):
+    def test_forming_bar_is_not_visible(self):
+        """La vela de 4h solo aparece en la vela de 1h en la que cierra"""
+        hours = pd.date_range('2024-01-01', periods=12, freq='h')
+        four_hours = pd.date_range('2024-01-01', periods=3, freq='4h')
+
+        positions = closed_bar_index(hours, '1h', four_hours, '4h')
+        np.testing.assert_array_equal(positions, [-1, -1, -1, 0, 0, 0, 0, 1, 1, 1, 1, 2])
+        self.assertEqual(positions.dtype, np.int64)
+        np.testing.assert_array_equal(closed_bar_index(hours, '1h', hours, '1h'), np.arange(12))
+
+    def test_index_resolution(self):
+        """Un índice en ms (parquet/Arrow) da la misma alineación que uno en ns"""
+        frames = {'1h': generate_ohlcv(400, '1h', seed=2), '4h': generate_ohlcv(100, '4h', seed=2)}
+        expected = build_alignment(frames, '1h')
+        np.testing.assert_array_equal(expected['4h'][:8], [-1, -1, -1, 0, 0, 0, 0, 1])
+
+        for unit in ('ms', 's', 'us'):
+            mixed = {'1h': frames['1h'], '4h': frames['4h'].set_axis(frames['4h'].index.as_unit(unit))}
+            np.testing.assert_array_equal(build_alignment(mixed, '1h')['4h'], expected['4h'])
+            mixed = {'1h': frames['1h'].set_axis(frames['1h'].index.as_unit(unit)), '4h': frames['4h']}
+            np.testing.assert_array_equal(build_alignment(mixed, '1h')['4h'], expected['4h'])
+
+    def test_alignment_invariant(self):
+        """La vela alineada ya cerró y la siguiente todavía no"""
+        frames = {
+            '15m': generate_ohlcv(2000, '15m', seed=1),
+            '1h': generate_ohlcv(500, '1h', seed=1),
+            '4h': generate_ohlcv(125, '4h', seed=1)
+        }
+        alignment = build_alignment(frames, '15m')
+        main_close = frames['15m'].index + pd.Timedelta(minutes=15)
+        for tf, duration in (('1h', pd.Timedelta(hours=1)), ('4h', pd.Timedelta(hours=4))):
+            closes = frames[tf].index + duration
+            j = alignment[tf]
+            visible = j >= 0
+            self.assertTrue(np.all(closes[j[visible]] <= main_close[visible]))
+            following = j + 1 < len(closes)
+            self.assertTrue(np.all(closes[j[following] + 1] > main_close[following]))
+
+    def test_engine_uses_closed_bars(self):
+        """El motor expone el mapa y el resultado no depende de la vela superior en formación"""
+        data = {'1h': generate_ohlcv(1200, '1h', mode='regime', seed=4),
+                '4h': generate_ohlcv(300, '4h', mode='regime', seed=4)}
+        start, end = datetime(2017, 1, 3), datetime(2017, 3, 1)
+        engine = BacktestEngine('SYNTH/USDT', start, end, timeframes=['1h', '4h'], data=data, verbose=False)
+        results = engine.run()
+        np.testing.assert_array_equal(engine.alignment['4h'],
+                                      closed_bar_index(data['1h'].index, '1h', data['4h'].index, '4h'))
+
+        self.assertGreater(results['total_trades'], 0)
+
+        # Única señal de entrada en la vela de 4h número 50: se opera cuando cierra, no cuando abre
+        frames = prepare_signal_frames(data)
+        frames['1h']['signal'] = 'hold'
+        frames['4h']['signal'] = 'hold'
+        frames['4h'].iloc[50, frames['4h'].columns.get_loc('signal')] = 'buy'
+        single = BacktestEngine('SYNTH/USDT', start, end, timeframes=['1h', '4h'], data=frames, verbose=False).run()
+        self.assertEqual(len(single['trades']), 1)
+        self.assertEqual(single['trades'][0]['entry_time'], frames['4h'].index[50] + pd.Timedelta(hours=3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el motor de backtesting
+"""
+
+import unittest
+from datetime import datetime
+import pandas as pd
+import numpy as np
+from backtesting.engine import BacktestEngine, prepare_signal_frames
+
+
+def make_candles(periods, freq, seed):
+    """Velas sintéticas con un paseo aleatorio de precios"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start='2024-01-01', periods=periods, freq=freq)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.004, periods)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.random(periods) * 0.002),
+        'low': np.minimum(open_, close) * (1 - rng.random(periods) * 0.002),
+        'close': close,
+        'volume': rng.random(periods) * 1000
+    }, index=dates)
+
+
+class TestBacktestEngine(unittest.TestCase):
+    def setUp(self):
+        """Preparar datos para las pruebas"""
+        self.data = {
+            '1h': make_candles(400, 'h', 1),
+            '4h': make_candles(100, '4h', 2)
+        }
+
+    def run_engine(self, timeframes, precompute_signals):
+        engine = BacktestEngine(
+            symbol='BTC/USDT',
+            start_date=datetime(2024, 1, 1),
+            end_date=datetime(2024, 2, 1),
+            timeframes=timeframes,
+            data=self.data,
+            precompute_signals=precompute_signals
+        )
+        return engine.run()
+
+    def test_precomputed_signals_match_prefix_loop(self):
+        """Las señales precalculadas producen las mismas operaciones que el recálculo por prefijo"""
+        for timeframes in (['1h'], ['1h', '4h']):
+            fast = self.run_engine(timeframes, precompute_signals=True)
+            slow = self.run_engine(timeframes, precompute_signals=False)
+
+            self.assertEqual(fast['trades'], slow['trades'])
+            self.assertEqual(fast['final_capital'], slow['final_capital'])
+            for col, values in fast['series'].items():
+                np.testing.assert_array_equal(values, slow['series'][col])
+
+    def test_series_columns(self):
+        """Las series cubren todas las velas y el balance termina en el capital final"""
+        results = self.run_engine(['1h'], precompute_signals=True)
+        series = results['series']
+
+        self.assertEqual(len(series['timestamp']), len(self.data['1h']))
+        self.assertEqual(series['timestamp'].dtype, np.int64)
+        self.assertAlmostEqual(series['balance'][-1], results['final_capital'])
+        self.assertEqual(series['drawdown'].max(), results['max_drawdown'])
+        self.assertTrue((series['drawdown'] >= 0).all())
+
+    def test_prepared_frames_follow_macd_params(self):
+        """Las señales de prepare_signal_frames solo se reutilizan con el mismo MACD"""
+        macd_params = {'fast': 5, 'slow': 35, 'signal': 5}
+        kwargs = dict(symbol='BTC/USDT', start_date=datetime(2024, 1, 1), end_date=datetime(2024, 2, 1),
+                      timeframes=['1h', '4h'], macd_params=macd_params, verbose=False)
+        direct = BacktestEngine(data=self.data, **kwargs).run()
+
+        default_frames = prepare_signal_frames(self.data)
+        self.assertEqual(default_frames['1h'].attrs['macd_params'], {'fast': 12, 'slow': 26, 'signal': 9})
+        for frames in (default_frames, prepare_signal_frames(self.data, macd_params)):
+            results = BacktestEngine(data=frames, **kwargs).run()
+            self.assertEqual(results['trades'], direct['trades'])
+            self.assertEqual(results['final_capital'], direct['final_capital'])
+        self.assertNotEqual(BacktestEngine(data=default_frames, **dict(kwargs, macd_params=None)).run()['trades'],
+                            direct['trades'])
+
+if __name__ == '__main__':
+    unittest.main()
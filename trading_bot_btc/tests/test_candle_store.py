@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el almacén local de velas
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from utils.candle_store import CANDLE_DTYPE, HEADER_SIZE, CandleStore
+
+TF_MS = 15 * 60 * 1000
+
+
+def make_rows(start, count):
+    timestamps = start + np.arange(count) * TF_MS
+    return [[t, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0] for i, t in enumerate(timestamps)]
+
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        """Crear un almacén en un directorio temporal"""
+        self.root = tempfile.mkdtemp()
+        self.store = CandleStore(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_empty_store(self):
+        """Un almacén vacío no tiene cobertura ni velas"""
+        self.assertIsNone(self.store.coverage('BTC/USDT', '15m'))
+        self.assertEqual(len(self.store.load('BTC/USDT', '15m')), 0)
+
+    def test_merge_head_and_tail(self):
+        """Las velas añadidas por cabeza y cola quedan ordenadas y sin duplicados"""
+        start = 1_700_000_000_000 - 1_700_000_000_000 % TF_MS
+        self.store.merge('BTC/USDT', '15m', make_rows(start + 10 * TF_MS, 10))
+        self.store.merge('BTC/USDT', '15m', make_rows(start, 12))
+        self.store.merge('BTC/USDT', '15m', make_rows(start + 18 * TF_MS, 5))
+
+        rows = self.store.load('BTC/USDT', '15m')
+        self.assertEqual(len(rows), 23)
+        self.assertTrue(np.all(np.diff(rows[:, 0]) == TF_MS))
+        self.assertEqual(self.store.coverage('BTC/USDT', '15m'), (start, start + 22 * TF_MS))
+
+    def test_load_range(self):
+        """La lectura por rango incluye ambos extremos"""
+        start = 1_700_000_000_000 - 1_700_000_000_000 % TF_MS
+        self.store.merge('BTC/USDT', '15m', make_rows(start, 20))
+
+        rows = self.store.load('BTC/USDT', '15m', start + 5 * TF_MS, start + 9 * TF_MS)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0, 0], start + 5 * TF_MS)
+
+    def test_coverage_start(self):
+        """Se recuerda que no hay datos anteriores a la primera vela"""
+        start = 1_700_000_000_000 - 1_700_000_000_000 % TF_MS
+        self.store.merge('BTC/USDT', '15m', make_rows(start, 5), coverage_start=start - 100 * TF_MS)
+
+        first_ts, _ = self.store.coverage('BTC/USDT', '15m')
+        self.assertEqual(first_ts, start - 100 * TF_MS)
+
+    def test_records_are_memory_mapped(self):
+        """records() retorna una vista del archivo mapeado, cortada por rango"""
+        start = 1_700_000_000_000 - 1_700_000_000_000 % TF_MS
+        self.store.merge('BTC/USDT', '15m', make_rows(start, 20))
+
+        records = self.store.records('BTC/USDT', '15m', start + 5 * TF_MS, start + 9 * TF_MS)
+        self.assertIsInstance(records, np.memmap)
+        self.assertEqual(records.dtype, CANDLE_DTYPE)
+        self.assertEqual(list(records['timestamp']), [start + i * TF_MS for i in range(5, 10)])
+
+    def test_tail_append_and_partial_record(self):
+        """Las velas de la cola se añaden al final; un registro a medias se ignora"""
+        start = 1_700_000_000_000 - 1_700_000_000_000 % TF_MS
+        path = os.path.join(self.root, 'BTCUSDT', '15m.candles')
+        self.store.merge('BTC/USDT', '15m', make_rows(start, 10))
+        with open(path, 'ab') as f:
+            f.write(b'\x00' * 20)  # escritura interrumpida
+
+        self.assertEqual(self.store.coverage('BTC/USDT', '15m'), (start, start + 9 * TF_MS))
+        self.store.merge('BTC/USDT', '15m', make_rows(start + 8 * TF_MS, 5))
+        self.assertEqual(os.path.getsize(path), HEADER_SIZE + 13 * CANDLE_DTYPE.itemsize)
+        rows = self.store.load('BTC/USDT', '15m')
+        self.assertTrue(np.all(np.diff(rows[:, 0]) == TF_MS))
+        self.assertEqual(rows[8, 1], 108.0)  # prevalece la vela guardada
+
+    def test_migrates_npz_files(self):
+        """Los archivos .npz del formato anterior se convierten al leerlos"""
+        start = 1_700_000_000_000 - 1_700_000_000_000 % TF_MS
+        rows = np.asarray(make_rows(start, 6))
+        legacy_path = os.path.join(self.root, 'BTCUSDT', '15m.npz')
+        os.makedirs(os.path.dirname(legacy_path))
+        columns = {col: rows[:, i] for i, col in enumerate(CANDLE_DTYPE.names)}
+        columns['timestamp'] = rows[:, 0].astype(np.int64)
+        np.savez(legacy_path, coverage_start=np.int64(start - 10 * TF_MS), **columns)
+
+        self.assertEqual(self.store.coverage('BTC/USDT', '15m'), (start - 10 * TF_MS, start + 5 * TF_MS))
+        np.testing.assert_array_equal(self.store.load('BTC/USDT', '15m'), rows)
+        self.assertFalse(os.path.exists(legacy_path))
+
+if __name__ == '__main__':
+    unittest.main()
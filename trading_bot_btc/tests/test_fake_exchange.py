@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el exchange local falso
+"""
+
+import unittest
+from datetime import datetime, timezone
+import ccxt
+import numpy as np
+from config import EXCHANGE_ID
+from utils.api_data import get_orderbook_summary, get_price_data
+from utils.exchange_client import reset_exchanges, set_exchange
+from utils.fake_exchange import FakeExchange
+
+HOUR_MS = 60 * 60 * 1000
+
+
+def make_rows(start, count):
+    timestamps = start + np.arange(count) * HOUR_MS
+    return np.column_stack([timestamps, 100.0 + np.arange(count), 101.0 + np.arange(count),
+                            99.0 + np.arange(count), 100.5 + np.arange(count), np.full(count, 10.0)])
+
+
+class TestFakeExchange(unittest.TestCase):
+    def setUp(self):
+        """Instalar un exchange falso con páginas pequeñas"""
+        self.exchange = FakeExchange(page_size=100, seed=1)
+        set_exchange(EXCHANGE_ID, self.exchange)
+
+    def tearDown(self):
+        reset_exchanges()
+
+    def test_pagination_with_small_pages(self):
+        """get_price_data recorre todas las páginas aunque sean menores que el límite pedido"""
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2022, 1, 31, tzinfo=timezone.utc)
+        df = get_price_data('BTC/USDT', '1h', start, end, use_cache=False)
+
+        self.assertEqual(len(df), 30 * 24 + 1)
+        self.assertTrue(df.index.is_monotonic_increasing)
+        self.assertEqual(self.exchange.stats['fetch_ohlcv'], 8)
+
+    def test_recorded_candles(self):
+        """Las velas grabadas se sirven tal cual, desde `since` y hasta el tamaño de página"""
+        start = 1_640_995_200_000  # 2022-01-01 UTC
+        rows = make_rows(start, 250)
+        self.exchange.add_candles('BTC/USDT', '1h', rows)
+
+        page = self.exchange.fetch_ohlcv('BTCUSDT', '1h', since=start + 10 * HOUR_MS, limit=1000)
+        self.assertEqual(len(page), 100)
+        self.assertIsInstance(page[0][0], int)
+        np.testing.assert_array_equal(np.array(page), rows[10:110])
+        np.testing.assert_array_equal(np.array(self.exchange.fetch_ohlcv('BTCUSDT', '1h', limit=5)), rows[-5:])
+
+    def test_errors_and_rate_limit(self):
+        """Los errores programados y el límite de peticiones usan las excepciones de ccxt"""
+        self.exchange.fail_next(1)
+        with self.assertRaises(ccxt.NetworkError):
+            self.exchange.fetch_ohlcv('BTCUSDT', '1h', limit=10)
+        self.assertEqual(len(self.exchange.fetch_ohlcv('BTCUSDT', '1h', limit=10)), 10)
+
+        limited = FakeExchange(rate_limit=2, rate_limit_window=60.0)
+        limited.fetch_ohlcv('BTCUSDT', '1h', limit=1)
+        limited.fetch_order_book('BTC/USDT')
+        with self.assertRaises(ccxt.RateLimitExceeded):
+            limited.fetch_ohlcv('BTCUSDT', '1h', limit=1)
+        self.assertEqual(limited.stats['rate_limited'], 1)
+
+    def test_orderbook_summary(self):
+        """get_orderbook_summary funciona sobre el libro sintético"""
+        book = get_orderbook_summary('BTC/USDT')
+        self.assertLess(book['bid_price'], book['ask_price'])
+        self.assertEqual(len(book['bids_detail']), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la caché de indicadores
+"""
+
+import unittest
+import pandas as pd
+import pandas_ta as ta
+from strategy import indicator_cache
+from strategy.macd_strategy import check_macd_signal
+from tests.test_backtest_engine import make_candles
+
+
+class TestIndicatorCache(unittest.TestCase):
+    def setUp(self):
+        """Velas con símbolo y temporalidad como las retorna get_price_data"""
+        indicator_cache.clear_indicator_cache()
+        self.df = make_candles(200, 'h', 5)
+        self.df.attrs.update(symbol='BTCUSDT', timeframe='1h')
+
+    def test_macd_computed_once(self):
+        """Los consumidores de las mismas velas comparten un único cálculo"""
+        first = indicator_cache.macd(self.df)
+        second = indicator_cache.macd(self.df.copy())
+
+        self.assertIs(first, second)
+        pd.testing.assert_frame_equal(first, ta.macd(self.df['close']))
+        self.assertEqual(indicator_cache.indicator_cache_info()['misses'], 1)
+
+    def test_forming_candle_invalidates(self):
+        """Un nuevo cierre de la última vela (vela en formación) se recalcula"""
+        first = indicator_cache.macd(self.df)
+        updated = self.df.copy()
+        updated.iloc[-1, updated.columns.get_loc('close')] += 10.0
+
+        second = indicator_cache.macd(updated)
+        self.assertIsNot(first, second)
+        self.assertNotEqual(first.iloc[-1, 0], second.iloc[-1, 0])
+
+    def test_forming_high_low_invalidates(self):
+        """Un nuevo máximo de la vela en formación con el mismo cierre recalcula el rango (ATR)"""
+        first = indicator_cache.true_range(self.df)
+        updated = self.df.copy()
+        updated.iloc[-1, updated.columns.get_loc('high')] *= 1.05
+
+        second = indicator_cache.true_range(updated)
+        self.assertIsNot(first, second)
+        self.assertGreater(second.iloc[-1], first.iloc[-1])
+
+    def test_signal_unchanged(self):
+        """check_macd_signal da el mismo resultado con la caché llena"""
+        expected = check_macd_signal(self.df.copy(), '1h')
+        self.assertEqual(check_macd_signal(self.df.copy(), '1h'), expected)
+        self.assertGreater(indicator_cache.indicator_cache_info()['hits'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la carga de archivos de velas de Binance
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import numpy as np
+
+from utils.candle_store import CandleStore
+from utils.kline_archive import ArchiveError, find_archives, ingest_archives, parse_kline_csv
+
+H_MS = 60 * 60 * 1000
+JAN_2024 = 1_704_067_200_000  # 2024-01-01 UTC
+FEB_2024 = JAN_2024 + 31 * 24 * H_MS
+MAR_2024 = FEB_2024 + 29 * 24 * H_MS
+
+
+def kline_lines(start, end, scale=1):
+    """Líneas CSV de Binance (12 columnas) de velas de 1h en [start, end)"""
+    lines = []
+    for i, ts in enumerate(range(start, end, H_MS)):
+        price = 100.0 + i
+        lines.append(f"{ts * scale},{price},{price + 1},{price - 1},{price + 0.5},10.0,"
+                     f"{(ts + H_MS - 1) * scale},1000.0,5,4.0,400.0,0")
+    return lines
+
+
+class TestKlineArchive(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.archive_dir = os.path.join(self.root, 'archives')
+        os.makedirs(self.archive_dir)
+        self.store = CandleStore(os.path.join(self.root, 'candles'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write_zip(self, period, lines):
+        name = f"BTCUSDT-1h-{period}"
+        with zipfile.ZipFile(os.path.join(self.archive_dir, f"{name}.zip"), 'w') as archive:
+            archive.writestr(f"{name}.csv", "\n".join(lines) + "\n")
+
+    def test_parse_microseconds_and_header(self):
+        """Los timestamps en microsegundos y la cabecera opcional se normalizan"""
+        path = os.path.join(self.root, 'klines.csv')
+        with open(path, 'w') as f:
+            f.write("open_time,open,high,low,close,volume,close_time,quote_volume,count,"
+                    "taker_buy_volume,taker_buy_quote_volume,ignore\n")
+            f.write("\n".join(kline_lines(JAN_2024, JAN_2024 + 3 * H_MS, scale=1000)) + "\n")
+
+        records = parse_kline_csv(path)
+        self.assertEqual(list(records['timestamp']), [JAN_2024, JAN_2024 + H_MS, JAN_2024 + 2 * H_MS])
+        self.assertEqual(records['close'][1], 101.5)
+
+    def test_ingest_months(self):
+        """Los meses consecutivos quedan contiguos en el almacén y se informan los huecos del exchange"""
+        self.write_zip('2024-01', kline_lines(JAN_2024, FEB_2024))
+        feb = kline_lines(FEB_2024, MAR_2024, scale=1000)
+        del feb[10:12]  # parada del exchange
+        self.write_zip('2024-02', feb)
+        # Un diario de un mes ya cubierto por el mensual se ignora
+        self.write_zip('2024-01-05', kline_lines(JAN_2024 + 4 * 24 * H_MS, JAN_2024 + 5 * 24 * H_MS))
+
+        archives = find_archives(self.archive_dir)
+        self.assertEqual([info['period'] for _, info in archives[('BTCUSDT', '1h')]], ['2024-01', '2024-02'])
+
+        report = ingest_archives(archives[('BTCUSDT', '1h')], 'BTCUSDT', '1h', store=self.store, verbose=False)
+        self.assertEqual(report['rows'], 60 * 24 - 2)
+        self.assertEqual(report['gaps'], [(FEB_2024 + 9 * H_MS, FEB_2024 + 12 * H_MS, 2)])
+        self.assertEqual(self.store.coverage('BTCUSDT', '1h'), (JAN_2024, MAR_2024 - H_MS))
+
+    def test_missing_period_stops(self):
+        """Si falta un mes entre dos archivos la carga se detiene en el hueco"""
+        self.write_zip('2024-01', kline_lines(JAN_2024, FEB_2024))
+        self.write_zip('2024-03', kline_lines(MAR_2024, MAR_2024 + 24 * H_MS))
+        archives = find_archives(self.archive_dir, 'BTC/USDT', '1h')[('BTCUSDT', '1h')]
+
+        with self.assertRaises(ArchiveError):
+            ingest_archives(archives, 'BTCUSDT', '1h', store=self.store, verbose=False)
+        self.assertEqual(self.store.coverage('BTCUSDT', '1h'), (JAN_2024, FEB_2024 - H_MS))
+
+        report = ingest_archives(archives, 'BTCUSDT', '1h', store=self.store, allow_gaps=True, verbose=False)
+        self.assertEqual(report['missing_periods'], [(FEB_2024, MAR_2024)])
+        self.assertEqual(len(self.store.load('BTCUSDT', '1h')), 31 * 24 + 24)
+
+    def test_not_contiguous_with_store(self):
+        """No se escribe nada si los archivos dejarían un hueco con el almacén"""
+        self.store.merge('BTCUSDT', '1h', np.array([[MAR_2024 + 48 * H_MS, 1, 1, 1, 1, 1]]))
+        self.write_zip('2024-01', kline_lines(JAN_2024, FEB_2024))
+        archives = find_archives(self.archive_dir)[('BTCUSDT', '1h')]
+
+        with self.assertRaises(ArchiveError):
+            ingest_archives(archives, 'BTCUSDT', '1h', store=self.store, verbose=False)
+        self.assertEqual(len(self.store.load('BTCUSDT', '1h')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el MACD por lotes
+"""
+
+import unittest
+import numpy as np
+from strategy.macd_batch import batch_macd_signals
+from strategy.macd_strategy import compute_macd_signals, SIGNAL_NAMES
+from tests.test_backtest_engine import make_candles
+
+
+class TestMACDBatch(unittest.TestCase):
+    def setUp(self):
+        """Preparar datos para las pruebas"""
+        self.df = make_candles(600, 'h', 4)
+        self.params = [(12, 26, 9), (8, 21, 5), (5, 35, 9), (10, 21, 12)]
+
+    def test_matches_single_variant(self):
+        """Cada fila del lote coincide con compute_macd_signals de su variante"""
+        batch, codes, strength = batch_macd_signals(self.df, self.params, '1h')
+
+        for k, (fast, slow, signal) in enumerate(self.params):
+            expected = compute_macd_signals(self.df, '1h', fast, slow, signal)
+            frame = batch.frame(k)
+            for col in frame.columns:
+                np.testing.assert_array_equal(frame[col].to_numpy(), expected[col].to_numpy())
+            np.testing.assert_array_equal(SIGNAL_NAMES[codes[k]], expected['signal'].to_numpy())
+            np.testing.assert_array_equal(strength[k], expected['strength'].to_numpy())
+
+    def test_short_series(self):
+        """Sin velas suficientes para la EMA lenta el MACD queda vacío y la señal es 'hold'"""
+        batch, codes, _ = batch_macd_signals(self.df.iloc[:30], [(12, 40, 9), {'fast': 5, 'slow': 10, 'signal': 3}])
+
+        self.assertEqual(batch.macd.shape, (2, 30))
+        self.assertTrue(np.isnan(batch.macd[0]).all())
+        self.assertFalse(np.isnan(batch.hist[1]).all())
+        self.assertTrue((codes == 0).all())
+
+if __name__ == '__main__':
+    unittest.main()
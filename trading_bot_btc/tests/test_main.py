@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la descarga concurrente de main.fetch_market_data
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import ccxt
+import pandas as pd
+
+import main
+from config import EXCHANGE_ID
+from utils import api_data, candle_store
+from utils.api_data import get_multi_timeframe_data
+from utils.exchange_client import reset_exchanges, set_exchange
+from utils.fake_exchange import FakeExchange
+
+TIMEFRAMES = ['15m', '1h', '4h']
+
+
+class TestFetchMarketData(unittest.TestCase):
+    def setUp(self):
+        """Exchange falso y almacén temporal"""
+        self.root = tempfile.mkdtemp()
+        self.previous_store = candle_store._default_store
+        candle_store._default_store = candle_store.CandleStore(self.root)
+        self.exchange = FakeExchange(seed=4)
+        set_exchange(EXCHANGE_ID, self.exchange)
+        api_data._resample_cache.clear()
+
+    def tearDown(self):
+        candle_store._default_store = self.previous_store
+        reset_exchanges()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_failed_timeframe_is_reported(self):
+        """Una temporalidad que falla vuelve como excepción y las demás como DataFrame"""
+        # Con un solo hilo las peticiones salen en orden: la primera es la de 15m
+        self.exchange.fail_next(1, ccxt.ExchangeError("fake: error programado"))
+        with mock.patch.object(main, 'DERIVE_TIMEFRAMES', False):
+            candles, book = main.fetch_market_data('BTC/USDT', TIMEFRAMES, max_workers=1)
+
+        self.assertIsInstance(candles['15m'], Exception)
+        for tf in ('1h', '4h'):
+            self.assertIsInstance(candles[tf], pd.DataFrame)
+            self.assertEqual(len(candles[tf]), 1000)
+            self.assertEqual(candles[tf].attrs['timeframe'], tf)
+        self.assertIn('mid_price', book)
+
+    def test_derived_timeframes(self):
+        """Con DERIVE_TIMEFRAMES se devuelven las velas de get_multi_timeframe_data"""
+        with mock.patch.object(main, 'DERIVE_TIMEFRAMES', True), \
+                mock.patch.object(main, 'get_multi_timeframe_data', wraps=get_multi_timeframe_data) as derive, \
+                mock.patch.object(main, 'get_price_data') as price_data:
+            candles, book = main.fetch_market_data('BTC/USDT', TIMEFRAMES)
+        derive.assert_called_once_with('BTC/USDT', TIMEFRAMES)
+        price_data.assert_not_called()
+        for tf in TIMEFRAMES:
+            self.assertEqual(len(candles[tf]), 1000)
+            self.assertEqual(candles[tf].attrs['timeframe'], tf)
+        self.assertIn('mid_price', book)
+
+        error = ValueError("sin base")
+        with mock.patch.object(main, 'DERIVE_TIMEFRAMES', True), \
+                mock.patch.object(main, 'get_multi_timeframe_data', side_effect=error):
+            candles, book = main.fetch_market_data('BTC/USDT', TIMEFRAMES)
+        self.assertEqual(candles, {tf: error for tf in TIMEFRAMES})
+        self.assertIn('mid_price', book)
+
+    def test_client_creation_error(self):
+        """Si no se puede crear el cliente, el error se devuelve para cada petición"""
+        error = ccxt.NetworkError("sin conexión")
+        with mock.patch.object(main, 'get_exchange', side_effect=error):
+            candles, book = main.fetch_market_data('BTC/USDT', TIMEFRAMES)
+        self.assertEqual(candles, {tf: error for tf in TIMEFRAMES})
+        self.assertIs(book, error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la simulación Monte Carlo de operaciones
+"""
+
+import unittest
+
+import numpy as np
+
+from backtesting.metrics import calculate_max_drawdown
+from backtesting.monte_carlo import run_monte_carlo, trade_returns
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.trades = [{'pnl': float(pnl)} for pnl in rng.normal(1.0, 15.0, 200)]
+
+    def test_trade_returns_compound_back(self):
+        """Componer los retornos reproduce el capital final del backtest"""
+        pnl = np.array([t['pnl'] for t in self.trades])
+        returns = trade_returns(pnl, 1000.0)
+        self.assertAlmostEqual(1000.0 * np.prod(1 + returns), 1000.0 + pnl.sum())
+
+    def test_permutation_keeps_final_capital(self):
+        """Al permutar solo cambia el orden: mismo capital final, distinto drawdown"""
+        result = run_monte_carlo(self.trades, 1000.0, n_paths=2000, method='permutation', seed=1)
+        final = 1000.0 + sum(t['pnl'] for t in self.trades)
+        np.testing.assert_allclose(result['final_capital'], final)
+        self.assertGreater(np.ptp(result['max_drawdown']), 0)
+        self.assertEqual(result['final_capital'].shape, (2000,))
+
+    def test_single_ordering_drawdown(self):
+        """Con P&L sumados, un solo camino permutado tiene el drawdown de metrics"""
+        pnl = [10.0, -30.0, 5.0, -10.0, 40.0]
+        result = run_monte_carlo(pnl, 100.0, n_paths=500, method='permutation', compound=False, seed=0)
+        ordered = [100.0] + list(100.0 + np.cumsum(pnl))
+        self.assertIn(round(calculate_max_drawdown(ordered) * 100, 6), np.round(result['max_drawdown'], 6))
+
+    def test_risk_of_ruin_and_seed(self):
+        """Las pérdidas seguras llevan a la ruina y la semilla hace la simulación reproducible"""
+        ruin = run_monte_carlo([-300.0, -400.0, -500.0], 1000.0, n_paths=100, compound=False, seed=3)
+        self.assertEqual(ruin['risk_of_ruin'], 1.0)
+        self.assertEqual(ruin['probability_of_loss'], 1.0)
+
+        first = run_monte_carlo(self.trades, 1000.0, n_paths=300, seed=5)
+        second = run_monte_carlo(self.trades, 1000.0, n_paths=300, seed=5)
+        np.testing.assert_array_equal(first['final_capital'], second['final_capital'])
+        self.assertLessEqual(first['summary']['max_drawdown']['p5'], first['summary']['max_drawdown']['p95'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el backtest de cartera multi-símbolo
+"""
+
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from backtesting.engine import BacktestEngine, prepare_signal_frames
+from backtesting.portfolio import PortfolioBacktest, entry_directions
+from utils.synthetic_data import generate_ohlcv
+
+
+class TestPortfolioBacktest(unittest.TestCase):
+    def setUp(self):
+        """Tres símbolos sintéticos de 1h; el tercero empieza 200 velas más tarde"""
+        self.data = {
+            'AAA/USDT': {'1h': generate_ohlcv(2000, '1h', mode='regime', seed=1)},
+            'BBB/USDT': {'1h': generate_ohlcv(2000, '1h', mode='regime', seed=2)},
+            'CCC/USDT': {'1h': generate_ohlcv(2200, '1h', mode='regime', seed=3).iloc[200:]}
+        }
+        self.start = datetime(2017, 1, 3)
+        self.end = datetime(2017, 4, 1)
+
+    def test_single_symbol_matches_engine(self):
+        """Con un símbolo y una posición se obtienen las mismas operaciones que BacktestEngine"""
+        data = {'1h': self.data['AAA/USDT']['1h'], '4h': generate_ohlcv(500, '4h', mode='regime', seed=1)}
+        engine = BacktestEngine('AAA/USDT', self.start, self.end, timeframes=['1h', '4h'], data=data,
+                                verbose=False).run()
+        portfolio = PortfolioBacktest(['AAA/USDT'], self.start, self.end, timeframes=['1h', '4h'],
+                                      data={'AAA/USDT': data}, max_positions=1, verbose=False).run()
+
+        self.assertGreater(engine['total_trades'], 0)
+        self.assertEqual([(t['entry_time'], t['exit_time'], t['pnl']) for t in portfolio['trades']],
+                         [(t['entry_time'], t['exit_time'], t['pnl']) for t in engine['trades']])
+        self.assertAlmostEqual(portfolio['final_capital'], engine['final_capital'])
+        np.testing.assert_allclose(portfolio['series']['balance'], engine['series']['balance'])
+
+    def test_entry_directions(self):
+        """La primera temporalidad con señal de entrada decide la dirección"""
+        frames = prepare_signal_frames({'1h': self.data['AAA/USDT']['1h']})
+        directions = entry_directions(frames, ['1h'])
+        signals = frames['1h']['signal'].to_numpy()
+        expected = np.where(np.isin(signals, ['buy', 'valley_buy']), 1,
+                            np.where(np.isin(signals, ['sell', 'top_sell']), -1, 0))
+        expected[:34] = 0
+        np.testing.assert_array_equal(directions, expected)
+
+    def test_shared_capital(self):
+        """Índice común, capital compartido y límite de posiciones simultáneas"""
+        results = PortfolioBacktest(list(self.data), self.start, self.end, timeframes=['1h'], data=self.data,
+                                    max_positions=2, verbose=False).run()
+
+        self.assertEqual(len(results['series']['timestamp']), 2200)
+        self.assertTrue(np.all(np.diff(results['series']['timestamp']) > 0))
+        self.assertLessEqual(results['series']['open_positions'].max(), 2)
+        self.assertGreater(results['series']['open_positions'].max(), 1)
+        self.assertEqual({t['symbol'] for t in results['trades']}, set(self.data))
+        self.assertAlmostEqual(results['final_capital'],
+                               results['initial_capital'] + sum(t['pnl'] for t in results['trades']))
+        self.assertAlmostEqual(results['series']['balance'][-1], results['final_capital'])
+        self.assertEqual(sum(s['trades'] for s in results['per_symbol'].values()), results['total_trades'])
+
+        # Ningún símbolo tiene dos posiciones abiertas a la vez
+        for symbol in self.data:
+            trades = sorted((t for t in results['trades'] if t['symbol'] == symbol), key=lambda t: t['entry_time'])
+            for previous, current in zip(trades, trades[1:]):
+                self.assertGreater(current['entry_time'], previous['exit_time'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la gestión de posiciones
+"""
+
+import unittest
+import numpy as np
+from risk_management.position_manager import PositionManager
+
+
+class TestFindExit(unittest.TestCase):
+    def setUp(self):
+        """Precios sintéticos con un paseo aleatorio"""
+        rng = np.random.default_rng(7)
+        self.prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.004, 3000)))
+        self.config = {'stop_loss_pct': 0.02, 'take_profit_pct': 0.04, 'trailing_stop_pct': 0.015}
+
+    def scan_bar_by_bar(self, manager, start):
+        """Salida encontrada llamando a check_exit_signals vela a vela"""
+        for i in range(start, len(self.prices)):
+            should_exit, reason, _ = manager.check_exit_signals(self.prices[i])
+            if should_exit:
+                return i, reason
+        return None, None
+
+    def test_matches_bar_by_bar(self):
+        """find_exit encuentra la misma vela y razón y deja la posición en el mismo estado"""
+        for position_type in ['long', 'short']:
+            for entry in range(0, 2900, 37):
+                fast = PositionManager(self.config)
+                slow = PositionManager(self.config)
+                for manager in (fast, slow):
+                    manager.open_position(position_type, self.prices[entry], entry, 1000.0)
+
+                expected = self.scan_bar_by_bar(slow, entry + 1)
+                self.assertEqual(fast.find_exit(self.prices, start=entry + 1), expected)
+                if expected[0] is not None:
+                    self.assertEqual(fast.get_current_position(), slow.get_current_position())
+
+    def test_no_exit(self):
+        """Sin salida retorna (None, None) y la posición sigue abierta"""
+        manager = PositionManager(self.config)
+        manager.open_position('long', 100.0, 0, 1000.0)
+        self.assertEqual(manager.find_exit(np.full(1000, 100.5)), (None, None))
+        self.assertIsNotNone(manager.get_current_position())
+
+if __name__ == '__main__':
+    unittest.main()
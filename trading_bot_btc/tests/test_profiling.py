@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la medición por etapas
+"""
+
+import unittest
+from datetime import datetime
+from backtesting.engine import BacktestEngine
+from utils.profiling import NULL_PROFILER, StageProfiler, get_profiler
+from tests.test_backtest_engine import make_candles
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_accumulates_stages(self):
+        """Cada etapa acumula tiempo, llamadas y filas en orden de aparición"""
+        profiler = StageProfiler()
+        for _ in range(3):
+            with profiler.stage('signals', rows=10):
+                pass
+        with profiler.stage('positions') as stage:
+            stage.rows = 5
+
+        stages = profiler.summary()['stages']
+        self.assertEqual(list(stages), ['signals', 'positions'])
+        self.assertEqual(stages['signals']['calls'], 3)
+        self.assertEqual(stages['signals']['rows'], 30)
+        self.assertEqual(stages['positions']['rows'], 5)
+        self.assertGreaterEqual(stages['signals']['seconds'], 0.0)
+
+    def test_disabled_profiler(self):
+        """Desactivado no registra nada; un perfilador creado se reutiliza"""
+        self.assertIs(get_profiler(False), NULL_PROFILER)
+        with NULL_PROFILER.stage('signals') as stage:
+            stage.rows = 1
+        self.assertIsNone(NULL_PROFILER.summary())
+
+        profiler = StageProfiler()
+        self.assertIs(get_profiler(profiler), profiler)
+
+    def test_engine_profile(self):
+        """El perfil del motor cubre sus etapas y no cambia las operaciones"""
+        data = {'1h': make_candles(400, 'h', 1)}
+        runs = {}
+        for profile in (False, True):
+            engine = BacktestEngine(
+                symbol='BTC/USDT',
+                start_date=datetime(2024, 1, 1),
+                end_date=datetime(2024, 2, 1),
+                timeframes=['1h'],
+                data=data,
+                verbose=False,
+                profile=profile
+            )
+            runs[profile] = engine.run()
+
+        self.assertNotIn('profile', runs[False])
+        self.assertEqual(runs[True]['trades'], runs[False]['trades'])
+        stages = runs[True]['profile']['stages']
+        for name in ('indicators', 'precompute_signals', 'signals', 'series', 'metrics'):
+            self.assertIn(name, stages)
+        self.assertEqual(stages['precompute_signals']['rows'], 400)
+        # Las búsquedas de entrada y de salida recorren todas las velas una vez
+        scanned = stages['signals']['rows'] + stages.get('positions', {}).get('rows', 0)
+        self.assertEqual(scanned, 400)
+
+if __name__ == '__main__':
+    unittest.main()
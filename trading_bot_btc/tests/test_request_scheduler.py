@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el planificador de peticiones
+"""
+
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+import ccxt
+from config import EXCHANGE_ID
+from utils import candle_store
+from utils.api_data import _fetch_ohlcv_windows, get_price_data
+from utils.exchange_client import _create_exchange, reset_exchanges, set_exchange
+from utils.fake_exchange import FakeExchange
+from utils.request_scheduler import RequestScheduler, TokenBucket, reset_schedulers, set_scheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_window_limit(self):
+        """Ninguna ventana de 60 s supera el límite, ni siquiera con el bucket lleno al empezar"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, window=60.0, burst_seconds=5, clock=clock)
+        times = []
+        for _ in range(300):
+            clock.sleep(bucket.reserve(1))
+            times.append(clock.now)
+
+        for i, start in enumerate(times):
+            in_window = sum(1 for t in times[i:] if t < start + 60.0)
+            self.assertLessEqual(in_window, 60)
+        # Y se aprovecha el límite: 300 peticiones en poco más de 5 minutos
+        self.assertLess(times[-1], 5.5 * 60)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_retries_with_backoff(self):
+        """Los errores de red se reintentan con espera creciente; el resto se propaga"""
+        clock = FakeClock()
+        scheduler = RequestScheduler(max_retries=3, backoff_base=1.0, sleep=clock.sleep, clock=clock, seed=1)
+        failures = [ccxt.RequestTimeout('timeout'), ccxt.RateLimitExceeded('429')]
+
+        def flaky():
+            if failures:
+                raise failures.pop(0)
+            return 'ok'
+
+        self.assertEqual(scheduler.call('fetch_ohlcv', flaky), 'ok')
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['rate_limited'], 1)
+        self.assertGreaterEqual(metrics['backoff_seconds'], 0.5 + 4.0)
+
+        def invalid():
+            raise ccxt.BadSymbol('símbolo inválido')
+
+        with self.assertRaises(ccxt.BadSymbol):
+            scheduler.call('fetch_ohlcv', invalid)
+        self.assertEqual(scheduler.metrics()['requests'], 4)
+
+    def test_ccxt_limiter_only_without_scheduler_limit(self):
+        """El limitador de ccxt no compite con el planificador en los exchanges que este limita"""
+        self.assertFalse(_create_exchange('binance').enableRateLimit)
+        self.assertTrue(_create_exchange('kraken').enableRateLimit)
+
+
+class TestResumableDownload(unittest.TestCase):
+    def setUp(self):
+        """Exchange falso con páginas pequeñas y almacén temporal"""
+        self.root = tempfile.mkdtemp()
+        self.previous_store = candle_store._default_store
+        candle_store._default_store = candle_store.CandleStore(self.root)
+        self.exchange = FakeExchange(page_size=100, seed=3)
+        set_exchange(EXCHANGE_ID, self.exchange)
+        self.scheduler = RequestScheduler(max_retries=2, sleep=lambda seconds: None)
+        set_scheduler(self.exchange.id, self.scheduler)
+        self.start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        self.end = datetime(2022, 1, 31, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        candle_store._default_store = self.previous_store
+        reset_exchanges()
+        reset_schedulers()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_transient_errors_do_not_truncate(self):
+        """Con errores transitorios la descarga termina completa"""
+        self.exchange.fail_next(2)
+        df = get_price_data('BTC/USDT', '1h', self.start, self.end, use_cache=False)
+        self.assertEqual(len(df), 30 * 24 + 1)
+        self.assertTrue(df.attrs['complete'])
+        self.assertEqual(self.scheduler.metrics()['retries'], 2)
+
+    def test_interrupted_download_resumes(self):
+        """Una descarga cortada se marca incompleta y la siguiente continúa desde el almacén"""
+        original = self.exchange.fetch_ohlcv
+        calls = []
+
+        def failing_after_three_pages(*args, **kwargs):
+            calls.append(kwargs.get('since'))
+            if len(calls) > 3:
+                raise ccxt.ExchangeNotAvailable('caído')
+            return original(*args, **kwargs)
+
+        self.exchange.fetch_ohlcv = failing_after_three_pages
+        partial = get_price_data('BTC/USDT', '1h', self.start, self.end)
+        self.assertFalse(partial.attrs['complete'])
+        self.assertEqual(len(partial), 300)
+
+        self.exchange.fetch_ohlcv = original
+        requests_before = self.exchange.stats['fetch_ohlcv']
+        df = get_price_data('BTC/USDT', '1h', self.start, self.end)
+        self.assertTrue(df.attrs['complete'])
+        self.assertEqual(len(df), 30 * 24 + 1)
+        # Solo se descargan las 421 velas que faltaban
+        self.assertEqual(self.exchange.stats['fetch_ohlcv'] - requests_before, 5)
+
+    def test_parallel_windows(self):
+        """Las ventanas en paralelo dan las mismas velas que la paginación secuencial"""
+        since = 1_640_995_200_000  # 2022-01-01 UTC
+        end_ts = since + 999 * 3_600_000
+        sequential, _ = _fetch_ohlcv_windows(self.exchange, 'BTCUSDT', '1h', since, end_ts, 100, max_workers=1)
+        parallel, cursor = _fetch_ohlcv_windows(self.exchange, 'BTCUSDT', '1h', since, end_ts, 100, max_workers=4)
+
+        self.assertTrue(cursor.done)
+        self.assertEqual(cursor.pages, 10)
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(len(parallel), 1000)
+
+    def test_failed_window_keeps_contiguous_prefix(self):
+        """Si una ventana falla solo se retornan las velas anteriores a ella"""
+        since = 1_640_995_200_000
+        end_ts = since + 999 * 3_600_000
+        failing_since = since + 300 * 3_600_000
+        original = self.exchange.fetch_ohlcv
+
+        def fetch_ohlcv(symbol, timeframe='1m', since=None, limit=None, params=None):
+            if since == failing_since:
+                raise ccxt.ExchangeNotAvailable('caído')
+            return original(symbol, timeframe, since, limit)
+
+        self.exchange.fetch_ohlcv = fetch_ohlcv
+        rows, cursor = _fetch_ohlcv_windows(self.exchange, 'BTCUSDT', '1h', since, end_ts, 100, max_workers=4)
+
+        self.assertFalse(cursor.done)
+        self.assertEqual(len(rows), 300)
+        self.assertEqual(cursor.since, failing_since)
+
+if __name__ == '__main__':
+    unittest.main()
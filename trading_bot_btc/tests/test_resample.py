@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la agregación de velas a temporalidades superiores
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import pandas as pd
+import numpy as np
+from config import DERIVE_MAX_BASE_CANDLES, EXCHANGE_ID
+from utils import api_data, candle_store
+from utils.api_data import get_multi_timeframe_data, get_price_data, resample_ohlcv, align_timestamp
+from utils.exchange_client import reset_exchanges, set_exchange
+from utils.fake_exchange import FakeExchange
+
+AGGREGATIONS = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+class TestResample(unittest.TestCase):
+    def setUp(self):
+        """Velas de 15m que empiezan a mitad de una hora"""
+        rng = np.random.default_rng(0)
+        periods = 3000
+        dates = pd.date_range(start='2024-01-01 03:15', periods=periods, freq='15min')
+        close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.001, periods)))
+        self.base = pd.DataFrame({
+            'open': close * (1 + rng.random(periods) * 0.001),
+            'high': close * 1.002,
+            'low': close * 0.998,
+            'close': close,
+            'volume': rng.random(periods)
+        }, index=dates)
+
+    def test_matches_pandas_resample(self):
+        """La agregación coincide con pandas alineado a la época Unix"""
+        for timeframe, freq in [('1h', '1h'), ('4h', '4h'), ('1d', '1D'), ('3d', '3D')]:
+            result = resample_ohlcv(self.base, timeframe)
+            expected = self.base.resample(freq, origin='epoch').agg(AGGREGATIONS)
+            expected = expected[expected.index >= self.base.index[0]]
+
+            self.assertTrue(result.index.equals(expected.index), timeframe)
+            np.testing.assert_allclose(result.to_numpy(), expected[result.columns].to_numpy())
+
+    def test_partial_head_dropped(self):
+        """La primera hora incompleta se descarta"""
+        result = resample_ohlcv(self.base, '1h')
+        self.assertEqual(result.index[0], pd.Timestamp('2024-01-01 04:00'))
+
+    def test_weekly_alignment(self):
+        """Las velas semanales abren en lunes"""
+        monday = pd.Timestamp('2024-01-08').value // 10**6
+        self.assertEqual(align_timestamp(monday + 3 * 86400000, '1w'), monday)
+
+
+class TestMultiTimeframeData(unittest.TestCase):
+    def setUp(self):
+        """Exchange falso y almacén temporal"""
+        self.root = tempfile.mkdtemp()
+        self.previous_store = candle_store._default_store
+        candle_store._default_store = candle_store.CandleStore(self.root)
+        set_exchange(EXCHANGE_ID, FakeExchange(seed=2))
+        api_data._resample_cache.clear()
+
+    def tearDown(self):
+        candle_store._default_store = self.previous_store
+        reset_exchanges()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_latest_candles_outside_utc(self):
+        """Fuera de UTC la base llega hasta la última vela, igual que una descarga directa"""
+        previous_tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/Bogota'
+        time.tzset()
+        try:
+            frames = get_multi_timeframe_data('BTC/USDT', ['15m', '1h'], limit=200)
+            direct = get_price_data('BTC/USDT', '15m', limit=200)
+        finally:
+            if previous_tz is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = previous_tz
+            time.tzset()
+
+        self.assertEqual(frames['15m'].index[-1], direct.index[-1])
+        self.assertEqual(frames['1h'].index[-1], direct.index[-1].floor('1h'))
+
+    def test_forming_candle_not_cached(self):
+        """Una vela base en formación distinta no devuelve las velas agregadas anteriores"""
+        index = pd.date_range('2024-01-01', periods=400, freq='15min')
+        base = pd.DataFrame({'open': 100.0, 'high': 101.0, 'low': 99.0, 'close': 100.0, 'volume': 1.0}, index=index)
+        changed = base.copy()
+        changed.iloc[-1, changed.columns.get_loc('close')] = 200.0
+
+        end = index[-1]
+        with mock.patch.object(api_data, 'get_price_data', side_effect=[base, changed]):
+            first = get_multi_timeframe_data('BTC/USDT', ['15m', '1h'], start_date=index[0], end_date=end)
+            second = get_multi_timeframe_data('BTC/USDT', ['15m', '1h'], start_date=index[0], end_date=end)
+
+        self.assertEqual(first['1h']['close'].iloc[-1], 100.0)
+        self.assertEqual(second['15m']['close'].iloc[-1], 200.0)
+        self.assertEqual(second['1h']['close'].iloc[-1], 200.0)
+
+    def test_base_download_is_bounded(self):
+        """Sin fechas, las temporalidades que no caben en la base se piden directamente"""
+        calls = []
+
+        def fake_price_data(symbol, timeframe, start_date=None, end_date=None, limit=1000):
+            calls.append((timeframe, start_date, limit))
+            return pd.DataFrame()
+
+        with mock.patch.object(api_data, 'get_price_data', side_effect=fake_price_data):
+            get_multi_timeframe_data('BTC/USDT', ['15m', '1h', '4h', '3d'], limit=1000)
+
+        base = [call for call in calls if call[0] == '15m']
+        self.assertEqual(len(base), 1)
+        span_ms = time.time() * 1000 - base[0][1].value // 10**6
+        self.assertLessEqual(span_ms, (DERIVE_MAX_BASE_CANDLES + 4) * 15 * 60 * 1000)
+        self.assertEqual(sorted(call[0] for call in calls if call[0] != '15m'), ['3d', '4h'])
+        self.assertTrue(all(call[2] == 1000 for call in calls if call[0] != '15m'))
+
+    def test_concurrent_calls(self):
+        """Varios hilos comparten la caché de agregación sin errores y con los mismos resultados"""
+        timeframes = ['15m', '1h', '4h']
+        windows = [(symbol, pd.Timestamp('2024-01-01') + pd.Timedelta(days=day), pd.Timedelta(days=span))
+                   for symbol in ('BTC/USDT', 'ETH/USDT') for day in range(4) for span in (3, 5)]
+        # Referencia secuencial; también deja las velas en el almacén
+        def fetch(window):
+            symbol, start, span = window
+            return get_multi_timeframe_data(symbol, timeframes, start_date=start, end_date=start + span)
+
+        expected = {window: fetch(window) for window in windows}
+
+        def worker(window):
+            return window, fetch(window)
+
+        previous_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            # Caché pequeña para que las entradas se expulsen mientras otros hilos las buscan
+            with mock.patch.object(api_data, '_RESAMPLE_CACHE_SIZE', 2):
+                api_data._resample_cache.clear()
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    results = list(executor.map(worker, windows * 6))
+        finally:
+            sys.setswitchinterval(previous_interval)
+
+        self.assertEqual(len(results), len(windows) * 6)
+        self.assertLessEqual(len(api_data._resample_cache), 2)
+        for window, frames in results:
+            for tf in timeframes:
+                self.assertFalse(frames[tf].empty)
+                pd.testing.assert_frame_equal(frames[tf], expected[window][tf])
+
+if __name__ == '__main__':
+    unittest.main()
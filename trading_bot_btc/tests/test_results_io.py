@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el formato binario de resultados
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+import numpy as np
+from backtesting.engine import BacktestEngine
+from backtesting.results_io import save_results, load_results, load_meta, load_series, load_trades, list_results
+from tests.test_backtest_engine import make_candles
+
+
+class TestResultsIO(unittest.TestCase):
+    def setUp(self):
+        """Ejecutar un backtest sobre velas sintéticas"""
+        self.root = tempfile.mkdtemp()
+        engine = BacktestEngine(
+            symbol='BTC/USDT',
+            start_date=datetime(2024, 1, 1),
+            end_date=datetime(2024, 2, 1),
+            timeframes=['1h'],
+            data={'1h': make_candles(600, 'h', 3)},
+            verbose=False
+        )
+        self.results = engine.run()
+        self.path = save_results(self.results, os.path.join(self.root, 'backtest'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Las métricas, series y operaciones se recuperan sin cambios"""
+        loaded = load_results(self.path)
+
+        self.assertEqual(loaded['final_capital'], self.results['final_capital'])
+        self.assertEqual(loaded['total_trades'], self.results['total_trades'])
+        for col, values in self.results['series'].items():
+            np.testing.assert_array_equal(loaded['series'][col], values)
+
+        self.assertGreater(len(loaded['trades']), 0)
+        for original, restored in zip(self.results['trades'], loaded['trades']):
+            self.assertEqual(restored['entry_time'], original['entry_time'])
+            self.assertEqual(restored['pnl'], original['pnl'])
+            self.assertEqual(restored['exit_reason'], original['exit_reason'])
+            self.assertEqual([s['signal'] for s in restored['entry_signals']],
+                             [s['signal'] for s in original['entry_signals']])
+
+    def test_partial_loading(self):
+        """Se pueden leer solo las métricas o solo las series con memoria mapeada"""
+        meta = load_meta(self.path)
+        self.assertEqual(meta['bars'], len(self.results['series']['timestamp']))
+        self.assertNotIn('series', meta)
+
+        series = load_series(self.path)
+        self.assertIsInstance(series, np.memmap)
+        self.assertEqual(len(load_trades(self.path)), self.results['total_trades'])
+        self.assertEqual(list_results(self.root), [self.path])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de equivalencia entre los indicadores incrementales y el cálculo por lotes
+"""
+
+import unittest
+import pandas as pd
+import numpy as np
+import pandas_ta as ta
+from strategy.macd_strategy import check_macd_signal, compute_macd_signals
+from strategy.streaming_indicators import MACDSignalState, check_streaming_signal
+
+
+class TestStreamingIndicators(unittest.TestCase):
+    def setUp(self):
+        """Preparar datos para las pruebas"""
+        rng = np.random.default_rng(7)
+        periods = 300
+        dates = pd.date_range(start='2024-01-01', periods=periods, freq='h')
+        close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.004, periods)))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        self.test_data = pd.DataFrame({
+            'open': open_,
+            'high': np.maximum(open_, close) * (1 + rng.random(periods) * 0.002),
+            'low': np.minimum(open_, close) * (1 - rng.random(periods) * 0.002),
+            'close': close,
+            'volume': rng.random(periods) * 1000
+        }, index=dates)
+
+    def stream(self, timeframe='1h'):
+        """Avanza el estado vela a vela y guarda cada snapshot y señal"""
+        state = MACDSignalState(timeframe)
+        snapshots = []
+        signals = []
+        for timestamp, bar in self.test_data.iterrows():
+            state.update({'timestamp': timestamp, 'high': bar['high'], 'low': bar['low'], 'close': bar['close']})
+            snapshots.append(state.snapshot())
+            signals.append(check_streaming_signal(state))
+        return pd.DataFrame(snapshots), signals
+
+    def test_indicators_match_batch(self):
+        """MACD, ATR y EMAs coinciden con pandas_ta en cada vela"""
+        snapshots, _ = self.stream()
+        df = self.test_data
+        macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
+        atr = ta.true_range(df['high'], df['low'], df['close']).rolling(window=14).mean()
+
+        expected = {
+            'macd': macd['MACD_12_26_9'],
+            'macd_signal': macd['MACDs_12_26_9'],
+            'macd_hist': macd['MACDh_12_26_9'],
+            'atr': atr,
+            'ema_20': ta.ema(df['close'], length=20),
+            'ema_50': ta.ema(df['close'], length=50)
+        }
+        for column, values in expected.items():
+            np.testing.assert_allclose(snapshots[column].to_numpy(), values.to_numpy(),
+                                       rtol=1e-9, equal_nan=True, err_msg=column)
+
+    def test_signals_match_batch(self):
+        """Las señales incrementales coinciden con las calculadas por lotes"""
+        _, signals = self.stream()
+        batch = compute_macd_signals(self.test_data, '1h')
+
+        self.assertEqual([s for s, _ in signals], list(batch['signal']))
+        np.testing.assert_allclose([f for _, f in signals], batch['strength'].to_numpy(), rtol=1e-9)
+
+    def test_last_signal_matches_check_macd_signal(self):
+        """La última señal coincide con check_macd_signal sobre el histórico completo"""
+        _, signals = self.stream()
+        signal, strength = check_macd_signal(self.test_data.copy(), '1h')
+
+        self.assertEqual(signals[-1][0], signal)
+        self.assertAlmostEqual(signals[-1][1], strength, places=9)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el barrido de parámetros
+"""
+
+import json
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from backtesting.engine import BacktestEngine
+from backtesting.sweep import (DEFAULT_PARAM_GRID, RESULT_KEYS, _split_params, build_param_grid, run_sweep,
+                               sample_params)
+from utils.synthetic_data import generate_ohlcv
+
+
+class TestParamSets(unittest.TestCase):
+    def test_build_param_grid(self):
+        """Todas las combinaciones, con la última clave variando más rápido"""
+        grid = build_param_grid({'stop_loss_pct': [0.01, 0.02], 'fast': [8, 12, 16]})
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(grid[0], {'stop_loss_pct': 0.01, 'fast': 8})
+        self.assertEqual(grid[1], {'stop_loss_pct': 0.01, 'fast': 12})
+        self.assertEqual(grid[-1], {'stop_loss_pct': 0.02, 'fast': 16})
+        self.assertEqual(len(build_param_grid()), 108)
+        self.assertEqual(len({tuple(sorted(p.items())) for p in build_param_grid()}), 108)
+
+        with self.assertRaises(ValueError):
+            build_param_grid({'stop_loss_pct': {'min': 0.01, 'max': 0.03}})
+
+    def test_sample_params(self):
+        """La misma semilla da la misma muestra y los valores salen del espacio"""
+        space = {'stop_loss_pct': (0.005, 0.03), 'fast': (5, 15), 'signal': [7, 9, 11]}
+        samples = sample_params(space, 50, seed=7)
+        self.assertEqual(samples, sample_params(space, 50, seed=7))
+        self.assertNotEqual(samples, sample_params(space, 50, seed=8))
+        self.assertEqual(len(samples), 50)
+        for params in samples:
+            self.assertTrue(0.005 <= params['stop_loss_pct'] <= 0.03)
+            self.assertIsInstance(params['fast'], int)
+            self.assertTrue(5 <= params['fast'] <= 15)
+            self.assertIn(params['signal'], [7, 9, 11])
+
+        default = sample_params(n_samples=20, seed=1)
+        for params in default:
+            for key, value in params.items():
+                self.assertIn(value, DEFAULT_PARAM_GRID[key])
+
+    def test_json_ranges(self):
+        """Un rango {'min', 'max'} leído de JSON se muestrea igual que una tupla"""
+        space = json.loads('{"stop_loss_pct": {"min": 0.005, "max": 0.03}, "fast": {"min": 5, "max": 15}}')
+        samples = sample_params(space, 30, seed=3)
+        self.assertEqual(samples, sample_params({'stop_loss_pct': (0.005, 0.03), 'fast': (5, 15)}, 30, seed=3))
+        self.assertGreater(len({params['stop_loss_pct'] for params in samples}), 25)
+
+
+class TestRunSweep(unittest.TestCase):
+    def setUp(self):
+        """60 días de velas de 1h desde 2017-01-01"""
+        self.data = {'1h': generate_ohlcv(60 * 24, '1h', mode='regime', seed=5)}
+        self.start = datetime(2017, 1, 3)
+        self.end = datetime(2017, 2, 28)
+        self.param_sets = [
+            {'stop_loss_pct': 0.02, 'take_profit_pct': 0.04, 'fast': 12, 'slow': 26, 'signal': 9},
+            {'stop_loss_pct': 0.01, 'take_profit_pct': 0.02, 'fast': 8, 'slow': 21, 'signal': 9},
+            {'stop_loss_pct': 0.03, 'take_profit_pct': 0.06, 'fast': 8, 'slow': 21, 'signal': 5}
+        ]
+
+    def test_rows_match_engine(self):
+        """Cada fila es el backtest directo con la misma configuración de riesgo y MACD"""
+        table = run_sweep('SYNTH/USDT', self.start, self.end, self.param_sets, processes=2, data=self.data)
+        self.assertEqual(len(table), len(self.param_sets))
+        self.assertTrue(table['error'].isna().all())
+
+        for params in self.param_sets:
+            risk_config, macd_params = _split_params(params)
+            expected = BacktestEngine('SYNTH/USDT', self.start, self.end, timeframes=['1h'], risk_config=risk_config,
+                                      data=self.data, macd_params=macd_params, verbose=False).run()
+            row = table[(table['stop_loss_pct'] == params['stop_loss_pct']) &
+                        (table['signal'] == params['signal'])].iloc[0]
+            for key in RESULT_KEYS:
+                self.assertAlmostEqual(row[key], expected[key], msg=key)
+
+        self.assertTrue(np.all(np.diff(table['total_return'].to_numpy()) <= 0))
+
+    def test_failing_config(self):
+        """Una configuración que falla queda como fila con error sin afectar a las demás"""
+        param_sets = self.param_sets + [{'stop_loss_pct': 0.02, 'fast': 0, 'slow': 26, 'signal': 9},
+                                        {'stop_loss_pct': None, 'fast': 12, 'slow': 26, 'signal': 9}]
+        table = run_sweep('SYNTH/USDT', self.start, self.end, param_sets, processes=2, data=self.data)
+
+        failed = table[table['error'].notna()]
+        self.assertEqual(len(failed), 2)
+        self.assertTrue(failed[RESULT_KEYS].isna().all().all())
+        self.assertEqual(list(failed.index), [3, 4])
+        self.assertTrue(table.loc[:2, 'error'].isna().all())
+
+    def test_rank_by_drawdown(self):
+        """max_drawdown se ordena de menor a mayor"""
+        table = run_sweep('SYNTH/USDT', self.start, self.end, self.param_sets, processes=1,
+                          rank_by='max_drawdown', data=self.data)
+        self.assertTrue(np.all(np.diff(table['max_drawdown'].to_numpy()) >= 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para el generador de velas sintéticas
+"""
+
+import unittest
+from datetime import datetime, timezone
+import numpy as np
+from utils.api_data import get_price_data
+from utils.synthetic_data import SyntheticMarket, SYNTHETIC_MODES, CHUNK_SIZE, generate_ohlcv
+
+
+class TestSyntheticData(unittest.TestCase):
+    def test_valid_candles(self):
+        """Todas las velas de todos los modos son coherentes (high/low envuelven open/close)"""
+        for mode in SYNTHETIC_MODES:
+            df = generate_ohlcv(5000, '1h', mode=mode, seed=1)
+            self.assertEqual(len(df), 5000)
+            self.assertTrue((df['high'] >= df[['open', 'close']].max(axis=1)).all())
+            self.assertTrue((df['low'] <= df[['open', 'close']].min(axis=1)).all())
+            self.assertTrue((df['volume'] > 0).all())
+            np.testing.assert_array_equal(df['open'].to_numpy()[1:], df['close'].to_numpy()[:-1])
+
+    def test_deterministic_ranges(self):
+        """Una vela tiene el mismo valor se pida el rango que se pida, también entre bloques"""
+        full = SyntheticMarket('BTCUSDT', '15m', 'stochastic_vol', seed=7).bars(0, CHUNK_SIZE + 5000)
+        part = SyntheticMarket('BTCUSDT', '15m', 'stochastic_vol', seed=7).bars(CHUNK_SIZE - 2000, 6000)
+        np.testing.assert_array_equal(part, full[CHUNK_SIZE - 2000:CHUNK_SIZE + 4000])
+
+        other = SyntheticMarket('BTCUSDT', '15m', 'stochastic_vol', seed=8).bars(0, 100)
+        self.assertFalse(np.array_equal(other, full[:100]))
+
+    def test_price_data_source(self):
+        """get_price_data con source='synthetic' respeta el rango de fechas sin usar el exchange"""
+        df = get_price_data('BTC/USDT', '1h', datetime(2024, 1, 1, tzinfo=timezone.utc),
+                            datetime(2024, 1, 3, tzinfo=timezone.utc), source='synthetic')
+
+        self.assertEqual(len(df), 49)
+        self.assertEqual(df.index[0], datetime(2024, 1, 1))
+        self.assertEqual(df.attrs['timeframe'], '1h')
+
+if __name__ == '__main__':
+    unittest.main()
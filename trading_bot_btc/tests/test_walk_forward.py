@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la optimización walk-forward
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtesting.engine import prepare_signal_frames
+from backtesting.sweep import _split_params
+from backtesting.walk_forward import _run_window, build_folds, run_walk_forward, slice_frames
+from utils.synthetic_data import generate_ohlcv
+
+
+class TestWalkForward(unittest.TestCase):
+    def setUp(self):
+        """90 días de velas de 1h desde 2017-01-01"""
+        self.data = {'1h': generate_ohlcv(90 * 24, '1h', mode='regime', seed=3)}
+        self.param_sets = [
+            {'stop_loss_pct': 0.02, 'take_profit_pct': 0.04, 'fast': 12, 'slow': 26, 'signal': 9},
+            {'stop_loss_pct': 0.01, 'take_profit_pct': 0.02, 'fast': 8, 'slow': 21, 'signal': 9}
+        ]
+
+    def test_build_folds(self):
+        """Ventanas móviles y ancladas con pruebas contiguas"""
+        rolling = build_folds(datetime(2024, 1, 1), datetime(2024, 4, 30), '60D', '30D')
+        self.assertEqual(len(rolling), 2)
+        self.assertEqual(rolling[1]['train_start'], datetime(2024, 1, 31))
+        self.assertEqual(rolling[0]['test_end'] + timedelta(milliseconds=1), rolling[1]['test_start'])
+
+        anchored = build_folds(datetime(2024, 1, 1), datetime(2024, 4, 30), '60D', '30D', anchored=True)
+        self.assertTrue(all(fold['train_start'] == datetime(2024, 1, 1) for fold in anchored))
+
+    def test_slice_keeps_history(self):
+        """El recorte no recalcula indicadores y guarda las velas anteriores como historial"""
+        frames = prepare_signal_frames(self.data)
+        index = frames['1h'].index
+        sliced = slice_frames(frames, '1h', index[500], index[800])
+        self.assertEqual(sliced['1h'].attrs['history_bars'], 500)
+        self.assertEqual(len(sliced['1h']), 301)
+        self.assertEqual(sliced['1h']['signal'].tolist(), frames['1h']['signal'].iloc[500:801].tolist())
+
+    def test_run_walk_forward(self):
+        """Cada fold elige la mejor configuración de entrenamiento y el capital se encadena"""
+        results = run_walk_forward('SYNTH/USDT', datetime(2017, 1, 3), datetime(2017, 3, 31), self.param_sets,
+                                   train_period='30D', test_period='15D', processes=1, data=self.data)
+
+        self.assertEqual(len(results['folds']), 4)
+        self.assertEqual(len(results['train_results']), 4 * len(self.param_sets))
+        capital = 1000.0
+        for fold in results['folds']:
+            self.assertIn(fold['params'], [dict(sorted(p.items())) for p in self.param_sets])
+            self.assertEqual(fold['start_capital'], capital)
+            capital = fold['end_capital']
+
+            # La métrica de entrenamiento es la del backtest directo con esa configuración
+            risk_config, macd_params = _split_params(fold['params'])
+            train = _run_window(prepare_signal_frames(self.data, macd_params), 'SYNTH/USDT', ['1h'], fold['train_start'], fold['train_end'], 1000.0,
+                                risk_config, macd_params)
+            self.assertAlmostEqual(train['total_return'], fold['train_metric'])
+
+        self.assertEqual(results['final_capital'], capital)
+        self.assertTrue(np.all(np.diff(results['series']['timestamp']) > 0))
+        self.assertEqual(results['series']['balance'][-1], capital)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tests para la decisión ponderada multi-temporalidad
+"""
+
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from backtesting.alignment import build_alignment
+from backtesting.engine import BacktestEngine, prepare_signal_frames
+from config import SIGNAL_THRESHOLD, TIMEFRAMES
+from strategy.weighted_score import score_series, signal_contribution, weighted_decision
+from utils.api_data import resample_ohlcv
+from utils.synthetic_data import generate_ohlcv
+
+
+class TestWeightedScore(unittest.TestCase):
+    def setUp(self):
+        """30 días de 15m y las temporalidades superiores agregadas a partir de ellos"""
+        base = generate_ohlcv(30 * 96, '15m', mode='regime', seed=5)
+        self.data = {'15m': base}
+        for tf in ('30m', '1h', '4h'):
+            self.data[tf] = resample_ohlcv(base, tf)
+        self.frames = prepare_signal_frames(self.data)
+
+    def test_single_evaluation(self):
+        """Pesos y decisión de una evaluación, como en main.evaluate_multi_timeframe"""
+        self.assertEqual(signal_contribution('valley_buy', 0.5, 5), (3.75, 0.0))
+        self.assertEqual(signal_contribution('sell', 0.8, 2), (0.0, 1.6))
+        self.assertEqual(signal_contribution('hold', 0.0, 13), (0.0, 0.0))
+
+        self.assertEqual(weighted_decision(3.0, 0.5), 1)
+        self.assertEqual(weighted_decision(1.0, 1.0 + SIGNAL_THRESHOLD), -1)
+        self.assertEqual(weighted_decision(1.0, 0.5), 0)
+        np.testing.assert_array_equal(weighted_decision(np.array([3.0, 1.0, 1.0]), np.array([0.5, 3.5, 0.5])),
+                                      [1, -1, 0])
+
+    def test_score_series_matches_per_bar_sum(self):
+        """Los arrays coinciden con sumar vela a vela la última señal cerrada de cada temporalidad"""
+        alignment = build_alignment(self.frames, '15m')
+        signals = {tf: (df['signal'].to_numpy(), df['strength'].to_numpy()) for tf, df in self.frames.items()}
+        peso_buy, peso_sell = score_series(signals, alignment)
+
+        for i in range(0, len(self.frames['15m']), 7):
+            expected_buy = expected_sell = 0.0
+            for tf, peso_tf in TIMEFRAMES.items():
+                if tf not in self.frames:
+                    continue
+                j = alignment[tf][i]
+                if j < 0 or j + 1 < 35:
+                    continue
+                buy, sell = signal_contribution(signals[tf][0][j], signals[tf][1][j], peso_tf)
+                expected_buy += buy
+                expected_sell += sell
+            self.assertAlmostEqual(peso_buy[i], expected_buy)
+            self.assertAlmostEqual(peso_sell[i], expected_sell)
+        self.assertTrue(np.any(weighted_decision(peso_buy, peso_sell) != 0))
+
+    def test_engine_trades_on_score(self):
+        """Cada entrada es la primera vela con decisión LONG o SHORT tras la salida anterior"""
+        engine = BacktestEngine('SYNTH/USDT', datetime(2017, 1, 3), datetime(2017, 1, 31), timeframes=list(self.data),
+                                data=self.frames, entry_mode='weighted_score', verbose=False)
+        results = engine.run()
+        directions = weighted_decision(*engine.scores)
+        index = self.frames['15m'].index
+
+        self.assertGreater(results['total_trades'], 0)
+        self.assertEqual(results['entry_mode'], 'weighted_score')
+        np.testing.assert_allclose(results['series']['buy_score'], engine.scores[0])
+        previous_exit = -1
+        for trade in results['trades']:
+            entry = index.get_loc(trade['entry_time'])
+            self.assertEqual(entry, previous_exit + 1 + np.flatnonzero(directions[previous_exit + 1:])[0])
+            self.assertEqual(trade['type'], 'long' if directions[entry] > 0 else 'short')
+            previous_exit = index.get_loc(trade['exit_time'])
+
+        with self.assertRaises(ValueError):
+            BacktestEngine('SYNTH/USDT', datetime(2017, 1, 3), datetime(2017, 1, 31), data=self.frames,
+                           entry_mode='weighted_score', precompute_signals=False, verbose=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
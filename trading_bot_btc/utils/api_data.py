@@ -7,98 +7,351 @@ Created on Thu Apr 10 22:46:40 2025
 
 # utils/api_data.py
 
-import ccxt
+import threading
+import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import CANDLE_STORE_ENABLED, BASE_TIMEFRAME, DATA_SOURCE, FETCH_MAX_WORKERS, DERIVE_MAX_BASE_CANDLES
+from utils.candle_store import CANDLE_DTYPE, get_candle_store, rows_to_records
+from utils.exchange_client import get_exchange
+from utils.request_scheduler import OHLCVCursor, get_scheduler
 
-def get_price_data(symbol, timeframe='15m', start_date=None, end_date=None, limit=1000):
+# Mapeo de timeframes a minutos
+TIMEFRAME_MINUTES = {
+    '1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30,
+    '1h': 60, '2h': 120, '4h': 240, '6h': 360, '8h': 480,
+    '12h': 720, '1d': 1440, '3d': 4320, '1w': 10080
+}
+
+def timeframe_to_ms(timeframe):
+    """Duración de una vela en milisegundos"""
+    return TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+
+def timeframe_offset_ms(timeframe):
+    """
+    Desplazamiento de las velas respecto a la época Unix
+
+    Binance alinea todas las velas (incluida la de 3d) a la época Unix,
+    excepto la semanal, que abre los lunes (la época fue jueves).
+    """
+    if timeframe == '1w':
+        return 4 * 24 * 60 * 60 * 1000
+    return 0
+
+def align_timestamp(ts, timeframe):
+    """Inicio de la vela de `timeframe` que contiene el timestamp ts (ms)"""
+    period = timeframe_to_ms(timeframe)
+    offset = timeframe_offset_ms(timeframe)
+    return (ts - offset) // period * period + offset
+
+def _fetch_ohlcv_range(exchange, symbol, timeframe, since, end_ts, limit, cursor=None, on_page=None):
+    """
+    Descarga velas paginando desde `since` hasta `end_ts`
+
+    Cada página pasa por el planificador de peticiones del exchange, que espera
+    el peso disponible y reintenta los errores transitorios. Si una página falla
+    igualmente, la descarga se corta y el cursor queda en la primera vela que falta.
+
+    Args:
+        cursor: OHLCVCursor de una descarga cortada, para continuarla (opcional)
+        on_page: Función llamada con cada página descargada (opcional)
+
+    Returns:
+        tuple: (velas, cursor) donde cursor.done es False si la descarga se cortó
+    """
+    scheduler = get_scheduler(getattr(exchange, 'id', None))
+    cursor = cursor or OHLCVCursor(symbol, timeframe, since, end_ts)
+    all_data = []
+    tf_ms = timeframe_to_ms(timeframe)
+
+    while True:
+        try:
+            # Hacer la petición
+            ohlcv = scheduler.call('fetch_ohlcv', exchange.fetch_ohlcv, symbol,
+                                   timeframe=timeframe, since=cursor.since, limit=limit)
+        except Exception as e:
+            cursor.error = str(e)
+            print(f"⚠️ Descarga de {symbol} en {timeframe} cortada tras {cursor.pages} páginas "
+                  f"({cursor.rows} velas): {e}. Se puede reanudar desde {cursor.since}")
+            return all_data, cursor
+
+        if not ohlcv:
+            break
+
+        all_data.extend(ohlcv)
+        cursor.advance(ohlcv)
+        if on_page is not None:
+            on_page(ohlcv)
+
+        # Verificar si hemos llegado al final
+        last_ts = ohlcv[-1][0]
+        if end_ts and last_ts >= end_ts:
+            break
+        # Una página corta solo marca el final si no hay fecha de fin o si llega
+        # hasta la vela en formación: el exchange puede paginar por debajo de `limit`
+        if len(ohlcv) < limit and (not end_ts or last_ts + tf_ms > time.time() * 1000):
+            break
+
+    cursor.done = True
+    cursor.error = None
+    return all_data, cursor
+
+def _fetch_ohlcv_windows(exchange, symbol, timeframe, since, end_ts, limit, on_page=None, max_workers=None):
+    """
+    Descarga [since, end_ts] en ventanas de `limit` velas pedidas en paralelo
+
+    Los timestamps de las velas dependen solo de la temporalidad, así que cada
+    ventana se puede pedir sin esperar a la anterior. Todas comparten el
+    planificador de peticiones del exchange, es decir, el mismo límite de peso.
+    Las velas se entregan en orden y sin duplicados; si una ventana falla se
+    descartan las siguientes, de modo que lo retornado es contiguo desde `since`.
+
+    Returns:
+        tuple: (velas, cursor) como _fetch_ohlcv_range
+    """
+    max_workers = max_workers or FETCH_MAX_WORKERS
+    if since is None or not end_ts:
+        return _fetch_ohlcv_range(exchange, symbol, timeframe, since, end_ts, limit, on_page=on_page)
+
+    tf_ms = timeframe_to_ms(timeframe)
+    window_ms = limit * tf_ms
+    first = align_timestamp(since, timeframe)
+    if first < since:
+        first += tf_ms
+    starts = list(range(first, end_ts + 1, window_ms))
+    if len(starts) <= 1 or max_workers <= 1:
+        return _fetch_ohlcv_range(exchange, symbol, timeframe, since, end_ts, limit, on_page=on_page)
+
+    def fetch_window(start):
+        end = min(start + window_ms - tf_ms, end_ts)
+        rows, cursor = _fetch_ohlcv_range(exchange, symbol, timeframe, start, end, limit)
+        # Una página puede pasarse de la ventana (o saltar a la primera vela disponible)
+        return [row for row in rows if start <= row[0] <= end], cursor
+
+    all_data = []
+    overall = OHLCVCursor(symbol, timeframe, since, end_ts)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(starts)))
+    try:
+        futures = [executor.submit(fetch_window, start) for start in starts]
+        for future in futures:
+            rows, cursor = future.result()
+            overall.pages += cursor.pages
+            overall.rows += len(rows)
+            if rows:
+                all_data.extend(rows)
+                overall.since = rows[-1][0] + 1
+                if on_page is not None:
+                    on_page(rows)
+            if not cursor.done:
+                overall.since = cursor.since
+                overall.error = cursor.error
+                return all_data, overall
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    overall.done = True
+    return all_data, overall
+
+def _utc_timestamp(date):
+    """
+    Fecha como pd.Timestamp UTC sin zona horaria, igual que el índice de las velas
+
+    Las fechas sin zona horaria se interpretan como UTC (no como hora local),
+    de modo que el rango pedido al exchange y el recorte del DataFrame coinciden.
+    """
+    ts = pd.Timestamp(date)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts
+
+def _ohlcv_to_dataframe(all_data, start_date=None, end_date=None):
+    """Convierte velas en bruto a un DataFrame indexado por timestamp"""
+    df = pd.DataFrame(all_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype(np.int64), unit='ms')
+    df = df.set_index('timestamp')
+
+    # Filtrar por fechas y eliminar duplicados
+    if start_date:
+        df = df[df.index >= pd.Timestamp(start_date)]
+    if end_date:
+        df = df[df.index <= pd.Timestamp(end_date)]
+
+    # Eliminar duplicados y ordenar por índice
+    df = df[~df.index.duplicated(keep='first')]
+    df = df.sort_index()
+
+    return df
+
+def _records_to_dataframe(records, start_date=None, end_date=None):
+    """
+    Convierte registros CANDLE_DTYPE del almacén (ya ordenados y sin duplicados)
+    a un DataFrame indexado por timestamp, sin pasar por listas de Python
+    """
+    # Los registros están ordenados: los límites se buscan en lugar de filtrar fila a fila
+    timestamps = records['timestamp']
+    lo = np.searchsorted(timestamps, pd.Timestamp(start_date).value // 1_000_000, side='left') if start_date else 0
+    hi = np.searchsorted(timestamps, pd.Timestamp(end_date).value // 1_000_000, side='right') if end_date else len(records)
+    records = records[lo:hi]
+
+    index = pd.DatetimeIndex(pd.to_datetime(records['timestamp'], unit='ms'), name='timestamp')
+    return pd.DataFrame({col: records[col] for col in ('open', 'high', 'low', 'close', 'volume')}, index=index)
+
+# Velas descargadas entre dos escrituras en el almacén durante una descarga larga
+_CHECKPOINT_ROWS = 50000
+
+def _get_cached_ohlcv(exchange, symbol, timeframe, start_ts, end_ts, limit):
+    """
+    Obtiene velas leyendo primero el almacén local y descargando solo los huecos
+    de cabeza o cola. Las velas cerradas descargadas se guardan en el almacén;
+    la vela en formación se devuelve pero no se guarda.
+
+    Las descargas que empiezan en el almacén (o en un almacén vacío) se guardan
+    cada _CHECKPOINT_ROWS velas: si se cortan, la siguiente llamada continúa
+    desde la última vela guardada.
+
+    Returns:
+        tuple: (registros CANDLE_DTYPE, completo) donde completo es False si alguna
+               descarga se cortó; sin vela en formación, los registros son una vista
+               del archivo mapeado en memoria
+    """
+    store = get_candle_store()
+    tf_ms = timeframe_to_ms(timeframe)
+    now_ms = int(time.time() * 1000)
+
+    # Sin fechas: las últimas `limit` velas hasta ahora
+    if end_ts is None:
+        end_ts = now_ms
+    if start_ts is None:
+        start_ts = (min(end_ts, now_ms) // tf_ms) * tf_ms - (limit - 1) * tf_ms
+
+    page_limit = 1000  # Binance tiene un límite de 1000
+    coverage = store.coverage(symbol, timeframe)
+    forming = []
+
+    complete = True
+
+    def fetch(since, until, checkpoint=None):
+        """Velas cerradas de [since, until]; con checkpoint se guardan por tandas"""
+        closed = []
+
+        def on_page(page):
+            for row in page:
+                (closed if row[0] + tf_ms <= now_ms else forming).append(row)
+            if checkpoint is not None and len(closed) >= _CHECKPOINT_ROWS:
+                checkpoint(closed)
+                closed.clear()
+
+        _, cursor = _fetch_ohlcv_windows(exchange, symbol, timeframe, since, until, page_limit, on_page=on_page)
+        return closed, cursor.done
+
+    if coverage is None:
+        # Lo descargado es contiguo desde start_ts aunque la descarga se corte
+        def checkpoint(rows):
+            store.merge(symbol, timeframe, rows, coverage_start=start_ts)
+
+        closed, complete = fetch(start_ts, end_ts, checkpoint)
+        if closed:
+            store.merge(symbol, timeframe, closed, coverage_start=start_ts)
+    else:
+        first_ts, last_ts = coverage
+
+        # Hueco de cabeza: solo se guarda si la descarga llegó completa hasta el almacén
+        if start_ts < first_ts:
+            closed, head_complete = fetch(start_ts, first_ts - 1)
+            closed = [r for r in closed if r[0] < first_ts]
+            if head_complete:
+                store.merge(symbol, timeframe, closed, coverage_start=start_ts)
+            complete = complete and head_complete
+
+        # Hueco de cola: cualquier prefijo descargado sigue siendo contiguo
+        if end_ts >= last_ts + tf_ms and last_ts + tf_ms < now_ms:
+            def checkpoint(rows):
+                store.merge(symbol, timeframe, rows)
+
+            closed, tail_complete = fetch(last_ts + tf_ms, end_ts, checkpoint)
+            store.merge(symbol, timeframe, closed)
+            complete = complete and tail_complete
+
+    records = store.records(symbol, timeframe, start_ts, end_ts)
+    forming = [r for r in forming if start_ts <= r[0] <= end_ts]
+    if forming:
+        records = np.concatenate([records, rows_to_records(forming)])
+
+    return records, complete
+
+def get_price_data(symbol, timeframe='15m', start_date=None, end_date=None, limit=1000, use_cache=None, source=None):
     """
     Obtiene datos históricos de precios
     
     Args:
         symbol: Par de trading (ej. 'BTC/USDT')
         timeframe: Temporalidad ('15m', '30m', '1h', '4h', '1d', '3d')
-        start_date: Fecha de inicio (datetime o None)
-        end_date: Fecha de fin (datetime o None)
+        start_date: Fecha de inicio (datetime o None; sin zona horaria se toma como UTC)
+        end_date: Fecha de fin (datetime o None; sin zona horaria se toma como UTC)
         limit: Número máximo de velas a obtener
+        use_cache: Usar el almacén local de velas (por defecto config.CANDLE_STORE_ENABLED)
+        source: 'exchange' o 'synthetic' (por defecto config.DATA_SOURCE)
+
+    Returns:
+        DataFrame: Velas OHLCV; df.attrs['complete'] es False si la descarga se
+                   cortó tras agotar los reintentos (faltan las velas finales)
     """
     try:
-        binance = ccxt.binance()
-        
         # Asegurarse de que el símbolo esté en el formato correcto para Binance
         if '/' in symbol:
             symbol = symbol.replace('/', '')
         
-        # Convertir fechas a timestamp en milisegundos
-        start_ts = int(start_date.timestamp() * 1000) if start_date else None
-        end_ts = int(end_date.timestamp() * 1000) if end_date else None
+        # Convertir fechas a UTC (como el índice de las velas) y a milisegundos
+        start_date = _utc_timestamp(start_date) if start_date else None
+        end_date = _utc_timestamp(end_date) if end_date else None
+        start_ts = start_date.value // 1_000_000 if start_date else None
+        end_ts = end_date.value // 1_000_000 if end_date else None
         
-        # Calcular el número de velas necesarias basado en el timeframe
-        if start_ts and end_ts:
-            # Mapeo de timeframes a minutos
-            tf_map = {
-                '1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30,
-                '1h': 60, '2h': 120, '4h': 240, '6h': 360, '8h': 480,
-                '12h': 720, '1d': 1440, '3d': 4320, '1w': 10080
-            }
-            
-            # Obtener minutos del timeframe
-            tf_minutes = tf_map.get(timeframe, 60)
-            
-            # Calcular número de velas necesarias
-            time_diff = (end_ts - start_ts) / (1000 * 60)  # diferencia en minutos
-            num_candles = int(time_diff / tf_minutes) + 2  # +2 para asegurar cobertura
+        source = source or DATA_SOURCE
+        complete = True
+        if source == 'synthetic':
+            # Velas deterministas generadas localmente, sin exchange ni almacén
+            from utils.synthetic_data import synthetic_ohlcv
+            all_data = synthetic_ohlcv(symbol, timeframe, start_ts, end_ts, limit)
+        elif source == 'exchange':
+            exchange = get_exchange()
             
-            # Ajustar limit si es necesario
-            limit = min(num_candles, 1000)  # Binance tiene un límite de 1000
-        
-        # Obtener datos históricos
-        all_data = []
-        current_ts = start_ts
-        
-        while True:
-            try:
-                # Hacer la petición
-                ohlcv = binance.fetch_ohlcv(symbol, timeframe=timeframe, since=current_ts, limit=limit)
-                
-                if not ohlcv:
-                    break
+            if use_cache is None:
+                use_cache = CANDLE_STORE_ENABLED
+
+            if use_cache:
+                all_data, complete = _get_cached_ohlcv(exchange, symbol, timeframe, start_ts, end_ts, limit)
+            else:
+                # Calcular el número de velas necesarias basado en el timeframe
+                if start_ts and end_ts:
+                    # Obtener minutos del timeframe
+                    tf_minutes = TIMEFRAME_MINUTES.get(timeframe, 60)
                     
-                all_data.extend(ohlcv)
-                
-                # Verificar si hemos llegado al final
-                last_ts = ohlcv[-1][0]
-                if end_ts and last_ts >= end_ts:
-                    break
-                if len(ohlcv) < limit:
-                    break
+                    # Calcular número de velas necesarias
+                    time_diff = (end_ts - start_ts) / (1000 * 60)  # diferencia en minutos
+                    num_candles = int(time_diff / tf_minutes) + 2  # +2 para asegurar cobertura
                     
-                current_ts = last_ts + 1
+                    # Ajustar limit si es necesario
+                    limit = min(num_candles, 1000)  # Binance tiene un límite de 1000
                 
-            except Exception as e:
-                print(f"Error al obtener datos para {symbol} en {timeframe}: {e}")
-                break
+                # Obtener datos históricos
+                all_data, cursor = _fetch_ohlcv_windows(exchange, symbol, timeframe, start_ts, end_ts, limit)
+                complete = cursor.done
+        else:
+            raise ValueError(f"Origen de datos desconocido: {source}")
         
-        if not all_data:
+        if len(all_data) == 0:
             print(f"No se pudieron obtener datos para {symbol} en el período especificado")
             return pd.DataFrame()
         
-        # Convertir a DataFrame
-        df = pd.DataFrame(all_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df = df.set_index('timestamp')
-        
-        # Filtrar por fechas y eliminar duplicados
-        if start_date:
-            df = df[df.index >= pd.Timestamp(start_date)]
-        if end_date:
-            df = df[df.index <= pd.Timestamp(end_date)]
-        
-        # Eliminar duplicados y ordenar por índice
-        df = df[~df.index.duplicated(keep='first')]
-        df = df.sort_index()
-        
+        # Convertir a DataFrame; símbolo y temporalidad identifican las velas en la caché de indicadores
+        if isinstance(all_data, np.ndarray) and all_data.dtype == CANDLE_DTYPE:
+            df = _records_to_dataframe(all_data, start_date, end_date)
+        else:
+            df = _ohlcv_to_dataframe(all_data, start_date, end_date)
+        df.attrs.update(symbol=symbol, timeframe=timeframe, complete=complete)
         return df
         
     except Exception as e:
@@ -106,9 +359,158 @@ def get_price_data(symbol, timeframe='15m', start_date=None, end_date=None, limi
         return pd.DataFrame()
 
 
+# Caché en memoria de velas agregadas: (símbolo, base, timeframe, inicio, fin, filas, última vela base) -> DataFrame
+# Protegida con un lock: varios hilos agregan velas a la vez (cartera multi-símbolo, main)
+_resample_cache = OrderedDict()
+_resample_cache_lock = threading.Lock()
+_RESAMPLE_CACHE_SIZE = 32
+
+def resample_ohlcv(df, timeframe, drop_partial_head=True):
+    """
+    Agrega velas OHLCV a una temporalidad superior con los límites del exchange
+
+    Args:
+        df: DataFrame OHLCV indexado por timestamp (temporalidad base)
+        timeframe: Temporalidad destino ('30m', '1h', '4h', '1d', '3d', ...)
+        drop_partial_head: Descartar la primera vela si la base no cubre su inicio
+
+    Returns:
+        DataFrame: Velas agregadas indexadas por su hora de apertura
+    """
+    if df.empty:
+        return df.copy()
+
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    buckets = align_timestamp(timestamps, timeframe)
+
+    # Las velas están ordenadas: cada cambio de bucket abre una vela nueva
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [len(buckets)]])
+
+    result = pd.DataFrame({
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends - 1],
+        'volume': np.add.reduceat(df['volume'].to_numpy(), starts)
+    }, index=pd.to_datetime(buckets[starts], unit='ms'))
+    result.index.name = df.index.name
+
+    if drop_partial_head and timestamps[0] != buckets[0]:
+        result = result.iloc[1:]
+
+    return result
+
+def _can_derive(timeframe, base_timeframe):
+    """Indica si las velas de `timeframe` se pueden construir exactamente desde `base_timeframe`"""
+    period = timeframe_to_ms(timeframe)
+    base = timeframe_to_ms(base_timeframe)
+    return period % base == 0 and timeframe_offset_ms(timeframe) % base == 0
+
+def _choose_base_timeframe(timeframes):
+    """La menor temporalidad pedida si todas derivan de ella; si no, config.BASE_TIMEFRAME"""
+    smallest = min(timeframes, key=timeframe_to_ms)
+    if all(_can_derive(tf, smallest) for tf in timeframes):
+        return smallest
+    return BASE_TIMEFRAME
+
+def get_multi_timeframe_data(symbol, timeframes, base_timeframe=None, start_date=None, end_date=None, limit=1000):
+    """
+    Obtiene varias temporalidades a partir de una única descarga de la temporalidad base
+
+    Sin fechas, la base solo se usa para las temporalidades cuyas `limit` velas
+    caben en DERIVE_MAX_BASE_CANDLES velas base; las mayores se descargan
+    directamente (son pocas velas), en paralelo con la base.
+
+    Args:
+        symbol: Par de trading (ej. 'BTC/USDT')
+        timeframes: Lista de temporalidades a construir
+        base_timeframe: Temporalidad a descargar (por defecto la menor de `timeframes`
+                        si todas derivan de ella, o config.BASE_TIMEFRAME)
+        start_date: Fecha de inicio (datetime o None; sin zona horaria se toma como UTC)
+        end_date: Fecha de fin (datetime o None; sin zona horaria se toma como UTC)
+        limit: Sin fechas, número de velas de cada temporalidad hasta ahora
+
+    Returns:
+        dict: {timeframe: DataFrame OHLCV}
+    """
+    base_timeframe = base_timeframe or _choose_base_timeframe(timeframes)
+    for tf in timeframes:
+        if not _can_derive(tf, base_timeframe):
+            raise ValueError(f"No se puede construir {tf} a partir de {base_timeframe}")
+
+    start_date = _utc_timestamp(start_date) if start_date else None
+    end_date = _utc_timestamp(end_date) if end_date else None
+    now_ms = int(time.time() * 1000)
+    end_ms = end_date.value // 1_000_000 if end_date else now_ms
+
+    native = []
+    if start_date:
+        start_ms = start_date.value // 1_000_000
+    else:
+        base_ms = timeframe_to_ms(base_timeframe)
+        native = [tf for tf in timeframes
+                  if tf != base_timeframe and limit * timeframe_to_ms(tf) > DERIVE_MAX_BASE_CANDLES * base_ms]
+    derived = [tf for tf in timeframes if tf not in native]
+    if derived and not start_date:
+        largest = max(derived, key=timeframe_to_ms)
+        start_ms = align_timestamp(end_ms, largest) - (limit - 1) * timeframe_to_ms(largest)
+
+    with ThreadPoolExecutor(max_workers=min(FETCH_MAX_WORKERS, len(native) + 1)) as executor:
+        base_future = None
+        if derived:
+            # Descargar la base desde el inicio de la vela mayor que contiene start_ms
+            # hasta el final de la vela mayor que contiene end_ms
+            base_start = min(align_timestamp(start_ms, tf) for tf in derived)
+            base_end = min(max(align_timestamp(end_ms, tf) + timeframe_to_ms(tf) for tf in derived) - 1, now_ms)
+            base_future = executor.submit(get_price_data, symbol, base_timeframe,
+                                          pd.Timestamp(base_start, unit='ms', tz='UTC'),
+                                          pd.Timestamp(base_end, unit='ms', tz='UTC'))
+        native_futures = {tf: executor.submit(get_price_data, symbol, tf, None, end_date, limit) for tf in native}
+        base_df = base_future.result() if base_future is not None else None
+        result = {tf: future.result() for tf, future in native_futures.items()}
+
+    for tf in derived:
+        if base_df.empty:
+            result[tf] = base_df
+            continue
+
+        if tf == base_timeframe:
+            df = base_df
+        else:
+            # La última vela base (la que se está formando) forma parte de la clave
+            last = tuple(base_df.iloc[-1][['open', 'high', 'low', 'close', 'volume']].astype(float))
+            key = (symbol, base_timeframe, tf, base_df.index[0], base_df.index[-1], len(base_df), last)
+            with _resample_cache_lock:
+                df = _resample_cache.get(key)
+                if df is not None:
+                    _resample_cache.move_to_end(key)
+            if df is None:
+                df = resample_ohlcv(base_df, tf)
+                with _resample_cache_lock:
+                    _resample_cache[key] = df
+                    _resample_cache.move_to_end(key)
+                    while len(_resample_cache) > _RESAMPLE_CACHE_SIZE:
+                        _resample_cache.popitem(last=False)
+
+        # Mismo recorte que get_price_data para cada temporalidad
+        if start_date:
+            df = df[df.index >= start_date]
+        else:
+            df = df.iloc[-limit:]
+        if end_date:
+            df = df[df.index <= end_date]
+        result[tf] = df.copy()
+        result[tf].attrs.update(symbol=symbol.replace('/', ''), timeframe=tf,
+                                complete=base_df.attrs.get('complete', True))
+
+    return {tf: result[tf] for tf in timeframes}
+
+
 def get_orderbook_summary(symbol, depth=10):
-    binance = ccxt.binance()
-    order_book = binance.fetch_order_book(symbol)
+    exchange = get_exchange()
+    scheduler = get_scheduler(getattr(exchange, 'id', None))
+    order_book = scheduler.call('fetch_order_book', exchange.fetch_order_book, symbol)
 
     # Precios bid y ask
     bid_price = order_book['bids'][0][0] if order_book['bids'] else None
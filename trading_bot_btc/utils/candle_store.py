@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén local de velas OHLCV en disco
+
+Cada par (símbolo, temporalidad) se guarda en un archivo binario de registros
+de ancho fijo (`<raíz>/<SIMBOLO>/<timeframe>.candles`): una cabecera de
+HEADER_SIZE bytes seguida de registros CANDLE_DTYPE (timestamp int64 y OHLCV
+float64) ordenados por tiempo. El archivo se abre con np.memmap y se corta
+con una búsqueda binaria en la columna de tiempo, así que leer un rango no
+copia datos y varios procesos comparten las mismas páginas del sistema.
+
+Solo se guardan velas cerradas, de modo que el contenido nunca necesita
+corregirse: las velas nuevas de la cola se añaden al final del archivo y solo
+ampliar por la cabeza (o rellenar un hueco) reescribe el archivo de forma
+atómica. Los archivos `.npz` del formato anterior se convierten al abrirlos.
+"""
+
+import os
+import threading
+import numpy as np
+
+from config import CANDLE_STORE_DIR
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+CANDLE_DTYPE = np.dtype([('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                         ('close', '<f8'), ('volume', '<f8')])
+
+# Cabecera: identificador del formato y coverage_start (int64); el resto queda reservado
+CANDLE_MAGIC = b'OHLCV\x00\x01\x00'
+HEADER_SIZE = 64
+_COVERAGE_OFFSET = len(CANDLE_MAGIC)
+
+
+def rows_to_records(rows):
+    """Convierte una lista o matriz (n, 6) de velas en registros CANDLE_DTYPE"""
+    if isinstance(rows, np.ndarray) and rows.dtype == CANDLE_DTYPE:
+        return rows
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(CANDLE_COLUMNS))
+    records = np.empty(len(rows), dtype=CANDLE_DTYPE)
+    records['timestamp'] = rows[:, 0].astype(np.int64)
+    for i, col in enumerate(CANDLE_COLUMNS[1:], start=1):
+        records[col] = rows[:, i]
+    return records
+
+
+def records_to_rows(records):
+    """Convierte registros CANDLE_DTYPE en una matriz (n, 6) float64 (copia)"""
+    return np.column_stack([records[col].astype(np.float64) for col in CANDLE_COLUMNS]) \
+        if len(records) else np.empty((0, len(CANDLE_COLUMNS)))
+
+
+class CandleStore:
+    """
+    Almacén de velas por (símbolo, temporalidad) con añadidos al final y reescrituras atómicas
+    """
+
+    def __init__(self, root=None):
+        """
+        Args:
+            root: Directorio raíz del almacén (por defecto config.CANDLE_STORE_DIR)
+        """
+        self.root = root or CANDLE_STORE_DIR
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, symbol, timeframe):
+        symbol_clean = symbol.replace('/', '')
+        return os.path.join(self.root, symbol_clean, f"{timeframe}.candles")
+
+    def _lock(self, symbol, timeframe):
+        key = (symbol.replace('/', ''), timeframe)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _migrate(self, symbol, timeframe):
+        """Convierte el archivo `.npz` del formato anterior, si existe y aún no se convirtió"""
+        path = self._path(symbol, timeframe)
+        legacy_path = path[:-len('.candles')] + '.npz'
+        if os.path.exists(path) or not os.path.exists(legacy_path):
+            return
+
+        with self._lock(symbol, timeframe):
+            if os.path.exists(path) or not os.path.exists(legacy_path):
+                return
+            with np.load(legacy_path) as stored:
+                records = np.empty(len(stored['timestamp']), dtype=CANDLE_DTYPE)
+                for col in CANDLE_COLUMNS:
+                    records[col] = stored[col]
+                coverage_start = int(stored['coverage_start'])
+            self._write(path, records, coverage_start)
+            os.remove(legacy_path)
+
+    def _read_header(self, path):
+        """coverage_start y número de registros completos del archivo"""
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or not header.startswith(CANDLE_MAGIC):
+            raise ValueError(f"Archivo de velas no válido: {path}")
+        coverage_start = int(np.frombuffer(header, dtype='<i8', count=1, offset=_COVERAGE_OFFSET)[0])
+        # Un registro a medias (escritura interrumpida) se ignora y se sobrescribe en el siguiente añadido
+        count = (os.path.getsize(path) - HEADER_SIZE) // CANDLE_DTYPE.itemsize
+        return coverage_start, count
+
+    @staticmethod
+    def _header(coverage_start):
+        header = bytearray(HEADER_SIZE)
+        header[:len(CANDLE_MAGIC)] = CANDLE_MAGIC
+        header[_COVERAGE_OFFSET:_COVERAGE_OFFSET + 8] = np.int64(coverage_start).tobytes()
+        return bytes(header)
+
+    def _write(self, path, records, coverage_start):
+        """Reescribe el archivo completo de forma atómica"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._header(coverage_start))
+            f.write(np.ascontiguousarray(records, dtype=CANDLE_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+
+    def records(self, symbol, timeframe, start_ts=None, end_ts=None):
+        """
+        Velas guardadas dentro de [start_ts, end_ts] (milisegundos) sin copiarlas
+
+        Returns:
+            np.ndarray: Registros CANDLE_DTYPE de solo lectura (una vista de np.memmap
+                        sobre el archivo, o un array vacío)
+        """
+        self._migrate(symbol, timeframe)
+        path = self._path(symbol, timeframe)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        _, count = self._read_header(path)
+        if count == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        stored = np.memmap(path, dtype=CANDLE_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+        timestamps = stored['timestamp']
+        lo = np.searchsorted(timestamps, start_ts, side='left') if start_ts is not None else 0
+        hi = np.searchsorted(timestamps, end_ts, side='right') if end_ts is not None else count
+        return stored[lo:hi]
+
+    def load(self, symbol, timeframe, start_ts=None, end_ts=None):
+        """
+        Lee las velas guardadas dentro de [start_ts, end_ts] (milisegundos)
+
+        Returns:
+            np.ndarray: Matriz (n, 6) con las columnas de CANDLE_COLUMNS
+        """
+        return records_to_rows(self.records(symbol, timeframe, start_ts, end_ts))
+
+    def coverage(self, symbol, timeframe):
+        """
+        Rango de tiempo cubierto por el almacén
+
+        Returns:
+            tuple: (primer_ts, último_ts) en milisegundos, o None si está vacío.
+                   primer_ts puede ser anterior a la primera vela si se sabe que
+                   el exchange no tiene datos previos.
+        """
+        self._migrate(symbol, timeframe)
+        path = self._path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+
+        coverage_start, count = self._read_header(path)
+        if count == 0:
+            return None
+        stored = np.memmap(path, dtype=CANDLE_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+        return min(coverage_start, int(stored['timestamp'][0])), int(stored['timestamp'][-1])
+
+    def merge(self, symbol, timeframe, rows, coverage_start=None):
+        """
+        Añade velas cerradas al almacén
+
+        Las velas posteriores a la última guardada se añaden al final del
+        archivo; si hay velas anteriores o dentro de un hueco, el archivo se
+        reescribe de forma atómica.
+
+        Args:
+            rows: Lista o matriz de velas [timestamp, open, high, low, close, volume] o registros CANDLE_DTYPE
+            coverage_start: Timestamp desde el que se sabe que no faltan velas
+        """
+        new_records = rows_to_records(rows)
+        if len(new_records) == 0 and coverage_start is None:
+            return
+
+        self._migrate(symbol, timeframe)
+        path = self._path(symbol, timeframe)
+        with self._lock(symbol, timeframe):
+            # Ordenar y eliminar duplicados de las velas nuevas
+            _, first_idx = np.unique(new_records['timestamp'], return_index=True)
+            new_records = new_records[first_idx]
+
+            if not os.path.exists(path):
+                if len(new_records) == 0:
+                    return
+                candidates = [int(new_records['timestamp'][0])]
+                if coverage_start is not None:
+                    candidates.append(int(coverage_start))
+                self._write(path, new_records, min(candidates))
+                return
+
+            previous_coverage, count = self._read_header(path)
+            last_ts = None
+            if count:
+                stored = np.memmap(path, dtype=CANDLE_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+                timestamps = stored['timestamp']
+                last_ts = int(timestamps[-1])
+                # Prevalece la vela guardada (búsqueda binaria, sin leer todo el archivo)
+                pos = np.searchsorted(timestamps, new_records['timestamp'])
+                exists = (pos < count) & (timestamps[np.minimum(pos, count - 1)] == new_records['timestamp'])
+                new_records = new_records[~exists]
+
+            candidates = [previous_coverage]
+            if coverage_start is not None:
+                candidates.append(int(coverage_start))
+            if len(new_records):
+                candidates.append(int(new_records['timestamp'][0]))
+            new_coverage = min(candidates)
+
+            if len(new_records) == 0:
+                if new_coverage != previous_coverage:
+                    with open(path, 'r+b') as f:
+                        f.write(self._header(new_coverage))
+                return
+
+            if last_ts is not None and new_records['timestamp'][0] < last_ts:
+                # Velas por la cabeza o dentro de un hueco: reescribir
+                merged = np.concatenate([stored, new_records])
+                merged = merged[np.argsort(merged['timestamp'], kind='stable')]
+                del stored, timestamps
+                self._write(path, merged, new_coverage)
+                return
+
+            # Velas nuevas por la cola: añadir tras el último registro completo
+            with open(path, 'r+b') as f:
+                f.seek(HEADER_SIZE + count * CANDLE_DTYPE.itemsize)
+                f.write(new_records.tobytes())
+                f.truncate()
+                if new_coverage != previous_coverage:
+                    f.seek(0)
+                    f.write(self._header(new_coverage))
+
+
+_default_store = None
+
+
+def get_candle_store():
+    """Retorna la instancia compartida del almacén de velas"""
+    global _default_store
+    if _default_store is None:
+        _default_store = CandleStore()
+    return _default_store
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Registro compartido de clientes de exchange
+
+Mantiene un único cliente ccxt configurado por id de exchange para todo el
+proceso. Así se reutilizan la sesión HTTP (keep-alive) y los mercados
+cargados entre todas las llamadas.
+
+El ritmo de las peticiones lo marca el planificador (utils/request_scheduler.py),
+compartido por todos los hilos. El limitador propio de ccxt (un intervalo fijo
+por cliente, sin protección entre hilos) solo se activa en los exchanges sin
+límite de peso configurado en REQUEST_WEIGHT_LIMITS; si no, competiría con el
+planificador y con las descargas en paralelo.
+"""
+
+import threading
+import ccxt
+
+from config import EXCHANGE_ID, REQUEST_WEIGHT_LIMITS
+
+_clients = {}
+_factories = {}
+_markets_loaded = set()
+_lock = threading.RLock()
+
+
+def _create_exchange(exchange_id):
+    """Crea un cliente ccxt; el limitador de ccxt solo se activa si el planificador no limita el exchange"""
+    if exchange_id in _factories:
+        return _factories[exchange_id]()
+
+    if exchange_id == 'fake':
+        # Exchange local sin red (utils/fake_exchange.py)
+        from utils.fake_exchange import create_fake_exchange
+        return create_fake_exchange()
+
+    exchange_class = getattr(ccxt, exchange_id, None)
+    if exchange_class is None:
+        raise ValueError(f"Exchange no soportado: {exchange_id}")
+
+    return exchange_class({
+        'enableRateLimit': not REQUEST_WEIGHT_LIMITS.get(exchange_id),
+        'timeout': 30000
+    })
+
+
+def get_exchange(exchange_id=None, load_markets=True):
+    """
+    Retorna el cliente compartido de un exchange, creándolo la primera vez
+
+    Args:
+        exchange_id: Id de ccxt del exchange (por defecto config.EXCHANGE_ID)
+        load_markets: Cargar los mercados si todavía no se han cargado
+    """
+    exchange_id = exchange_id or EXCHANGE_ID
+
+    with _lock:
+        client = _clients.get(exchange_id)
+        if client is None:
+            client = _create_exchange(exchange_id)
+            _clients[exchange_id] = client
+
+        # Los mercados se cargan una sola vez por cliente
+        if load_markets and exchange_id not in _markets_loaded:
+            if hasattr(client, 'load_markets'):
+                client.load_markets()
+            _markets_loaded.add(exchange_id)
+
+    return client
+
+
+def set_exchange(exchange_id, client):
+    """
+    Sustituye el cliente de un exchange (por ejemplo por uno falso en tests o benchmarks)
+    """
+    with _lock:
+        _clients[exchange_id] = client
+        _markets_loaded.discard(exchange_id)
+
+
+def register_exchange_factory(exchange_id, factory):
+    """
+    Registra una función que crea el cliente de un exchange bajo demanda
+    """
+    with _lock:
+        _factories[exchange_id] = factory
+        _clients.pop(exchange_id, None)
+        _markets_loaded.discard(exchange_id)
+
+
+def reset_exchanges():
+    """Descarta todos los clientes creados"""
+    with _lock:
+        _clients.clear()
+        _markets_loaded.clear()
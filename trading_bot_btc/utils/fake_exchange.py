@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Exchange local falso con la interfaz de ccxt usada por el bot
+
+Implementa fetch_ohlcv y fetch_order_book sobre velas grabadas (un
+CandleStore o velas añadidas con add_candles) o sintéticas
+(utils/synthetic_data.py), sin red. Permite configurar:
+- latencia por petición (fija o un rango aleatorio)
+- tamaño máximo de página de fetch_ohlcv
+- errores de red aleatorios o programados (fail_next)
+- límite de peticiones por ventana de tiempo, con ccxt.RateLimitExceeded al superarlo
+
+Se selecciona con EXCHANGE_ID=fake (ver config.FAKE_EXCHANGE_*) o
+instalándolo con exchange_client.set_exchange.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import ccxt
+import numpy as np
+
+from config import (CANDLE_STORE_DIR, FAKE_EXCHANGE_ERROR_RATE, FAKE_EXCHANGE_LATENCY, FAKE_EXCHANGE_PAGE_SIZE,
+                    FAKE_EXCHANGE_RATE_LIMIT, FAKE_EXCHANGE_SOURCE, SYNTHETIC_SEED)
+from utils.api_data import timeframe_to_ms
+from utils.candle_store import CandleStore
+from utils.synthetic_data import SyntheticMarket
+
+# Límite por defecto de fetch_ohlcv sin `limit`, como Binance
+DEFAULT_OHLCV_LIMIT = 500
+DEFAULT_BOOK_LIMIT = 100
+
+
+class FakeExchange:
+    """
+    Cliente falso compatible con las llamadas de ccxt que usa el bot
+    """
+
+    id = 'fake'
+
+    def __init__(self, candle_store=None, synthetic_mode='gbm', seed=None, latency=0.0, page_size=1000,
+                 error_rate=0.0, rate_limit=None, rate_limit_window=60.0):
+        """
+        Args:
+            candle_store: CandleStore con velas grabadas (por defecto velas sintéticas)
+            synthetic_mode: Modo de utils/synthetic_data.py para símbolos sin velas grabadas
+            seed: Semilla de los datos sintéticos y de los errores (por defecto config.SYNTHETIC_SEED)
+            latency: Segundos de espera por petición, o tupla (mínimo, máximo)
+            page_size: Máximo de velas por llamada a fetch_ohlcv
+            error_rate: Probabilidad de que una petición falle con ccxt.NetworkError
+            rate_limit: Máximo de peticiones por ventana (None o 0 = sin límite)
+            rate_limit_window: Duración de la ventana del límite en segundos
+        """
+        self.candle_store = candle_store
+        self.synthetic_mode = synthetic_mode
+        self.seed = SYNTHETIC_SEED if seed is None else seed
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit or None
+        self.rate_limit_window = rate_limit_window
+        self.rateLimit = 0  # ms entre peticiones del limitador de ccxt (no se usa)
+        self.markets = {}
+
+        self._recorded = {}
+        self._synthetic = {}
+        self._failures = deque()
+        self._request_times = deque()
+        self._rng = np.random.default_rng(self.seed)
+        self._lock = threading.Lock()
+        self.stats = {'fetch_ohlcv': 0, 'fetch_order_book': 0, 'rows': 0, 'errors': 0, 'rate_limited': 0}
+
+    def load_markets(self, reload=False):
+        return self.markets
+
+    def add_candles(self, symbol, timeframe, rows):
+        """
+        Graba velas en memoria para un símbolo y temporalidad
+
+        Args:
+            rows: Matriz (n, 6) o lista de [timestamp, open, high, low, close, volume]
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        rows = rows[np.argsort(rows[:, 0], kind='stable')]
+        self._recorded[(symbol.replace('/', ''), timeframe)] = rows
+
+    def fail_next(self, count=1, error=None):
+        """Hace fallar las próximas `count` peticiones con `error` (por defecto ccxt.NetworkError)"""
+        with self._lock:
+            for _ in range(count):
+                self._failures.append(error or ccxt.NetworkError(f"{self.id}: error programado"))
+
+    def _request(self, kind):
+        """Aplica límite de peticiones, errores y latencia a una petición"""
+        with self._lock:
+            self.stats[kind] += 1
+
+            if self.rate_limit:
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= self.rate_limit_window:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self.rate_limit:
+                    self.stats['rate_limited'] += 1
+                    raise ccxt.RateLimitExceeded(
+                        f"{self.id} 429 Too Many Requests: más de {self.rate_limit} peticiones "
+                        f"en {self.rate_limit_window:g}s")
+                self._request_times.append(now)
+
+            error = self._failures.popleft() if self._failures else None
+            if error is None and self.error_rate and self._rng.random() < self.error_rate:
+                error = ccxt.NetworkError(f"{self.id}: error de red simulado")
+
+            latency = self.latency
+            if isinstance(latency, (tuple, list)):
+                latency = self._rng.uniform(*latency)
+
+        if latency:
+            time.sleep(latency)
+        if error is not None:
+            with self._lock:
+                self.stats['errors'] += 1
+            raise error
+
+    def _market(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        with self._lock:
+            if key not in self._synthetic:
+                self._synthetic[key] = SyntheticMarket(symbol, timeframe, self.synthetic_mode, self.seed)
+            return self._synthetic[key]
+
+    def _candles(self, symbol, timeframe, since, limit):
+        """Velas desde `since` (o las últimas si es None), como mucho `limit`"""
+        recorded = self._recorded.get((symbol, timeframe))
+        if recorded is None and self.candle_store is not None:
+            recorded = self.candle_store.load(symbol, timeframe)
+
+        if recorded is not None:
+            if since is None:
+                return recorded[-limit:]
+            lo = np.searchsorted(recorded[:, 0], since, side='left')
+            return recorded[lo:lo + limit]
+
+        market = self._market(symbol, timeframe)
+        if since is None:
+            return market.range(None, None, limit)
+        return market.range(since, since + limit * timeframe_to_ms(timeframe) - 1, limit)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """
+        Velas [timestamp, open, high, low, close, volume] desde `since`
+
+        Como Binance, retorna como mucho min(limit, page_size) velas que
+        empiezan en `since` o después; sin `since`, las últimas velas.
+        """
+        self._request('fetch_ohlcv')
+        limit = min(limit or DEFAULT_OHLCV_LIMIT, self.page_size)
+        rows = self._candles(symbol.replace('/', ''), timeframe, since, limit)
+        with self._lock:
+            self.stats['rows'] += len(rows)
+        # ccxt retorna listas con el timestamp entero
+        return [[int(row[0])] + row[1:].tolist() for row in rows]
+
+    def fetch_order_book(self, symbol, limit=None, params=None):
+        """
+        Libro de órdenes sintético alrededor del último cierre conocido
+
+        Los niveles están separados por 0,5 pb del precio medio y las
+        cantidades siguen una distribución exponencial.
+        """
+        self._request('fetch_order_book')
+        limit = limit or DEFAULT_BOOK_LIMIT
+        symbol_clean = symbol.replace('/', '')
+
+        timeframe = next((tf for (s, tf) in self._recorded if s == symbol_clean), '1m')
+        last = self._candles(symbol_clean, timeframe, None, 1)
+        mid = float(last[-1, 4]) if len(last) else 1.0
+
+        with self._lock:
+            bid_sizes = self._rng.exponential(0.5, limit)
+            ask_sizes = self._rng.exponential(0.5, limit)
+        tick = mid * 0.00005
+        levels = np.arange(limit)
+        bids = [[mid - tick * (k + 1), float(size)] for k, size in zip(levels, bid_sizes)]
+        asks = [[mid + tick * (k + 1), float(size)] for k, size in zip(levels, ask_sizes)]
+
+        now = datetime.now(timezone.utc)
+        return {
+            'symbol': symbol,
+            'bids': bids,
+            'asks': asks,
+            'timestamp': int(now.timestamp() * 1000),
+            'datetime': now.isoformat(),
+            'nonce': None
+        }
+
+
+def create_fake_exchange():
+    """
+    Crea el exchange falso configurado en config.FAKE_EXCHANGE_* (EXCHANGE_ID=fake)
+    """
+    latency = FAKE_EXCHANGE_LATENCY
+    if isinstance(latency, str):
+        latency = tuple(float(v) for v in latency.split(',')) if ',' in latency else float(latency)
+
+    candle_store = None
+    if FAKE_EXCHANGE_SOURCE == 'store':
+        candle_store = CandleStore(CANDLE_STORE_DIR)
+    elif FAKE_EXCHANGE_SOURCE != 'synthetic':
+        raise ValueError(f"Origen del exchange falso desconocido: {FAKE_EXCHANGE_SOURCE}")
+
+    return FakeExchange(
+        candle_store=candle_store,
+        latency=latency,
+        page_size=FAKE_EXCHANGE_PAGE_SIZE,
+        error_rate=FAKE_EXCHANGE_ERROR_RATE,
+        rate_limit=FAKE_EXCHANGE_RATE_LIMIT
+    )
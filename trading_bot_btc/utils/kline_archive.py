@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Carga masiva de los archivos públicos de velas de Binance (data.binance.vision)
+
+Binance publica las velas de cada símbolo en archivos mensuales y diarios
+(`BTCUSDT-1m-2023-01.zip`, `BTCUSDT-1m-2023-01-15.zip`), cada uno con un CSV
+de 12 columnas (apertura, OHLCV, cierre, ...). Este módulo lee esos archivos
+de un directorio local uno a uno, sin cargarlos todos en memoria, los
+convierte con pandas (C) en registros del almacén de velas y los guarda con
+CandleStore.merge. Así, poblar años de velas de 1m es un trabajo local en
+lugar de horas de paginación contra la API.
+
+Se valida que:
+- el CSV no tiene velas desordenadas ni con timestamps fuera de la rejilla
+- no faltan periodos entre archivos consecutivos (un mes o un día sin archivo)
+- las velas cargadas quedan contiguas con las que ya hay en el almacén
+
+Los huecos dentro de un archivo (paradas del exchange) se informan pero no
+son un error: la API tampoco tiene esas velas.
+"""
+
+import hashlib
+import os
+import re
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from utils.api_data import TIMEFRAME_MINUTES, align_timestamp, timeframe_to_ms
+from utils.candle_store import CANDLE_DTYPE, get_candle_store
+
+# SIMBOLO-temporalidad-AAAA-MM(-DD).zip|csv
+ARCHIVE_PATTERN = re.compile(
+    r'^(?P<symbol>[A-Z0-9]+)-(?P<timeframe>\d+[smhdwM])-(?P<period>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$')
+
+# Velas acumuladas antes de escribirlas en el almacén
+INGEST_BATCH_ROWS = 500000
+
+# Desde 2025 los archivos de spot usan microsegundos; cualquier timestamp por encima está en µs
+_MICROSECONDS_THRESHOLD = 10 ** 14
+
+
+class ArchiveError(ValueError):
+    """Archivo de velas no válido o serie no contigua"""
+
+
+def parse_archive_name(filename):
+    """
+    Símbolo, temporalidad y periodo a partir del nombre de un archivo de Binance
+
+    Returns:
+        dict: {'symbol', 'timeframe', 'period', 'daily'} o None si el nombre no encaja
+    """
+    match = ARCHIVE_PATTERN.match(os.path.basename(filename))
+    if match is None:
+        return None
+    info = match.groupdict()
+    info['daily'] = len(info['period']) == 10
+    return info
+
+
+def _period_bounds(period):
+    """(inicio, fin exclusivo) del periodo 'AAAA-MM' o 'AAAA-MM-DD' en milisegundos UTC"""
+    if len(period) == 10:
+        start = datetime.strptime(period, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        end = start + pd.Timedelta(days=1)
+    else:
+        start = datetime.strptime(period, '%Y-%m').replace(tzinfo=timezone.utc)
+        end = (pd.Timestamp(start) + pd.offsets.MonthBegin(1)).to_pydatetime()
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+def find_archives(directory, symbol=None, timeframe=None):
+    """
+    Busca archivos de velas de Binance en un directorio (y subdirectorios)
+
+    Returns:
+        dict: {(símbolo, temporalidad): [(ruta, info), ...]} ordenados por periodo;
+              si hay un archivo mensual, los diarios del mismo mes se descartan
+    """
+    symbol = symbol.replace('/', '') if symbol else None
+    found = {}
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            info = parse_archive_name(filename)
+            if info is None:
+                continue
+            if symbol and info['symbol'] != symbol:
+                continue
+            if timeframe and info['timeframe'] != timeframe:
+                continue
+            if info['timeframe'] not in TIMEFRAME_MINUTES:
+                continue  # 1s y 1M no tienen una duración fija en el bot
+            found.setdefault((info['symbol'], info['timeframe']), []).append((os.path.join(root, filename), info))
+
+    for key, archives in found.items():
+        months = {info['period'] for _, info in archives if not info['daily']}
+        archives = [(path, info) for path, info in archives if not (info['daily'] and info['period'][:7] in months)]
+        # Un mismo periodo puede estar como .zip y como .csv: se usa el primero
+        unique = {}
+        for path, info in sorted(archives, key=lambda item: item[0]):
+            unique.setdefault(info['period'], (path, info))
+        found[key] = [unique[period] for period in sorted(unique)]
+    return found
+
+
+def verify_checksum(path):
+    """
+    Comprueba el `.CHECKSUM` (sha256) publicado junto al archivo, si existe
+
+    Returns:
+        bool: True si coincide, None si no hay archivo de checksum
+
+    Raises:
+        ArchiveError: Si el checksum no coincide
+    """
+    checksum_path = f"{path}.CHECKSUM"
+    if not os.path.exists(checksum_path):
+        return None
+    with open(checksum_path) as f:
+        expected = f.read().split()[0].lower()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    if digest.hexdigest() != expected:
+        raise ArchiveError(f"Checksum incorrecto en {os.path.basename(path)}")
+    return True
+
+
+def parse_kline_csv(source):
+    """
+    Convierte un CSV de velas de Binance en registros CANDLE_DTYPE
+
+    Acepta archivos con o sin cabecera y timestamps en milisegundos o
+    microsegundos. Solo se leen las seis primeras columnas.
+
+    Args:
+        source: Ruta o archivo abierto en modo binario
+
+    Returns:
+        np.ndarray: Registros CANDLE_DTYPE en el orden del archivo
+    """
+    frame = pd.read_csv(source, header=None, usecols=range(6), names=list(CANDLE_DTYPE.names), engine='c')
+    # Archivos con cabecera (futuros y algunos de spot): la primera fila no es numérica
+    if frame['timestamp'].dtype == object:
+        frame = frame.iloc[1:].apply(pd.to_numeric)
+
+    records = np.empty(len(frame), dtype=CANDLE_DTYPE)
+    timestamps = frame['timestamp'].to_numpy().astype(np.int64)
+    records['timestamp'] = np.where(timestamps >= _MICROSECONDS_THRESHOLD, timestamps // 1000, timestamps)
+    for col in CANDLE_DTYPE.names[1:]:
+        records[col] = frame[col].to_numpy().astype(np.float64)
+    return records
+
+
+def read_archive(path):
+    """Registros CANDLE_DTYPE de un archivo .zip (con un único CSV) o .csv"""
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = [name for name in archive.namelist() if name.endswith('.csv')]
+            if len(members) != 1:
+                raise ArchiveError(f"{os.path.basename(path)} debe contener un único CSV")
+            with archive.open(members[0]) as f:
+                return parse_kline_csv(f)
+    return parse_kline_csv(path)
+
+
+def find_gaps(timestamps, tf_ms):
+    """
+    Huecos de una serie ordenada de timestamps
+
+    Returns:
+        list: [(último_ts_antes, primer_ts_después, velas_que_faltan)]
+    """
+    if len(timestamps) < 2:
+        return []
+    steps = np.diff(timestamps)
+    positions = np.flatnonzero(steps != tf_ms)
+    return [(int(timestamps[i]), int(timestamps[i + 1]), int(steps[i] // tf_ms - 1)) for i in positions]
+
+
+def validate_records(records, timeframe, period=None):
+    """
+    Valida las velas de un archivo
+
+    Returns:
+        list: Huecos dentro del archivo (ver find_gaps)
+
+    Raises:
+        ArchiveError: Velas desordenadas o repetidas, fuera de la rejilla o fuera del periodo
+    """
+    tf_ms = timeframe_to_ms(timeframe)
+    timestamps = records['timestamp']
+    if len(timestamps) == 0:
+        return []
+    steps = np.diff(timestamps)
+    if np.any(steps <= 0):
+        raise ArchiveError("Velas desordenadas o repetidas")
+    if align_timestamp(int(timestamps[0]), timeframe) != timestamps[0] or np.any(steps % tf_ms):
+        raise ArchiveError(f"Timestamps fuera de la rejilla de {timeframe}")
+    if period is not None:
+        start, end = _period_bounds(period)
+        if timestamps[0] < start or timestamps[-1] >= end:
+            raise ArchiveError(f"Velas fuera del periodo {period}")
+    return find_gaps(timestamps, tf_ms)
+
+
+def _format_ts(ts):
+    return pd.Timestamp(ts, unit='ms').strftime('%Y-%m-%d %H:%M')
+
+
+def ingest_archives(archives, symbol, timeframe, store=None, allow_gaps=False, verify=True, verbose=True):
+    """
+    Carga en el almacén los archivos de un símbolo y temporalidad, en orden
+
+    Args:
+        archives: [(ruta, info)] ordenados por periodo (ver find_archives)
+        symbol: Símbolo ('BTCUSDT')
+        timeframe: Temporalidad de los archivos
+        store: CandleStore (por defecto el compartido)
+        allow_gaps: Cargar aunque falten periodos entre archivos o con el almacén
+        verify: Comprobar los `.CHECKSUM` publicados junto a los archivos
+        verbose: Imprimir el progreso
+
+    Returns:
+        dict: {'files', 'rows', 'first_ts', 'last_ts', 'gaps', 'missing_periods', 'complete'}
+
+    Raises:
+        ArchiveError: Si los archivos no son contiguos con el almacén (no se escribe
+                      nada) o falta un periodo entre dos archivos (lo anterior ya queda
+                      guardado), salvo con allow_gaps
+    """
+    store = store or get_candle_store()
+    tf_ms = timeframe_to_ms(timeframe)
+    report = {'files': 0, 'rows': 0, 'first_ts': None, 'last_ts': None, 'gaps': [], 'missing_periods': [],
+              'complete': True}
+
+    if timeframe not in TIMEFRAME_MINUTES:
+        raise ArchiveError(f"Temporalidad no soportada: {timeframe}")
+
+    # Contigüidad con el almacén, antes de escribir nada: un hueco entre ambos
+    # quedaría oculto porque el almacén solo descarga los huecos de cabeza y cola
+    coverage = store.coverage(symbol, timeframe)
+    if coverage is not None and archives:
+        first_period = _period_bounds(archives[0][1]['period'])[0]
+        last_period = _period_bounds(archives[-1][1]['period'])[1]
+        first_stored, last_stored = coverage
+        if last_period < first_stored or first_period > last_stored + tf_ms:
+            report['complete'] = False
+            message = (f"Los archivos ({_format_ts(first_period)} → {_format_ts(last_period)}) no son contiguos "
+                       f"con el almacén ({_format_ts(first_stored)} → {_format_ts(last_stored)})")
+            if not allow_gaps:
+                raise ArchiveError(message)
+            if verbose:
+                print(f"⚠️  {message}")
+
+    batch = []
+    batch_rows = 0
+    previous_end = None  # fin exclusivo del periodo anterior
+    previous_last = None
+
+    def flush():
+        nonlocal batch, batch_rows
+        if batch:
+            store.merge(symbol, timeframe, np.concatenate(batch))
+            batch, batch_rows = [], 0
+
+    try:
+        for path, info in archives:
+            period_start, period_end = _period_bounds(info['period'])
+            if previous_end is not None and period_start > previous_end:
+                missing = f"{_format_ts(previous_end)} → {_format_ts(period_start)}"
+                report['missing_periods'].append((previous_end, period_start))
+                if not allow_gaps:
+                    report['complete'] = False
+                    raise ArchiveError(f"Faltan archivos entre {missing}; carga detenida antes de "
+                                       f"{os.path.basename(path)}")
+                if verbose:
+                    print(f"⚠️  Faltan archivos entre {missing}")
+
+            if verify:
+                verify_checksum(path)
+            records = read_archive(path)
+            gaps = validate_records(records, timeframe, info['period'])
+            if len(records) and previous_last is not None:
+                gaps = find_gaps(np.array([previous_last, records['timestamp'][0]]), tf_ms) + gaps
+            report['gaps'].extend(gaps)
+
+            if len(records):
+                previous_last = int(records['timestamp'][-1])
+                report['first_ts'] = report['first_ts'] if report['first_ts'] is not None else int(records['timestamp'][0])
+                report['last_ts'] = previous_last
+                batch.append(records)
+                batch_rows += len(records)
+            report['files'] += 1
+            report['rows'] += len(records)
+            previous_end = period_end
+
+            if verbose:
+                print(f"📦 {os.path.basename(path)}: {len(records):,} velas"
+                      + (f", {len(gaps)} huecos" if gaps else ""))
+            if batch_rows >= INGEST_BATCH_ROWS:
+                flush()
+    finally:
+        flush()
+
+    return report
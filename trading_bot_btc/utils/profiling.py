@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Medición por etapas (tiempo, llamadas y filas procesadas)
+
+BacktestEngine, run_backtest y main.evaluate_multi_timeframe aceptan
+`profile=True` (o un StageProfiler compartido) y envuelven cada etapa en
+`profiler.stage(nombre)`. Desactivado se usa NULL_PROFILER, cuyas etapas no
+hacen nada, así que el coste es una llamada a un método vacío por etapa.
+"""
+
+import threading
+import time
+
+from config import PROFILE_STAGES
+
+
+class _Stage:
+    """Etapa en curso; `rows` se puede fijar dentro del bloque"""
+
+    __slots__ = ('profiler', 'name', 'rows', 'started')
+
+    def __init__(self, profiler, name, rows):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.add(self.name, time.perf_counter() - self.started, rows=self.rows)
+        return False
+
+
+class _NullStage:
+    """Etapa que no mide nada (perfilado desactivado)"""
+
+    __slots__ = ('rows',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class StageProfiler:
+    """
+    Acumula tiempo, llamadas y filas por etapa
+
+    Uso:
+        profiler = StageProfiler()
+        with profiler.stage('indicators') as stage:
+            macd = ta.macd(df['close'])
+            stage.rows = len(df)
+        profiler.print_summary()
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def stage(self, name, rows=0):
+        """Context manager que mide una ejecución de la etapa `name`"""
+        return _Stage(self, name, rows)
+
+    def add(self, name, seconds=0.0, calls=1, rows=0):
+        """Suma una medida a la etapa (para tiempos medidos fuera de stage())"""
+        with self._lock:
+            totals = self._stages.get(name)
+            if totals is None:
+                totals = self._stages[name] = {'seconds': 0.0, 'calls': 0, 'rows': 0}
+            totals['seconds'] += seconds
+            totals['calls'] += calls
+            totals['rows'] += int(rows or 0)
+
+    def summary(self):
+        """
+        Medidas en un diccionario serializable
+
+        Returns:
+            dict: {'total_seconds': tiempo desde la creación,
+                   'stages': {etapa: {'seconds', 'calls', 'rows'}}} en orden de aparición
+        """
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in self._stages.items()}
+        return {'total_seconds': time.perf_counter() - self._started, 'stages': stages}
+
+    def print_summary(self, title="Tiempo por etapa"):
+        """Imprime la tabla de etapas"""
+        summary = self.summary()
+        total = summary['total_seconds']
+        print(f"\n⏱️  {title} (total {total:.3f}s)")
+        print(f"{'Etapa':<22} {'Tiempo (s)':>11} {'%':>6} {'Llamadas':>9} {'Filas':>11} {'Filas/s':>12}")
+        print("─" * 76)
+        for name, totals in summary['stages'].items():
+            seconds = totals['seconds']
+            share = seconds / total * 100 if total > 0 else 0.0
+            rate = f"{totals['rows'] / seconds:,.0f}" if totals['rows'] and seconds > 0 else '-'
+            print(f"{name:<22} {seconds:>11.4f} {share:>5.1f}% {totals['calls']:>9,} {totals['rows']:>11,} {rate:>12}")
+
+
+class _NullProfiler:
+    """Perfilador desactivado: mismas operaciones, sin efecto"""
+
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name, rows=0):
+        return self._stage
+
+    def add(self, name, seconds=0.0, calls=1, rows=0):
+        pass
+
+    def summary(self):
+        return None
+
+    def print_summary(self, title=None):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def get_profiler(profile=None):
+    """
+    Resuelve el argumento `profile` de las funciones instrumentadas
+
+    Args:
+        profile: True/False, un StageProfiler ya creado (para compartirlo entre
+                 etapas de distintos módulos) o None para usar config.PROFILE_STAGES
+
+    Returns:
+        StageProfiler o NULL_PROFILER
+    """
+    if profile is None:
+        profile = PROFILE_STAGES
+    if isinstance(profile, (StageProfiler, _NullProfiler)):
+        return profile
+    return StageProfiler() if profile else NULL_PROFILER
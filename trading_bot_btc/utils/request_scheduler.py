@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador de peticiones al exchange
+
+- TokenBucket: reparte el peso de peticiones por minuto del exchange entre
+  todos los hilos, de modo que la ventana de un minuto nunca se supera
+- RequestScheduler: pide el peso de cada llamada al bucket y reintenta los
+  errores de red y de límite de peticiones con espera exponencial con jitter
+- OHLCVCursor: posición de una descarga paginada; si la descarga se corta,
+  el cursor indica desde dónde continuarla
+
+Hay un planificador compartido por exchange (get_scheduler), con los límites
+de config.REQUEST_WEIGHT_LIMITS y config.REQUEST_WEIGHTS.
+"""
+
+import random
+import threading
+import time
+
+import ccxt
+
+from config import (EXCHANGE_ID, REQUEST_BACKOFF_BASE, REQUEST_BACKOFF_MAX, REQUEST_BURST_SECONDS,
+                    REQUEST_MAX_RETRIES, REQUEST_WEIGHT_LIMITS, REQUEST_WEIGHTS)
+
+# Errores transitorios que se reintentan; el resto (símbolo inválido, etc.) se propaga
+RETRYABLE_ERRORS = (ccxt.NetworkError,)
+RATE_LIMIT_ERRORS = (ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+
+class TokenBucket:
+    """
+    Bucket de tokens compartido entre hilos
+
+    Con una capacidad C y un límite L por ventana W, el ritmo de recarga es
+    (L - C) / W: aunque el bucket empiece lleno, en ninguna ventana se gastan
+    más de L tokens.
+    """
+
+    def __init__(self, limit, window=60.0, burst_seconds=REQUEST_BURST_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            limit: Peso máximo por ventana
+            window: Duración de la ventana en segundos
+            burst_seconds: Segundos de ritmo que se pueden gastar de golpe (capacidad)
+        """
+        self.capacity = max(1.0, min(limit / 2, limit / window * burst_seconds))
+        self.rate = (limit - self.capacity) / window
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, weight=1):
+        """
+        Reserva `weight` tokens
+
+        Returns:
+            float: Segundos que hay que esperar antes de hacer la petición
+        """
+        weight = min(weight, self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            # Los tokens pueden quedar en negativo: las reservas posteriores esperan más
+            self._tokens -= weight
+            wait = max(0.0, -self._tokens / self.rate, self._paused_until - now)
+        return wait
+
+    def pause(self, seconds):
+        """Detiene todas las reservas durante `seconds` (tras un error de límite de peticiones)"""
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class OHLCVCursor:
+    """
+    Posición de una descarga paginada de velas
+
+    `since` es el timestamp desde el que falta descargar. Si la descarga se
+    corta, `error` guarda el motivo y el mismo cursor se puede pasar de nuevo
+    para continuar sin repetir páginas.
+    """
+
+    def __init__(self, symbol, timeframe, since, end_ts=None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.since = since
+        self.end_ts = end_ts
+        self.pages = 0
+        self.rows = 0
+        self.done = False
+        self.error = None
+
+    def advance(self, page):
+        """Avanza el cursor tras una página descargada"""
+        self.pages += 1
+        self.rows += len(page)
+        self.since = page[-1][0] + 1
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in ('symbol', 'timeframe', 'since', 'end_ts', 'pages', 'rows', 'done', 'error')}
+
+    @classmethod
+    def from_dict(cls, state):
+        cursor = cls(state['symbol'], state['timeframe'], state['since'], state.get('end_ts'))
+        for key in ('pages', 'rows', 'done', 'error'):
+            if key in state:
+                setattr(cursor, key, state[key])
+        return cursor
+
+    def __repr__(self):
+        return (f"OHLCVCursor({self.symbol} {self.timeframe} since={self.since} end={self.end_ts} "
+                f"pages={self.pages} rows={self.rows} done={self.done})")
+
+
+class RequestScheduler:
+    """
+    Ejecuta peticiones respetando el límite de peso y reintentando errores transitorios
+    """
+
+    def __init__(self, weight_limit=None, window=60.0, weights=None, max_retries=REQUEST_MAX_RETRIES,
+                 backoff_base=REQUEST_BACKOFF_BASE, backoff_max=REQUEST_BACKOFF_MAX,
+                 sleep=time.sleep, clock=time.monotonic, seed=None):
+        """
+        Args:
+            weight_limit: Peso máximo por ventana (None o 0 = sin límite)
+            window: Duración de la ventana en segundos
+            weights: Peso de cada método {'fetch_ohlcv': 2, ...} (por defecto 1)
+            max_retries: Reintentos por petición antes de propagar el error
+            backoff_base: Espera del primer reintento en segundos (se duplica en cada uno)
+            backoff_max: Espera máxima entre reintentos
+            sleep, clock: Funciones de espera y de reloj (sustituibles en tests)
+            seed: Semilla del jitter
+        """
+        self.bucket = TokenBucket(weight_limit, window, clock=clock) if weight_limit else None
+        self.weights = weights or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._metrics = self._empty_metrics()
+
+    @staticmethod
+    def _empty_metrics():
+        return {'requests': 0, 'weight': 0, 'retries': 0, 'rate_limited': 0, 'failures': 0,
+                'throttle_seconds': 0.0, 'backoff_seconds': 0.0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._metrics[key] += value
+
+    def backoff(self, attempt):
+        """Espera antes del reintento `attempt` (1, 2, ...): entre la mitad y el total de base * 2^(attempt-1)"""
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        with self._lock:
+            return self._random.uniform(ceiling / 2, ceiling)
+
+    def call(self, method, func, *args, **kwargs):
+        """
+        Ejecuta func(*args, **kwargs) como una petición del método `method`
+
+        Returns:
+            Resultado de func
+
+        Raises:
+            La última excepción si se agotan los reintentos o si no es transitoria
+        """
+        weight = self.weights.get(method, 1)
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                wait = self.bucket.reserve(weight)
+                if wait > 0:
+                    self._count(throttle_seconds=wait)
+                    self._sleep(wait)
+            self._count(requests=1, weight=weight)
+
+            try:
+                return func(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                rate_limited = isinstance(e, RATE_LIMIT_ERRORS)
+                if attempt > self.max_retries:
+                    self._count(failures=1, rate_limited=int(rate_limited))
+                    raise
+                delay = self.backoff(attempt)
+                if rate_limited:
+                    # Todos los hilos esperan: seguir pidiendo puede acabar en un baneo
+                    delay = max(delay, self.backoff_base * 4)
+                    if self.bucket is not None:
+                        self.bucket.pause(delay)
+                self._count(retries=1, rate_limited=int(rate_limited), backoff_seconds=delay)
+                self._sleep(delay)
+
+    def metrics(self):
+        """Peticiones, peso, reintentos, errores de límite, fallos y segundos de espera"""
+        with self._lock:
+            return dict(self._metrics)
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = self._empty_metrics()
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(exchange_id=None):
+    """Planificador compartido de un exchange (por defecto config.EXCHANGE_ID)"""
+    exchange_id = exchange_id or EXCHANGE_ID
+    with _schedulers_lock:
+        if exchange_id not in _schedulers:
+            _schedulers[exchange_id] = RequestScheduler(
+                weight_limit=REQUEST_WEIGHT_LIMITS.get(exchange_id),
+                weights=REQUEST_WEIGHTS.get(exchange_id)
+            )
+        return _schedulers[exchange_id]
+
+
+def set_scheduler(exchange_id, scheduler):
+    """Sustituye el planificador de un exchange (tests, benchmarks)"""
+    with _schedulers_lock:
+        _schedulers[exchange_id] = scheduler
+
+
+def reset_schedulers():
+    with _schedulers_lock:
+        _schedulers.clear()
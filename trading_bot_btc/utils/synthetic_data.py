@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Generador determinista de velas OHLCV sintéticas
+
+Sirve como fuente de datos sin conexión para pruebas de carga y de escala
+(get_price_data con source='synthetic' o DATA_SOURCE=synthetic). Modos:
+- 'gbm': movimiento browniano geométrico con deriva y volatilidad constantes
+- 'regime': cambios de régimen (alcista, bajista, lateral) de duración aleatoria
+- 'stochastic_vol': volatilidad agrupada, log-volatilidad AR(1)
+
+Las velas viven en una rejilla fija que empieza en SYNTHETIC_ANCHOR y se
+generan por bloques de CHUNK_SIZE velas, cada uno con su propio generador
+aleatorio. Así una misma vela tiene siempre el mismo valor, se pida el rango
+que se pida, y generar 10M+ velas es una operación vectorizada por bloques.
+"""
+
+import threading
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from config import SYNTHETIC_MODE, SYNTHETIC_SEED
+from utils.api_data import align_timestamp, timeframe_to_ms
+
+SYNTHETIC_MODES = ('gbm', 'regime', 'stochastic_vol')
+
+# Primera vela posible de la rejilla sintética (ms)
+SYNTHETIC_ANCHOR = int(datetime(2017, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+CHUNK_SIZE = 1 << 16
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Parámetros por defecto (deriva y volatilidad anualizadas)
+DEFAULT_PARAMS = {
+    'initial_price': 30000.0,
+    'drift': 0.1,
+    'volatility': 0.6,
+    'base_volume': 100.0,
+    # Modo 'regime': (deriva, volatilidad) de cada régimen y duración media en días
+    'regimes': ((0.8, 0.5), (-0.9, 0.9), (0.0, 0.35)),
+    'regime_days': 30.0,
+    # Modo 'stochastic_vol': vida media de los choques de volatilidad y dispersión de la log-volatilidad
+    'vol_half_life_days': 2.0,
+    'vol_of_vol': 0.5
+}
+
+
+def _stable_hash(text):
+    """Hash estable entre ejecuciones (hash() de Python cambia con cada proceso)"""
+    return zlib.crc32(text.encode('utf-8'))
+
+
+class SyntheticMarket:
+    """
+    Serie sintética de un símbolo y una temporalidad
+
+    Guarda el estado (precio, log-volatilidad, régimen) al inicio de cada
+    bloque ya generado para poder generar cualquier rango sin repetir bloques
+    anteriores.
+    """
+
+    def __init__(self, symbol='SYNTH/USDT', timeframe='15m', mode=None, seed=None, **params):
+        mode = mode or SYNTHETIC_MODE
+        if mode not in SYNTHETIC_MODES:
+            raise ValueError(f"Modo sintético desconocido: {mode} (opciones: {', '.join(SYNTHETIC_MODES)})")
+
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.mode = mode
+        self.seed = SYNTHETIC_SEED if seed is None else seed
+        self.params = {**DEFAULT_PARAMS, **params}
+
+        self.tf_ms = timeframe_to_ms(timeframe)
+        first = align_timestamp(SYNTHETIC_ANCHOR, timeframe)
+        self.first_ts = first if first >= SYNTHETIC_ANCHOR else first + self.tf_ms
+
+        # Escalas por vela
+        dt = self.tf_ms / YEAR_MS
+        self._dt = dt
+        self._regime_switch = min(1.0, self.tf_ms / (self.params['regime_days'] * DAY_MS))
+        self._phi = 0.5 ** (self.tf_ms / (self.params['vol_half_life_days'] * DAY_MS))
+        self._kernel_fft = None
+
+        self._stream = [self.seed, _stable_hash(symbol), _stable_hash(timeframe), _stable_hash(mode)]
+        self._states = [{
+            'log_price': np.log(self.params['initial_price']),
+            'log_vol': 0.0,
+            'regime': 0,
+            'remaining': -1
+        }]
+        self._lock = threading.Lock()
+
+    def _rng(self, chunk):
+        return np.random.default_rng(self._stream + [chunk])
+
+    def _ar1(self, noise, initial):
+        """
+        Proceso AR(1) x_t = phi * x_{t-1} + noise_t dentro de un bloque
+
+        Convolución exacta con el núcleo phi^k (FFT de tamaño fijo), más la
+        contribución del último valor del bloque anterior.
+        """
+        n = len(noise)
+        powers = self._phi ** np.arange(CHUNK_SIZE)
+        if self._kernel_fft is None:
+            self._kernel_fft = np.fft.rfft(powers, 2 * CHUNK_SIZE)
+        padded = np.zeros(CHUNK_SIZE)
+        padded[:n] = noise
+        filtered = np.fft.irfft(np.fft.rfft(padded, 2 * CHUNK_SIZE) * self._kernel_fft, 2 * CHUNK_SIZE)[:n]
+        return filtered + initial * self._phi * powers[:n]
+
+    def _regime_path(self, rng, state):
+        """Régimen de cada vela del bloque y estado al final del bloque"""
+        regimes = np.empty(CHUNK_SIZE, dtype=np.int64)
+        count = len(self.params['regimes'])
+        regime, remaining = state['regime'], state['remaining']
+        position = 0
+        while position < CHUNK_SIZE:
+            if remaining == 0:
+                # Fin del régimen: pasar a otro distinto
+                regime = (regime + rng.integers(1, count)) % count
+                remaining = rng.geometric(self._regime_switch)
+            elif remaining < 0:
+                # Inicio de la serie: el primer régimen no cambia
+                remaining = rng.geometric(self._regime_switch)
+            take = min(remaining, CHUNK_SIZE - position)
+            regimes[position:position + take] = regime
+            position += take
+            remaining -= take
+        return regimes, regime, remaining
+
+    def _chunk(self, chunk, state):
+        """
+        Genera un bloque completo a partir del estado de su inicio
+
+        Returns:
+            tuple: (dict de arrays, estado al final del bloque)
+        """
+        rng = self._rng(chunk)
+        params = self.params
+        shocks, high_noise, low_noise, volume_noise = rng.standard_normal((4, CHUNK_SIZE))
+        next_state = dict(state)
+
+        if self.mode == 'gbm':
+            drift = np.full(CHUNK_SIZE, params['drift'])
+            vol = np.full(CHUNK_SIZE, params['volatility'])
+        elif self.mode == 'regime':
+            regimes, next_state['regime'], next_state['remaining'] = self._regime_path(rng, state)
+            table = np.asarray(params['regimes'], dtype=np.float64)
+            drift = table[regimes, 0]
+            vol = table[regimes, 1]
+        else:  # stochastic_vol
+            noise = rng.standard_normal(CHUNK_SIZE) * params['vol_of_vol'] * np.sqrt(1 - self._phi ** 2)
+            log_vol = self._ar1(noise, state['log_vol'])
+            next_state['log_vol'] = log_vol[-1]
+            # Corrección para que la varianza media coincida con la volatilidad indicada
+            vol = params['volatility'] * np.exp(log_vol - params['vol_of_vol'] ** 2)
+            drift = np.full(CHUNK_SIZE, params['drift'])
+
+        bar_vol = vol * np.sqrt(self._dt)
+        log_returns = (drift - 0.5 * vol ** 2) * self._dt + bar_vol * shocks
+        log_close = state['log_price'] + np.cumsum(log_returns)
+        next_state['log_price'] = log_close[-1]
+
+        close = np.exp(log_close)
+        open_ = np.exp(np.concatenate([[state['log_price']], log_close[:-1]]))
+        high = np.maximum(open_, close) * np.exp(np.abs(high_noise) * bar_vol * 0.5)
+        low = np.minimum(open_, close) * np.exp(-np.abs(low_noise) * bar_vol * 0.5)
+        volume = params['base_volume'] * np.exp(0.5 * volume_noise) * (1 + np.abs(shocks))
+
+        return {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, next_state
+
+    def _state_at(self, chunk):
+        """Estado al inicio del bloque, generando los bloques anteriores que falten"""
+        while len(self._states) <= chunk:
+            c = len(self._states) - 1
+            _, next_state = self._chunk(c, self._states[c])
+            self._states.append(next_state)
+        return self._states[chunk]
+
+    def bars(self, start_index, count):
+        """
+        Velas [start_index, start_index + count) de la rejilla
+
+        Returns:
+            np.ndarray: Matriz (count, 6) [timestamp, open, high, low, close, volume]
+        """
+        if count <= 0:
+            return np.empty((0, 6))
+
+        end_index = start_index + count
+        first_chunk = start_index // CHUNK_SIZE
+        last_chunk = (end_index - 1) // CHUNK_SIZE
+        rows = np.empty((count, 6))
+        rows[:, 0] = self.first_ts + np.arange(start_index, end_index, dtype=np.int64) * self.tf_ms
+
+        with self._lock:
+            state = self._state_at(first_chunk)
+            for chunk in range(first_chunk, last_chunk + 1):
+                columns, next_state = self._chunk(chunk, state)
+                if len(self._states) == chunk + 1:
+                    self._states.append(next_state)
+                state = next_state
+
+                chunk_start = chunk * CHUNK_SIZE
+                lo = max(start_index, chunk_start)
+                hi = min(end_index, chunk_start + CHUNK_SIZE)
+                for i, col in enumerate(['open', 'high', 'low', 'close', 'volume'], start=1):
+                    rows[lo - start_index:hi - start_index, i] = columns[col][lo - chunk_start:hi - chunk_start]
+        return rows
+
+    def range(self, start_ts=None, end_ts=None, limit=1000):
+        """
+        Velas cuyo inicio está en [start_ts, end_ts] (ms), como una descarga del exchange
+
+        Sin fechas retorna las últimas `limit` velas hasta ahora; no hay velas
+        antes de SYNTHETIC_ANCHOR ni después de la vela en formación.
+        """
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        end_ts = min(end_ts if end_ts is not None else now_ms, now_ms)
+        last_index = (end_ts - self.first_ts) // self.tf_ms
+        if start_ts is None:
+            first_index = last_index - limit + 1
+        else:
+            first_index = -((self.first_ts - start_ts) // self.tf_ms)  # redondeo hacia arriba
+        first_index = max(first_index, 0)
+        return self.bars(first_index, last_index - first_index + 1)
+
+
+_markets = {}
+_markets_lock = threading.Lock()
+
+
+def get_synthetic_market(symbol, timeframe, mode=None, seed=None):
+    """Retorna la serie sintética compartida de (símbolo, temporalidad, modo, semilla)"""
+    key = (symbol.replace('/', ''), timeframe, mode or SYNTHETIC_MODE, SYNTHETIC_SEED if seed is None else seed)
+    with _markets_lock:
+        if key not in _markets:
+            _markets[key] = SyntheticMarket(symbol.replace('/', ''), timeframe, key[2], key[3])
+        return _markets[key]
+
+
+def synthetic_ohlcv(symbol, timeframe, start_ts=None, end_ts=None, limit=1000, mode=None, seed=None):
+    """
+    Velas sintéticas en el formato de fetch_ohlcv, usadas por get_price_data
+
+    Returns:
+        np.ndarray: Matriz (n, 6) [timestamp, open, high, low, close, volume]
+    """
+    return get_synthetic_market(symbol, timeframe, mode, seed).range(start_ts, end_ts, limit)
+
+
+def generate_ohlcv(periods, timeframe='15m', mode='gbm', seed=0, symbol='SYNTH/USDT', **params):
+    """
+    Genera `periods` velas desde el inicio de la rejilla sintética
+
+    Args:
+        periods: Número de velas
+        timeframe: Temporalidad
+        mode: 'gbm', 'regime' o 'stochastic_vol'
+        seed: Semilla
+        **params: Sustituyen a DEFAULT_PARAMS (drift, volatility, initial_price, ...)
+
+    Returns:
+        DataFrame: Velas OHLCV indexadas por timestamp
+    """
+    market = SyntheticMarket(symbol, timeframe, mode, seed, **params)
+    rows = market.bars(0, periods)
+    df = pd.DataFrame(rows[:, 1:], columns=['open', 'high', 'low', 'close', 'volume'],
+                      index=pd.to_datetime(rows[:, 0].astype(np.int64), unit='ms'))
+    df.index.name = 'timestamp'
+    df.attrs.update(symbol=symbol.replace('/', ''), timeframe=timeframe)
+    return df
@@ -6,7 +6,7 @@ Created on Thu Apr 10 23:32:44 2025
 """
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-import pandas_ta as ta
+from strategy.indicator_cache import macd as cached_macd
 import os
 import numpy as np
 from datetime import datetime
@@ -14,8 +14,9 @@ from datetime import datetime
 def plot_macd_chart(df, timeframe='', output_path=None):
     try:
         df = df.copy()
-        macd = ta.macd(df['close'])
-        df = df.join(macd)
+        macd = cached_macd(df)
+        # Asignar en lugar de join: check_macd_signal puede haber añadido ya las columnas
+        df[list(macd.columns)] = macd
 
         # Crear figura con subplots
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), gridspec_kw={'height_ratios': [2, 1]})